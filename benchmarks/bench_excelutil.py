@@ -0,0 +1,108 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+"""
+excelutil 读取基准：宽表（默认 200 列）逐行投影为行字典的耗时。
+
+对比三种方式（读取同一个只读工作表）：
+- 原始迭代：openpyxl iter_rows(values_only=True)，不构建字典，作为上限参考
+- 逐列查找：每行每列在 headers 中 filter 查找（编译表头计划之前的实现）
+- 编译计划：excelutil.iter_excel，表头只编译一次
+- 列式快照：excelutil.to_columnar 转换一次后，iter_excel 从内存映射的快照读取（不含转换耗时）
+
+    python benchmarks/bench_excelutil.py [--rows 5000] [--cols 200]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from openpyxl import Workbook  # noqa: E402
+
+from knify import excelutil, listutil, objutil  # noqa: E402
+
+
+def _build_workbook(path: str, rows: int, cols: int):
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append([f"col_{c}" for c in range(cols)])
+    for r in range(rows):
+        sheet.append([r * cols + c if c % 2 else f"v{r}_{c}" for c in range(cols)])
+    workbook.save(path)
+
+
+def _raw(path: str, headers) -> int:
+    workbook, sheet = excelutil._open_sheet(path)
+    try:
+        return sum(1 for _ in sheet.iter_rows(min_row=2, values_only=True))
+    finally:
+        workbook.close()
+
+
+def _per_cell_lookup(path: str, headers) -> int:
+    """编译表头计划之前的逐列查找实现（仅用于对比）。"""
+    workbook, sheet = excelutil._open_sheet(path)
+    count = 0
+    try:
+        headers_ = excelutil._row_values(sheet, 0)
+        for row in sheet.iter_rows(min_row=2, values_only=True):
+            result = {}
+            for header_idx, header_ in enumerate(headers_):
+                header = listutil.find_first(
+                    list(filter(lambda h_: h_.index == header_idx, headers)))
+                if header is None:
+                    continue
+                col_name = objutil.default_if_none(header.name, header_)
+                value = row[header_idx]
+                result[col_name] = value if header.transformer is None else header.transformer(value)
+            count += 1 if result else 0
+    finally:
+        workbook.close()
+    return count
+
+
+def _compiled(path: str, headers) -> int:
+    return sum(1 for _ in excelutil.iter_excel(path, headers=headers))
+
+
+def _measure(label: str, func, path: str, headers, baseline: float = None) -> float:
+    started = time.perf_counter()
+    rows = func(path, headers)
+    elapsed = time.perf_counter() - started
+    speedup = f"{baseline / elapsed:>8.1f}x" if baseline else f"{'':>9}"
+    print(f"{label:<18} {rows:>8} {elapsed * 1000:>10.1f} ms {rows / elapsed:>12.0f} 行/秒 {speedup}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=5000)
+    parser.add_argument("--cols", type=int, default=200)
+    opts = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "bench.xlsx")
+        _build_workbook(path, opts.rows, opts.cols)
+        # 声明全部列，其中一半带 transformer
+        builder = excelutil.HeaderBuilder()
+        for c in range(opts.cols):
+            builder.append(c, f"field_{c}", str if c % 2 else None)
+        headers = builder.to_headers()
+
+        excelutil.sheet_cache.max_cells = 0  # 只比较解析路径，不使用内存缓存
+        _raw(path, headers)  # 预热：首次读取包含文件缓存等一次性开销
+        print(f"{opts.rows} 行 × {opts.cols} 列")
+        print(f"{'方式':<16} {'行数':>8} {'耗时':>13} {'吞吐':>16} {'相对逐列查找':>8}")
+        _measure("原始迭代", _raw, path, headers)
+        baseline = _measure("逐列查找", _per_cell_lookup, path, headers)
+        _measure("编译计划", _compiled, path, headers, baseline)
+        _measure("编译计划(无headers)", _compiled, path, None, baseline)
+        excelutil.to_columnar(path)
+        _measure("列式快照", _compiled, path, headers, baseline)
+
+
+if __name__ == "__main__":
+    main()
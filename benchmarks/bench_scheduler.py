@@ -0,0 +1,79 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+"""
+Scheduler 内存基准：每 1 万个任务 / 排队实例 / 被拒绝触发的内存占用（tracemalloc）。
+
+    python benchmarks/bench_scheduler.py [--jobs 10000] [--history 0]
+"""
+import argparse
+import gc
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from knify.scheduler import Scheduler  # noqa: E402
+
+_FLUSH_INTERVAL = 0.05
+
+
+def _noop(*args, **kwargs):
+    pass
+
+
+def _measure(label: str, count: int, action):
+    """执行 action 前后各取一次 tracemalloc 快照，输出总增量与单项均摊。"""
+    gc.collect()
+    before, _ = tracemalloc.get_traced_memory()
+    started = time.perf_counter()
+    result = action()
+    elapsed = time.perf_counter() - started
+    time.sleep(_FLUSH_INTERVAL * 4)  # 等事件线程把积压的日志事件消费完
+    gc.collect()
+    after, _ = tracemalloc.get_traced_memory()
+    delta = after - before
+    print(f"{label:<28} {count:>8} {delta / 1024 / 1024:>10.2f} MiB "
+          f"{delta / count:>10.0f} B/项 {elapsed * 1000:>10.1f} ms")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--history", type=int, default=0, help="Scheduler(history_size=...)")
+    opts = parser.parse_args()
+    n = opts.jobs
+
+    tracemalloc.start()
+    sched = Scheduler(max_workers=2, emit_logs=False, event_flush_interval=_FLUSH_INTERVAL,
+                      history_size=opts.history)
+    print(f"{'场景':<26} {'数量':>8} {'内存增量':>14} {'均摊':>12} {'耗时':>13}")
+
+    args, kwargs = ["x" * 32, 1, 2.0], {"key": "value", "n": 10}
+    _measure("add_job", n, lambda: [
+        sched.add_job(f"job_{i}", _noop, "0 0 1 1 *", args=args, kwargs=kwargs)
+        for i in range(n)])
+
+    # 一个实例占住槽位，其余触发进入 WAIT 队列（参数快照与任务共享）
+    release = threading.Event()
+    sched.add_job("blocker", release.wait, "0 0 1 1 *", max_queue_size=n, args=[30])
+    sched.trigger_job("blocker")
+    _measure("WAIT 排队实例", n, lambda: [sched.trigger_job("blocker") for _ in range(n)])
+
+    # DROP：并发满时的触发不创建实例
+    sched.add_job("dropper", release.wait, "0 0 1 1 *", blocking_strategy="DROP", args=[30])
+    sched.trigger_job("dropper")
+    _measure("DROP 拒绝触发", n, lambda: [sched.trigger_job("dropper") for _ in range(n)])
+
+    release.set()
+    sched.clear_blocked_queue("blocker")
+    sched.shutdown(wait=True, timeout=5)
+    tracemalloc.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,376 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+"""
+Scheduler 负载模拟与基准。
+
+两个场景：
+- 虚拟时钟模拟：N 个任务（混合 Cron 频率 / 执行时长 / 失败率 / 阻塞策略）在 VirtualClock 下
+  单步驱动，执行器池按虚拟时间完成任务，不需要真实等待。输出每秒投递数（真实耗时）、
+  调度延迟分位数（虚拟秒）、热路径（_submit / _dispatch / _tick_job）单次耗时、锁获取次数与内存。
+- 并发触发：真实时钟 + 线程池，多个线程并发 trigger_job，统计吞吐与锁竞争。
+
+    python benchmarks/sim_scheduler.py --jobs 1000 --duration 300
+    python benchmarks/sim_scheduler.py --json result.json
+    python benchmarks/sim_scheduler.py --baseline result.json --tolerance 0.2   # 退化时退出码为 1
+"""
+import argparse
+import heapq
+import json
+import os
+import random
+import sys
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+
+from knify.scheduler import (  # noqa: E402
+    DEFAULT_POOL, InstanceState, Scheduler, VirtualClock, _WorkerPool,
+)
+
+# (Cron, 权重)
+_CRON_MIX = (
+    ("* * * * * *", 0.2),
+    ("*/5 * * * * *", 0.3),
+    ("*/15 * * * * *", 0.2),
+    ("* * * * *", 0.2),
+    ("*/5 * * * *", 0.1),
+)
+_MEAN_DURATIONS = (0.05, 0.5, 2.0, 10.0)
+_STRATEGY_MIX = (("WAIT", 0.5), ("DROP", 0.3), ("COALESCE", 0.2))
+
+
+# --------------------------------------------------------------------------- #
+# 计数锁 / 带计时的调度器
+# --------------------------------------------------------------------------- #
+class _LockStats:
+    """多线程下不加锁累加，计数为近似值（足够用于比较竞争比例）。"""
+
+    def __init__(self):
+        self.acquired = 0
+        self.contended = 0
+
+    def snapshot(self) -> dict:
+        return {"acquired": self.acquired, "contended": self.contended}
+
+
+_LOCK_STATS = _LockStats()
+
+
+class _CountingLock:
+    """RLock 包装：先非阻塞尝试，失败即记一次竞争。"""
+    __slots__ = ("_lock",)
+
+    def __init__(self):
+        self._lock = threading.RLock()
+
+    def acquire(self, blocking: bool = True, timeout: float = -1) -> bool:
+        _LOCK_STATS.acquired += 1
+        if self._lock.acquire(False):
+            return True
+        _LOCK_STATS.contended += 1
+        return self._lock.acquire(blocking, timeout)
+
+    def release(self):
+        self._lock.release()
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+        return False
+
+
+class _InstrumentedScheduler(Scheduler):
+    """统计热路径耗时与首次投递的调度延迟。"""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.timings = {"_submit": [0, 0.0], "_dispatch": [0, 0.0], "_tick_job": [0, 0.0]}
+        self.lags = []
+
+    @staticmethod
+    def _new_lock():
+        return _CountingLock()
+
+    def _timed(self, name, func, *args):
+        started = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            stat = self.timings[name]
+            stat[0] += 1
+            stat[1] += time.perf_counter() - started
+
+    def _submit(self, job, source, scheduled_at=None):
+        return self._timed("_submit", super()._submit, job, source, scheduled_at)
+
+    def _dispatch(self, job, inst):
+        if inst.state != InstanceState.PENDING_RETRY and inst.scheduled_at:
+            self.lags.append(self._clock.time() - inst.scheduled_at)
+        return self._timed("_dispatch", super()._dispatch, job, inst)
+
+    def _tick_job(self, job, now_dt, now_ts):
+        return self._timed("_tick_job", super()._tick_job, job, now_dt, now_ts)
+
+
+# --------------------------------------------------------------------------- #
+# 虚拟时间执行器池
+# --------------------------------------------------------------------------- #
+class _SimTask:
+    """模拟任务：时长按指数分布抽样，按失败率抛异常。"""
+
+    def __init__(self, mean_duration: float, fail_rate: float, rng: random.Random):
+        self.mean_duration = mean_duration
+        self.fail_rate = fail_rate
+        self._rng = rng
+
+    def sample_duration(self) -> float:
+        return self._rng.expovariate(1.0 / self.mean_duration)
+
+    def __call__(self, *args, **kwargs):
+        if self._rng.random() < self.fail_rate:
+            raise RuntimeError("simulated failure")
+
+
+class _SimPool(_WorkerPool):
+    """单线程、按虚拟时间完成任务的执行器池；由模拟循环调用 complete_due 推进。"""
+
+    def __init__(self, name: str, max_workers: int, clock: VirtualClock):
+        super().__init__(name, max_workers, clock)
+        self._pending = []  # (-priority, seq, fut, func, args, kwargs, submitted_at)
+        self._busy = []     # (finish_at, seq, fut, func, args, kwargs, started_at)
+        self._idle = max_workers
+
+    def submit(self, func, args=(), kwargs=None, priority: int = 0) -> Future:
+        fut = Future()
+        self._submitted += 1
+        heapq.heappush(self._pending, (-priority, next(self._seq), fut, func, args,
+                                       kwargs or {}, self._clock.time()))
+        self._start_ready()
+        return fut
+
+    def _start_ready(self):
+        now = self._clock.time()
+        while self._idle and self._pending:
+            _, seq, fut, func, args, kwargs, submitted_at = heapq.heappop(self._pending)
+            if not fut.set_running_or_notify_cancel():
+                self._cancelled += 1
+                continue
+            fut.started_at = now
+            self._started += 1
+            self._idle -= 1
+            wait = now - submitted_at
+            self._wait_total += wait
+            self._wait_max = max(self._wait_max, wait)
+            self._wait_hist.observe(wait)
+            heapq.heappush(self._busy, (now + func.sample_duration(), seq, fut, func,
+                                        args, kwargs, now))
+
+    def next_completion(self):
+        return self._busy[0][0] if self._busy else None
+
+    def complete_due(self, now: float) -> int:
+        done = 0
+        while self._busy and self._busy[0][0] <= now:
+            finish_at, _, fut, func, args, kwargs, started_at = heapq.heappop(self._busy)
+            self._idle += 1
+            self._completed += 1
+            run = finish_at - started_at
+            self._run_total += run
+            self._run_max = max(self._run_max, run)
+            self._run_hist.observe(run)
+            try:
+                fut.set_result(func(*args, **kwargs))
+            except Exception as e:  # noqa - 模拟失败
+                fut.set_exception(e)
+            done += 1
+        self._start_ready()
+        return done
+
+
+# --------------------------------------------------------------------------- #
+# 场景
+# --------------------------------------------------------------------------- #
+def _pick(rng: random.Random, weighted):
+    return rng.choices([v for v, _ in weighted], weights=[w for _, w in weighted])[0]
+
+
+def _percentile(sorted_values, q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+def simulate(jobs: int, duration: float, workers: int, fail_rate: float, seed: int,
+             measure_memory: bool) -> dict:
+    rng = random.Random(seed)
+    start_ts = float(int(time.time()) // 60 * 60)  # 对齐整分钟，Cron 触发分布稳定
+    clock = VirtualClock(start_ts)
+    sched = _InstrumentedScheduler(emit_logs=False, clock=clock, max_workers=workers)
+    pool = _SimPool(DEFAULT_POOL, workers, clock)
+    sched._pools[DEFAULT_POOL] = pool  # 基准专用：替换默认线程池为虚拟时间池
+
+    if measure_memory:
+        tracemalloc.start()
+    for i in range(jobs):
+        mean = rng.choice(_MEAN_DURATIONS)
+        sched.add_job(
+            f"sim_{i}", _SimTask(mean, fail_rate, rng), _pick(rng, _CRON_MIX),
+            max_instances=rng.randint(1, 3),
+            blocking_strategy=_pick(rng, _STRATEGY_MIX),
+            max_queue_size=rng.choice((5, 20, 100)),
+            blocking_timeout=rng.choice((30, 300)),
+            retry_times=rng.choice((0, 0, 1, 2)),
+            retry_delay=rng.randint(1, 10),
+            timeout=max(1, int(mean * 3)) if rng.random() < 0.2 else None,
+        )
+
+    end_ts = start_ts + duration
+    started = time.perf_counter()
+    while True:
+        candidates = [t for t in (sched.next_deadline(), pool.next_completion()) if t is not None]
+        if not candidates or min(candidates) > end_ts:
+            break
+        clock.set(min(candidates))
+        pool.complete_due(clock.time())
+        sched.run_pending()
+    elapsed = time.perf_counter() - started
+
+    memory = None
+    if measure_memory:
+        current, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        memory = {"current_mib": current / 1024 / 1024, "peak_mib": peak / 1024 / 1024}
+
+    metrics = sched.get_metrics()["jobs"].values()
+    lags = sorted(sched.lags)
+    dispatches = sched.timings["_dispatch"][0]
+    return {
+        "jobs": jobs,
+        "virtual_seconds": duration,
+        "real_seconds": elapsed,
+        "dispatches": dispatches,
+        "dispatches_per_sec": dispatches / elapsed if elapsed else 0.0,
+        "lag_p50": _percentile(lags, 0.50),
+        "lag_p90": _percentile(lags, 0.90),
+        "lag_p99": _percentile(lags, 0.99),
+        "lag_max": lags[-1] if lags else 0.0,
+        "hot_path_us": {name: (total / calls * 1e6 if calls else 0.0)
+                        for name, (calls, total) in sched.timings.items()},
+        "outcomes": {key: sum(m[key] for m in metrics)
+                     for key in ("success", "failed", "rejected", "retries", "timeouts",
+                                 "coalesced")},
+        "memory": memory,
+    }
+
+
+def contention(jobs: int, threads: int, triggers: int, workers: int) -> dict:
+    """真实时钟：多个线程并发手动触发，统计吞吐与任务锁竞争。"""
+    before = _LOCK_STATS.snapshot()
+    sched = _InstrumentedScheduler(emit_logs=False, max_workers=workers)
+    for i in range(jobs):
+        sched.add_job(f"hot_{i}", _noop, "0 0 1 1 *", max_instances=4, blocking_strategy="DROP")
+    sched.start(block=False)
+
+    def worker(seed: int):
+        rng = random.Random(seed)
+        for _ in range(triggers):
+            sched.trigger_job(f"hot_{rng.randrange(jobs)}")
+
+    pool = [threading.Thread(target=worker, args=(i,)) for i in range(threads)]
+    started = time.perf_counter()
+    for t in pool:
+        t.start()
+    for t in pool:
+        t.join()
+    elapsed = time.perf_counter() - started
+    sched.shutdown(wait=True, timeout=10)
+    after = _LOCK_STATS.snapshot()
+    acquired = after["acquired"] - before["acquired"]
+    contended = after["contended"] - before["contended"]
+    return {
+        "threads": threads,
+        "triggers": threads * triggers,
+        "triggers_per_sec": threads * triggers / elapsed if elapsed else 0.0,
+        "lock_acquired": acquired,
+        "lock_contended": contended,
+        "contention_ratio": contended / acquired if acquired else 0.0,
+    }
+
+
+def _noop():
+    pass
+
+
+def _report(sim: dict, cont: dict):
+    print(f"虚拟时钟模拟：{sim['jobs']} 个任务，虚拟 {sim['virtual_seconds']:.0f}s，"
+          f"真实 {sim['real_seconds']:.2f}s")
+    print(f"  投递 {sim['dispatches']} 次，{sim['dispatches_per_sec']:.0f} 次/秒")
+    print(f"  调度延迟(虚拟秒) p50={sim['lag_p50']:.3f} p90={sim['lag_p90']:.3f} "
+          f"p99={sim['lag_p99']:.3f} max={sim['lag_max']:.3f}")
+    print("  热路径单次耗时(us) " + " ".join(f"{k}={v:.1f}" for k, v in sim["hot_path_us"].items()))
+    print("  结果 " + " ".join(f"{k}={v}" for k, v in sim["outcomes"].items()))
+    if sim["memory"]:
+        print(f"  内存 current={sim['memory']['current_mib']:.1f}MiB "
+              f"peak={sim['memory']['peak_mib']:.1f}MiB")
+    print(f"并发触发：{cont['threads']} 线程 × {cont['triggers'] // max(cont['threads'], 1)} 次")
+    print(f"  {cont['triggers_per_sec']:.0f} 次/秒，任务锁获取 {cont['lock_acquired']} 次，"
+          f"竞争 {cont['lock_contended']} 次 ({cont['contention_ratio']:.2%})")
+
+
+def _check_regression(result: dict, baseline: dict, tolerance: float) -> list:
+    problems = []
+    sim, base = result["simulation"], baseline["simulation"]
+    if sim["dispatches_per_sec"] < base["dispatches_per_sec"] * (1 - tolerance):
+        problems.append(f"dispatches_per_sec {sim['dispatches_per_sec']:.0f} < "
+                        f"基线 {base['dispatches_per_sec']:.0f}")
+    for name, us in sim["hot_path_us"].items():
+        if us > base["hot_path_us"].get(name, us) * (1 + tolerance):
+            problems.append(f"{name} {us:.1f}us > 基线 {base['hot_path_us'][name]:.1f}us")
+    if sim["lag_p99"] > base["lag_p99"] * (1 + tolerance) + 0.01:
+        problems.append(f"lag_p99 {sim['lag_p99']:.3f}s > 基线 {base['lag_p99']:.3f}s")
+    return problems
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=1000)
+    parser.add_argument("--duration", type=float, default=300, help="模拟的虚拟秒数")
+    parser.add_argument("--workers", type=int, default=256)
+    parser.add_argument("--fail-rate", type=float, default=0.05)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--memory", action="store_true", help="用 tracemalloc 统计内存（较慢）")
+    parser.add_argument("--trigger-threads", type=int, default=4)
+    parser.add_argument("--triggers", type=int, default=5000, help="每个线程的触发次数")
+    parser.add_argument("--json", help="结果写入 JSON 文件")
+    parser.add_argument("--baseline", help="与基线 JSON 比较，退化超过 tolerance 时退出码为 1")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    opts = parser.parse_args()
+
+    sim = simulate(opts.jobs, opts.duration, opts.workers, opts.fail_rate, opts.seed,
+                   opts.memory)
+    cont = contention(min(opts.jobs, 100), opts.trigger_threads, opts.triggers, opts.workers)
+    _report(sim, cont)
+    result = {"simulation": sim, "contention": cont}
+    if opts.json:
+        with open(opts.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    if opts.baseline:
+        with open(opts.baseline, encoding="utf-8") as f:
+            problems = _check_regression(result, json.load(f), opts.tolerance)
+        for problem in problems:
+            print(f"退化: {problem}")
+        if problems:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,16 +1,29 @@
 #!/usr/bin/env python
 # -*- coding:utf-8 -*-
 # Author: qicongsheng
+import datetime
 import json
+import math
+import mmap
 import os
-import re
-from typing import Callable
+import struct
+import threading
+from array import array
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from operator import itemgetter
+from typing import Callable, Iterator
+from xml.etree.ElementTree import ParseError, iterparse
 
 import xlrd
 from openpyxl import Workbook
 from openpyxl.reader.excel import load_workbook
-from openpyxl.styles import PatternFill, Alignment, Border, Side
+from openpyxl.cell.cell import Cell
+from openpyxl.styles import PatternFill, Alignment, Border, Side, NamedStyle
 from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.dimensions import DEFAULT_COLUMN_WIDTH
+from openpyxl.xml.constants import SHEET_MAIN_NS
 
 from knify import listutil
 from knify import logger
@@ -59,97 +72,891 @@ class HeaderBuilder:
         return self.headers
 
 
-def read_excel(file_path: str, sheet: str | int | None = 0,
-               headers: list[Header] | None = None, start_row: int = 1,
-               header_row: int = 0) -> list[object]:
-    results = []
-    workbook = load_workbook(filename=file_path)
+class SheetCache:
+    """
+    已解析sheet的LRU缓存：键为文件指纹 (绝对路径, mtime_ns, 文件大小) 加sheet，文件被修改后自然失效
+    同一个未修改文件先后调用read_headers、read_excel、process_data、compare时只解析一次XML；
+    流式接口（iter_excel、iter_process_data、read_columns）命中时读取缓存，但不填充缓存
+    缓存内容是不可变的tuple，返回给调用方的列表都是副本
+    按缓存的单元格总数限制内存，超过max_cells的sheet不缓存；max_cells为0时关闭缓存
+    """
+
+    def __init__(self, max_cells: int = 2_000_000):
+        self.max_cells = max_cells
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()  # key -> (单元格数, 值)
+        self._cells = 0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(file_path: str, kind: str, sheet) -> tuple:
+        stat = os.stat(file_path)
+        return os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size, kind, sheet
+
+    def get(self, key: tuple):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def put(self, key: tuple, value, cells: int):
+        if cells > self.max_cells or self.max_cells <= 0:
+            return
+        with self._lock:
+            # 同一路径的旧版本文件不会再被命中，直接丢弃
+            for stale in [k for k in self._entries if k[0] == key[0] and k[1:3] != key[1:3] or k == key]:
+                self._cells -= self._entries.pop(stale)[0]
+            self._entries[key] = (cells, value)
+            self._cells += cells
+            while self._cells > self.max_cells:
+                _, (evicted, _) = self._entries.popitem(last=False)
+                self._cells -= evicted
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._cells = 0
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"entries": len(self._entries), "cells": self._cells, "max_cells": self.max_cells,
+                    "hits": self.hits, "misses": self.misses}
+
+
+# 模块级缓存，excelutil的读取函数共用
+sheet_cache = SheetCache()
+
+
+def _open_sheet(file_path: str, sheet: str | int | None = 0):
+    # 只读模式按需解析XML，不在内存中构建全部单元格对象；用完需要close释放文件句柄
+    workbook = load_workbook(filename=file_path, read_only=True)
     sheet_ = workbook[sheet] if isinstance(sheet, str) else workbook[
         workbook.sheetnames[sheet]]
-    headers_ = [cell.value for cell in sheet_[header_row + 1]]
-    for row_idx, row in enumerate(sheet_.rows):
-        if row_idx < start_row:
-            continue
-        result = {}
-        for header_idx, header_ in enumerate(headers_):
-            # 没有传入headers,使用默认header
-            if listutil.is_empty(headers):
-                result[header_] = row[header_idx].value
-            # 传入了headers
+    return workbook, sheet_
+
+
+def _row_values(sheet_, row_idx: int) -> list[object]:
+    # row_idx从0开始
+    for row in sheet_.iter_rows(min_row=row_idx + 1, max_row=row_idx + 1, values_only=True):
+        return list(row)
+    return []
+
+
+def _parse_sheet_rows(file_path: str, sheet: str | int | None = 0, first_row: int = 0) -> Iterator[tuple]:
+    # 直接解析工作簿（不经过缓存和列式快照），xlsx为只读流式读取，xls使用xlrd
+    if file_path.endswith('.xls'):
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet_ = workbook.sheet_by_name(sheet) if isinstance(sheet, str) else workbook.sheet_by_index(sheet)
+            for i in range(first_row, sheet_.nrows):
+                yield tuple(sheet_.row_values(i))
+        finally:
+            workbook.release_resources()
+    else:
+        workbook, sheet_ = _open_sheet(file_path, sheet)
+        try:
+            yield from sheet_.iter_rows(min_row=first_row + 1, values_only=True)
+        finally:
+            workbook.close()
+
+
+def _sheet_rows(file_path: str, sheet: str | int | None = 0, min_row: int = 0,
+                fill_cache: bool = False) -> Iterator[tuple]:
+    """
+    逐行生成sheet从第min_row行（从0开始）起的行值
+    依次尝试sheet_cache、列式快照（见to_columnar），都没有时解析工作簿：
+    fill_cache为True时从第0行读起，读完后把行值放入缓存（超过上限则放弃缓存）；
+    流式接口不填充缓存以保持内存占用与文件大小无关，只有本身就要物化全部结果的接口才填充
+    """
+    key = SheetCache.key(file_path, 'rows', sheet)
+    rows = sheet_cache.get(key)
+    if rows is not None:
+        yield from islice(rows, min_row, None)
+        return
+    snapshot = open_columnar(file_path, sheet)
+    if snapshot is not None:
+        with snapshot:
+            yield from snapshot.iter_rows(min_row)
+        return
+
+    first_row = 0 if fill_cache else min_row
+    limit = sheet_cache.max_cells
+    buffer, cells = ([] if fill_cache and limit > 0 else None), 0
+    for row_idx, row in enumerate(_parse_sheet_rows(file_path, sheet, first_row), first_row):
+        if buffer is not None:
+            cells += len(row)
+            if cells > limit:
+                buffer = None
             else:
-                header = listutil.find_first(
-                    list(filter(lambda h_: h_.index == header_idx, headers)))
-                if header is None:
-                    continue
-                else:
-                    col_name = objutil.default_if_none(header.name, header_)
-                    cell_value = row[header_idx].value
-                    cell_value = cell_value if header.transformer is None else header.transformer(
-                        row[header_idx].value)
-                    result[col_name] = cell_value
-        if objutil.has_keys(result):
-            results.append(result)
-    return results
+                buffer.append(row)
+        if row_idx >= min_row:
+            yield row
+    # 只有完整读完的sheet才放入缓存
+    if buffer is not None:
+        sheet_cache.put(key, buffer, cells)
+
+
+def _compile_projector(headers_: list[object],
+                       headers: list[Header] | None = None) -> Callable[[tuple], dict]:
+    """
+    把表头行与HeaderBuilder的headers编译一次为 (列号, 字段名, transformer) 计划，
+    返回把一行值投影为行字典的函数；逐行读取时不再按列查找header
+    """
+    plan = []
+    if listutil.is_empty(headers):
+        # 没有传入headers,使用默认header
+        plan = [(idx, header_, None) for idx, header_ in enumerate(headers_)]
+    else:
+        # 同一列声明了多个header时取第一个
+        by_index = {}
+        for header in headers:
+            by_index.setdefault(header.index, header)
+        for idx, header_ in enumerate(headers_):
+            header = by_index.get(idx)
+            if header is not None:
+                plan.append((idx, objutil.default_if_none(header.name, header_), header.transformer))
+
+    width = len(headers_)
+    names = [name for _, name, _ in plan]
+    indexes = [idx for idx, _, _ in plan]
+
+    def pad(row):
+        # 只读模式下行尾的空单元格可能被省略
+        return row if len(row) >= width else tuple(row) + (None,) * (width - len(row))
+
+    if any(transformer is not None for _, _, transformer in plan):
+        def project(row):
+            row = pad(row)
+            return {name: row[idx] if transformer is None else transformer(row[idx])
+                    for idx, name, transformer in plan}
+    elif indexes == list(range(len(indexes))):
+        # 连续的前N列：直接按位置zip，多出的列被截断
+        def project(row):
+            return dict(zip(names, pad(row)))
+    else:
+        getter = itemgetter(*indexes) if len(indexes) > 1 else (lambda row: (row[indexes[0]],))
+
+        def project(row):
+            return dict(zip(names, getter(pad(row))))
+    return project
+
+
+def iter_excel(file_path: str, sheet: str | int | None = 0,
+               headers: list[Header] | None = None, start_row: int = 1,
+               header_row: int = 0) -> Iterator[dict]:
+    """
+    流式读取Excel，逐行生成行字典，内存占用与文件大小无关
+    参数含义同read_excel；生成器未迭代完时可调用close()提前释放文件
+    命中sheet_cache时从缓存读取，但不填充缓存
+    """
+    return _iter_excel(file_path, sheet, headers, start_row, header_row, fill_cache=False)
+
+
+def _iter_excel(file_path, sheet, headers, start_row, header_row, fill_cache) -> Iterator[dict]:
+    project = _compile_projector(read_headers(file_path, sheet, header_row), headers)
+    for row in _sheet_rows(file_path, sheet, start_row, fill_cache):
+        result = project(row)
+        if result:
+            yield result
+
+
+def read_excel(file_path: str, sheet: str | int | None = 0,
+               headers: list[Header] | None = None, start_row: int = 1,
+               header_row: int = 0) -> list[object]:
+    # 结果本身已在内存中，顺带填充sheet_cache，后续对同一文件的读取不再解析
+    return list(_iter_excel(file_path, sheet, headers, start_row, header_row, fill_cache=True))
 
 
 def read_headers(file_path: str, sheet: str | int | None = 0,
                  header_row: int = 0):
-    workbook = load_workbook(filename=file_path)
-    sheet_ = workbook[sheet] if isinstance(sheet, str) else workbook[
-        workbook.sheetnames[sheet]]
-    return [cell.value for cell in sheet_[header_row + 1]]
+    rows = sheet_cache.get(SheetCache.key(file_path, 'rows', sheet))
+    if rows is not None:
+        return list(rows[header_row]) if header_row < len(rows) else []
+    snapshot = open_columnar(file_path, sheet)
+    if snapshot is not None:
+        with snapshot:
+            return list(snapshot.row(header_row)) if header_row < snapshot.nrows else []
+    # 未命中时只解析到表头行，不为读表头填充整个sheet的缓存
+    if file_path.endswith('.xls'):
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet_ = workbook.sheet_by_name(sheet) if isinstance(sheet, str) else workbook.sheet_by_index(sheet)
+            return sheet_.row_values(header_row) if header_row < sheet_.nrows else []
+        finally:
+            workbook.release_resources()
+    workbook, sheet_ = _open_sheet(file_path, sheet)
+    try:
+        return _row_values(sheet_, header_row)
+    finally:
+        workbook.close()
+
+
+def _import_numpy():
+    # numpy是可选依赖，只在列式读取时导入
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("列式读取需要numpy: pip install knify[columnar]") from None
+    return numpy
+
+
+class DictColumn:
+    """
+    字典编码的字符串列：codes为每行在categories中的下标（int32，-1表示空值），相同字符串只存一份
+    按值过滤先把值换成下标，再在codes上做整数比较
+    """
 
+    def __init__(self, codes, categories: list[str]):
+        self.codes = codes
+        self.categories = categories
+        self._lookup = None
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def __getitem__(self, item):
+        if isinstance(item, int):
+            code = self.codes[item]
+            return None if code < 0 else self.categories[code]
+        # 切片 / 布尔掩码 / 下标数组：共享categories
+        return DictColumn(self.codes[item], self.categories)
+
+    def code_of(self, value) -> int:
+        if self._lookup is None:
+            self._lookup = {category: code for code, category in enumerate(self.categories)}
+        return self._lookup.get(value, -2)  # 不存在的值返回-2，不会匹配任何行
+
+    def equals(self, value):
+        """等于value的行掩码"""
+        return self.codes == (-1 if value is None else self.code_of(value))
+
+    def isin(self, values):
+        """取值在values中的行掩码"""
+        np = _import_numpy()
+        return np.isin(self.codes, [-1 if v is None else self.code_of(v) for v in values])
+
+    def value_counts(self) -> dict:
+        np = _import_numpy()
+        counts = np.bincount(self.codes[self.codes >= 0], minlength=len(self.categories))
+        return {category: int(n) for category, n in zip(self.categories, counts) if n}
+
+    def to_list(self) -> list:
+        categories = self.categories
+        return [None if code < 0 else categories[code] for code in self.codes.tolist()]
+
+
+_EPOCH = datetime.datetime(1970, 1, 1)
+_ONE_US = datetime.timedelta(microseconds=1)
+_NAT = -2 ** 63  # numpy datetime64的NaT
+_COLUMN_KINDS = {int: 'int', float: 'float', bool: 'bool', str: 'str', datetime.datetime: 'datetime'}
+
+
+class _ColumnBuilder:
+    """
+    逐行累积一列：按首个非空值推断类型，写入紧凑的array缓冲区而不是Python对象列表
+    int遇到float提升为float；其他类型冲突时退化为object列
+    """
+    __slots__ = ('kind', 'data', 'nulls', 'lookup', 'categories', 'size')
+
+    def __init__(self):
+        self.kind = None  # None表示目前只有空值
+        self.data = None
+        self.nulls = None  # int列的空值掩码，出现空值时才创建
+        self.lookup = None
+        self.categories = None
+        self.size = 0
+
+    def append(self, value):
+        if value is None or value == '':
+            self._append_null()
+        else:
+            kind = _COLUMN_KINDS.get(type(value), 'object')
+            if self.kind is None:
+                self._start(kind)
+            try:
+                self._append_value(kind, value)
+            except (OverflowError, TypeError):
+                self._to_object()
+                self.data.append(value)
+        self.size += 1
+
+    def _start(self, kind):
+        leading = self.size
+        self.kind = kind
+        if kind == 'int':
+            self.data = array('q', bytes(8 * leading))
+            if leading:
+                self.nulls = bytearray(b'\x01' * leading)
+        elif kind == 'float':
+            self.data = array('d', [math.nan]) * leading
+        elif kind == 'str':
+            self.data = array('i', [-1]) * leading
+            self.lookup, self.categories = {}, []
+        elif kind == 'datetime':
+            self.data = array('q', [_NAT]) * leading
+        else:
+            # bool与其他类型的空值只能用object列表示
+            self.kind = 'object' if leading or kind != 'bool' else kind
+            self.data = [None] * leading if self.kind == 'object' else array('b')
+
+    def _append_null(self):
+        kind = self.kind
+        if kind is None:
+            return
+        if kind == 'int':
+            if self.nulls is None:
+                self.nulls = bytearray(len(self.data))
+            self.data.append(0)
+            self.nulls.append(1)
+        elif kind == 'float':
+            self.data.append(math.nan)
+        elif kind == 'str':
+            self.data.append(-1)
+        elif kind == 'datetime':
+            self.data.append(_NAT)
+        else:
+            if kind == 'bool':
+                self._to_object()
+            self.data.append(None)
+
+    def _append_value(self, kind, value):
+        current = self.kind
+        if kind == current:
+            if kind == 'str':
+                code = self.lookup.get(value)
+                if code is None:
+                    code = self.lookup[value] = len(self.categories)
+                    self.categories.append(value)
+                self.data.append(code)
+            elif kind == 'datetime':
+                self.data.append((value - _EPOCH) // _ONE_US)
+            else:
+                self.data.append(value)
+                if self.nulls is not None:
+                    self.nulls.append(0)
+        elif current == 'float' and kind == 'int':
+            self.data.append(float(value))
+        elif current == 'int' and kind == 'float':
+            nulls = self.nulls or ()
+            self.data = array('d', [math.nan if i < len(nulls) and nulls[i] else v
+                                    for i, v in enumerate(self.data)])
+            self.kind, self.nulls = 'float', None
+            self.data.append(value)
+        else:
+            raise TypeError(kind)
+
+    def _to_object(self):
+        if self.kind == 'object':
+            return
+        self.data = self._values() if self.kind is not None else [None] * self.size
+        self.kind, self.nulls, self.lookup, self.categories = 'object', None, None, None
+
+    def _values(self) -> list:
+        kind, data = self.kind, self.data
+        if kind == 'int':
+            nulls = self.nulls
+            return [None if nulls is not None and nulls[i] else v for i, v in enumerate(data)]
+        if kind == 'float':
+            return [None if v != v else v for v in data]
+        if kind == 'str':
+            return [None if code < 0 else self.categories[code] for code in data]
+        if kind == 'datetime':
+            return [None if v == _NAT else _EPOCH + v * _ONE_US for v in data]
+        if kind == 'bool':
+            return [bool(v) for v in data]
+        return list(data)
+
+    def build(self, np):
+        kind, data = self.kind, self.data
+        if kind is None:
+            return np.full(self.size, np.nan)
+        if kind == 'int':
+            column = np.frombuffer(data, dtype=np.int64)
+            if self.nulls is not None and any(self.nulls):
+                column = column.astype(np.float64)
+                column[np.frombuffer(self.nulls, dtype=np.bool_)] = np.nan
+            return column
+        if kind == 'float':
+            return np.frombuffer(data, dtype=np.float64)
+        if kind == 'bool':
+            return np.frombuffer(data, dtype=np.int8).astype(np.bool_)
+        if kind == 'str':
+            return DictColumn(np.frombuffer(data, dtype=np.int32), self.categories)
+        if kind == 'datetime':
+            return np.frombuffer(data, dtype=np.int64).view('datetime64[us]')
+        column = np.empty(len(data), dtype=object)
+        column[:] = data
+        return column
+
+
+def read_columns(file_path: str, sheet: str | int | None = 0, columns: list[str] | None = None,
+                 start_row: int = 1, header_row: int = 0) -> dict:
+    """
+    列式读取Excel：返回 {列名: 列}，不构建行字典
+    数值列为numpy数组（int64；含空值的整数列为float64，空值为NaN），布尔列为bool数组，
+    日期时间列为datetime64[us]（空值为NaT），字符串列为字典编码的DictColumn，
+    混合类型列为object数组；空字符串视为空值
+    :param columns: 只读取这些列（默认全部）
+    需要安装numpy: pip install knify[columnar]
+    """
+    np = _import_numpy()
+    headers_ = read_headers(file_path, sheet, header_row)
+    # 列式结果本身就是紧凑的，不再额外缓存一份行值
+    rows = _sheet_rows(file_path, sheet, start_row)
+    if columns is None:
+        indexes = list(range(len(headers_)))
+    else:
+        missing = [name for name in columns if name not in headers_]
+        if missing:
+            raise ValueError(f"列不存在: {missing}")
+        indexes = [headers_.index(name) for name in columns]
+    builders = [_ColumnBuilder() for _ in indexes]
+    pairs = list(zip(indexes, builders))
+    for row in rows:
+        width = len(row)
+        for idx, builder in pairs:
+            builder.append(row[idx] if idx < width else None)
+    return {headers_[idx]: builder.build(np) for idx, builder in pairs}
+
+
+# 列式快照文件布局（小端）：
+#   文件头 8s魔数 + u32版本 + u32保留 + u64元数据偏移 + u64元数据长度
+#   每列两段：类型标记（每行1字节）与取值（每行8字节，按标记解释为int64或float64）
+#   字符串表：u64偏移数组（count + 1项）与UTF-8数据
+#   元数据为JSON，记录源文件指纹、行列数、列宽和各段偏移；各段按8字节对齐
+_COLUMNAR_MAGIC = b'KNIFYCOL'
+_COLUMNAR_VERSION = 1
+_COLUMNAR_HEADER = struct.Struct('<8sIIQQ')
+_COLUMNAR_SUFFIX = '.kcol'
+_INT64 = struct.Struct('<q')
+_FLOAT64 = struct.Struct('<d')
+
+# 单元格类型标记
+_TAG_NONE, _TAG_INT, _TAG_FLOAT, _TAG_STR, _TAG_BOOL = 0, 1, 2, 3, 4
+_TAG_DATETIME, _TAG_DATE, _TAG_TIME, _TAG_TIMEDELTA, _TAG_BIGINT = 5, 6, 7, 8, 9
+_MIDNIGHT = datetime.datetime(1, 1, 1)
+
+
+def columnar_path(file_path: str, sheet: str | int | None = 0) -> str:
+    """sheet对应的列式快照路径：与工作簿同目录，如 data.xlsx.0.kcol"""
+    return f"{file_path}.{sheet}{_COLUMNAR_SUFFIX}"
+
+
+def _source_fingerprint(file_path: str) -> dict:
+    stat = os.stat(file_path)
+    return {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+
+
+class _ColumnWriter:
+    """按行追加一列的类型标记与8字节取值"""
+    __slots__ = ('tags', 'values')
+
+    def __init__(self, leading: int = 0):
+        self.tags = bytearray(leading)
+        self.values = bytearray(8 * leading)
+
+    def append(self, value, strings: dict):
+        tag, bits = _encode_cell(value, strings)
+        self.tags.append(tag)
+        self.values += bits
+
+
+def _encode_cell(value, strings: dict) -> tuple:
+    # 返回 (类型标记, 8字节取值)；无法用8字节表示的值存入字符串表
+    kind = type(value)
+    if value is None:
+        return _TAG_NONE, bytes(8)
+    if kind is bool:
+        return _TAG_BOOL, _INT64.pack(value)
+    if kind is int:
+        if -2 ** 63 <= value < 2 ** 63:
+            return _TAG_INT, _INT64.pack(value)
+        return _TAG_BIGINT, _INT64.pack(_intern(strings, str(value)))
+    if kind is float:
+        return _TAG_FLOAT, _FLOAT64.pack(value)
+    if kind is datetime.datetime and value.tzinfo is None:
+        return _TAG_DATETIME, _INT64.pack((value - _EPOCH) // _ONE_US)
+    if kind is datetime.date:
+        return _TAG_DATE, _INT64.pack(value.toordinal())
+    if kind is datetime.time and value.tzinfo is None:
+        return _TAG_TIME, _INT64.pack((datetime.datetime.combine(_MIDNIGHT, value) - _MIDNIGHT) // _ONE_US)
+    if kind is datetime.timedelta:
+        return _TAG_TIMEDELTA, _INT64.pack(value // _ONE_US)
+    return _TAG_STR, _INT64.pack(_intern(strings, str(value)))
+
+
+def _intern(strings: dict, value: str) -> int:
+    code = strings.get(value)
+    if code is None:
+        code = strings[value] = len(strings)
+    return code
+
+
+def _xlsx_column_widths(file_path: str, sheet: str | int | None, width: int) -> list:
+    """
+    按_load_xlsx_sheet的规则读取列宽：只解析sheet XML中sheetData之前的<cols>，不加载单元格
+    <col>的宽度记在其min列上，未设置宽度时为openpyxl的默认值，没有<col>的列为Excel默认列宽
+    依赖openpyxl只读模式的内部属性定位sheet XML；不可用时退回_load_xlsx_sheet的完整解析
+    """
+    workbook, sheet_ = _open_sheet(file_path, sheet)
+    try:
+        archive = getattr(workbook, '_archive', None)
+        worksheet_path = getattr(sheet_, '_worksheet_path', None)
+        sheet_index = workbook.sheetnames.index(sheet_.title)
+        if archive is not None and worksheet_path is not None:
+            dimensions = {}
+            try:
+                with archive.open(worksheet_path) as source:
+                    for _, element in iterparse(source, events=('start',)):
+                        if element.tag == f'{{{SHEET_MAIN_NS}}}col':
+                            dimensions[int(element.get('min'))] = float(element.get('width', DEFAULT_COLUMN_WIDTH))
+                        elif element.tag == f'{{{SHEET_MAIN_NS}}}sheetData':
+                            break
+            except (KeyError, ValueError, TypeError, AttributeError, ParseError):
+                dimensions = None
+            if dimensions is not None:
+                return [dimensions.get(col_idx, 8.43) for col_idx in range(1, width + 1)]
+    finally:
+        workbook.close()
+    with WorkbookSession(file_path) as session:
+        return list(session.load(sheet_index)[2])
+
+
+def to_columnar(file_path: str, sheet: str | int | None = 0, output_path: str | None = None) -> str:
+    """
+    把sheet一次性转换为列式快照（类型化的列 + 字符串表），返回快照路径
+    快照放在默认路径（columnar_path）时，read_headers / read_excel / process_data / compare等
+    在源文件未修改的情况下自动改为读取快照，不再解析XML；源文件修改后快照自动失效
+    """
+    fingerprint = _source_fingerprint(file_path)
+    output_path = output_path or columnar_path(file_path, sheet)
+    columns, strings, nrows = [], {}, 0
+    for row in _parse_sheet_rows(file_path, sheet):
+        while len(columns) < len(row):
+            columns.append(_ColumnWriter(nrows))
+        for col_idx, column in enumerate(columns):
+            column.append(row[col_idx] if col_idx < len(row) else None, strings)
+        nrows += 1
 
-def load_excel_data(file_path, sheet_index):
-    """通用Excel加载函数，支持xls和xlsx格式"""
     if file_path.endswith('.xls'):
-        wb = xlrd.open_workbook(file_path)
-        sheet = wb.sheet_by_index(sheet_index)
-        headers = sheet.row_values(0)
-        data = [sheet.row_values(i) for i in range(1, sheet.nrows)]
-        return headers, data, None, sheet.name  # xls格式不获取列宽
+        workbook = xlrd.open_workbook(file_path, on_demand=True)
+        try:
+            sheet_name = sheet if isinstance(sheet, str) else workbook.sheet_names()[sheet]
+        finally:
+            workbook.release_resources()
+        column_widths = None  # xls格式不获取列宽
     else:
-        from openpyxl import load_workbook
-        wb = load_workbook(file_path)
-        sheet = wb[wb.sheetnames[sheet_index]]
-        headers = [cell.value for cell in next(sheet.iter_rows())]
-        data = [[cell.value for cell in row] for row in sheet.iter_rows(min_row=2)]
-
-        # 获取列宽信息
-        column_widths = []
-        for col_idx in range(1, len(headers) + 1):
-            col_letter = get_column_letter(col_idx)
-            column_dim = sheet.column_dimensions.get(col_letter)
-            if column_dim and column_dim.width is not None:
-                column_widths.append(column_dim.width)
+        workbook, sheet_ = _open_sheet(file_path, sheet)
+        sheet_name = sheet_.title
+        workbook.close()
+        column_widths = _xlsx_column_widths(file_path, sheet, len(columns))
+
+    encoded = [value.encode('utf-8') for value in strings]
+    string_offsets = array('q', [0])
+    for value in encoded:
+        string_offsets.append(string_offsets[-1] + len(value))
+
+    tmp_path = f"{output_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(bytes(_COLUMNAR_HEADER.size))
+
+        def write_section(data) -> int:
+            f.write(bytes(-f.tell() % 8))
+            offset = f.tell()
+            f.write(data)
+            return offset
+
+        layout = [{"tags": write_section(column.tags), "values": write_section(column.values)}
+                  for column in columns]
+        strings_meta = {"count": len(encoded), "offsets": write_section(string_offsets.tobytes()),
+                        "data": write_section(b''.join(encoded))}
+        meta = json.dumps({"source": fingerprint, "sheet": sheet, "sheet_name": sheet_name,
+                           "nrows": nrows, "ncols": len(columns), "column_widths": column_widths,
+                           "columns": layout, "strings": strings_meta}, ensure_ascii=False).encode('utf-8')
+        meta_offset = write_section(meta)
+        f.seek(0)
+        f.write(_COLUMNAR_HEADER.pack(_COLUMNAR_MAGIC, _COLUMNAR_VERSION, 0, meta_offset, len(meta)))
+    os.replace(tmp_path, output_path)
+    return output_path
+
+
+def open_columnar(file_path: str, sheet: str | int | None = 0):
+    """打开sheet的列式快照；快照不存在或源文件已修改时返回None"""
+    path = columnar_path(file_path, sheet)
+    if not os.path.exists(path):
+        return None
+    snapshot = ColumnarSheet(path)
+    if snapshot.source != _source_fingerprint(file_path):
+        snapshot.close()
+        return None
+    return snapshot
+
+
+class ColumnarSheet:
+    """
+    列式快照的内存映射读取器：列数据直接从mmap上按memoryview访问，不复制、不解析
+    column_data(j)返回 (类型标记, int64视图, float64视图) 三个零拷贝视图；row(i)/column(j)返回Python值
+    用完需要close，或使用with；调用方自行切出的视图需要在close之前释放
+    """
+
+    def __init__(self, path: str):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._views = []
+        try:
+            magic, version, _, meta_offset, meta_length = _COLUMNAR_HEADER.unpack_from(self._mmap, 0)
+            if magic != _COLUMNAR_MAGIC or version != _COLUMNAR_VERSION:
+                raise ValueError(f"不是有效的列式快照文件: {path}")
+            meta = json.loads(self._mmap[meta_offset:meta_offset + meta_length])
+        except Exception:
+            self._mmap.close()
+            raise
+        self.source = meta["source"]
+        self.sheet_name = meta["sheet_name"]
+        self.column_widths = meta["column_widths"]
+        self.nrows = nrows = meta["nrows"]
+        self.ncols = meta["ncols"]
+        self._tags, self._ints, self._floats = [], [], []
+        for column in meta["columns"]:
+            self._tags.append(self._view(column["tags"], nrows))
+            self._ints.append(self._view(column["values"], 8 * nrows, 'q'))
+            self._floats.append(self._view(column["values"], 8 * nrows, 'd'))
+        strings = meta["strings"]
+        self._string_offsets = self._view(strings["offsets"], 8 * (strings["count"] + 1), 'q')
+        self._string_data = self._view(strings["data"], self._string_offsets[-1])
+        self._strings = [None] * strings["count"]
+
+    def _view(self, offset: int, length: int, fmt: str = 'B') -> memoryview:
+        view = memoryview(self._mmap)[offset:offset + length]
+        self._views.append(view)
+        if fmt != 'B':
+            view = view.cast(fmt)
+            self._views.append(view)
+        return view
+
+    def _string(self, code: int) -> str:
+        value = self._strings[code]
+        if value is None:
+            offsets = self._string_offsets
+            value = self._strings[code] = str(self._string_data[offsets[code]:offsets[code + 1]], 'utf-8')
+        return value
+
+    def _value(self, col_idx: int, row_idx: int):
+        tag = self._tags[col_idx][row_idx]
+        if tag == _TAG_NONE:
+            return None
+        if tag == _TAG_FLOAT:
+            return self._floats[col_idx][row_idx]
+        bits = self._ints[col_idx][row_idx]
+        if tag == _TAG_INT:
+            return bits
+        if tag == _TAG_STR:
+            return self._string(bits)
+        if tag == _TAG_BOOL:
+            return bool(bits)
+        if tag == _TAG_DATETIME:
+            return _EPOCH + bits * _ONE_US
+        if tag == _TAG_DATE:
+            return datetime.date.fromordinal(bits)
+        if tag == _TAG_TIME:
+            return (_MIDNIGHT + bits * _ONE_US).time()
+        if tag == _TAG_TIMEDELTA:
+            return bits * _ONE_US
+        return int(self._string(bits))
+
+    def column_data(self, col_idx: int) -> tuple:
+        return self._tags[col_idx], self._ints[col_idx], self._floats[col_idx]
+
+    def row(self, row_idx: int) -> tuple:
+        value = self._value
+        return tuple(value(col_idx, row_idx) for col_idx in range(self.ncols))
+
+    def column(self, col_idx: int, min_row: int = 0) -> list:
+        value = self._value
+        return [value(col_idx, row_idx) for row_idx in range(min_row, self.nrows)]
+
+    def iter_rows(self, min_row: int = 0) -> Iterator[tuple]:
+        for row_idx in range(min_row, self.nrows):
+            yield self.row(row_idx)
+
+    def close(self):
+        if self._mmap.closed:
+            return
+        # 先释放全部视图，mmap才能关闭
+        for view in reversed(self._views):
+            view.release()
+        self._views.clear()
+        self._mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+class WorkbookSession:
+    """
+    工作簿会话：每个文件只解析一次，按sheet索引缓存 (headers, data, column_widths, sheet_name)
+    加载结果同时放入sheet_cache，文件未修改时后续会话不再打开文件
+    用法：with WorkbookSession(path) as session: session.load(0)
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.is_xls = file_path.endswith('.xls')
+        self._workbook = None
+        self._sheets = {}
+
+    def _open(self):
+        if self._workbook is None:
+            self._workbook = xlrd.open_workbook(self.file_path) if self.is_xls else load_workbook(self.file_path)
+        return self._workbook
+
+    def load(self, sheet_index: int) -> tuple:
+        if sheet_index not in self._sheets:
+            key = SheetCache.key(self.file_path, 'session', sheet_index)
+            cached = sheet_cache.get(key)
+            if cached is not None:
+                # 缓存中是不可变副本，返回新的列表，调用方修改不会影响缓存
+                headers, data, column_widths, sheet_name = cached
+                loaded = (list(headers), [list(row) for row in data],
+                          column_widths and list(column_widths), sheet_name)
+            else:
+                loaded = self._load_columnar(sheet_index)
+            if loaded is None:
+                workbook = self._open()
+                if self.is_xls:
+                    loaded = _load_xls_sheet(workbook, sheet_index)
+                else:
+                    loaded = _load_xlsx_sheet(workbook, sheet_index)
+                headers, data, column_widths, sheet_name = loaded
+                sheet_cache.put(key, (tuple(headers), tuple(map(tuple, data)),
+                                      column_widths and tuple(column_widths), sheet_name),
+                                len(headers) * (len(data) + 1))
+            self._sheets[sheet_index] = loaded
+        return self._sheets[sheet_index]
+
+    def _load_columnar(self, sheet_index: int):
+        snapshot = open_columnar(self.file_path, sheet_index)
+        if snapshot is None:
+            return None
+        with snapshot:
+            headers = list(snapshot.row(0)) if snapshot.nrows else []
+            data = [list(row) for row in snapshot.iter_rows(1)]
+            return headers, data, snapshot.column_widths, snapshot.sheet_name
+
+    def close(self):
+        if self._workbook is not None:
+            if self.is_xls:
+                self._workbook.release_resources()
             else:
-                column_widths.append(8.43)  # Excel默认列宽
-        return headers, data, column_widths, wb.sheetnames[sheet_index]
+                self._workbook.close()
+            self._workbook = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+
+def _load_xls_sheet(wb, sheet_index):
+    sheet = wb.sheet_by_index(sheet_index)
+    headers = sheet.row_values(0)
+    data = [sheet.row_values(i) for i in range(1, sheet.nrows)]
+    return headers, data, None, sheet.name  # xls格式不获取列宽
+
+
+def _load_xlsx_sheet(wb, sheet_index):
+    sheet = wb[wb.sheetnames[sheet_index]]
+    headers = [cell.value for cell in next(sheet.iter_rows())]
+    data = [[cell.value for cell in row] for row in sheet.iter_rows(min_row=2)]
+
+    # 获取列宽信息
+    column_widths = []
+    for col_idx in range(1, len(headers) + 1):
+        col_letter = get_column_letter(col_idx)
+        column_dim = sheet.column_dimensions.get(col_letter)
+        if column_dim and column_dim.width is not None:
+            column_widths.append(column_dim.width)
+        else:
+            column_widths.append(8.43)  # Excel默认列宽
+    return headers, data, column_widths, wb.sheetnames[sheet_index]
+
+
+def load_excel_data(file_path, sheet_index):
+    """通用Excel加载函数，支持xls和xlsx格式"""
+    with WorkbookSession(file_path) as session:
+        return session.load(sheet_index)
 
 
 def compare(file1_path, file2_path, output_path, key_column, sheet_index=[0],
-            file1_alias="文件1", file2_alias="文件2"):
-    for sheet_idx in sheet_index:
-        compare_(file1_path, file2_path, output_path, key_column, sheet_idx, file1_alias, file2_alias)
+            file1_alias="文件1", file2_alias="文件2", max_workers=None,
+            only_changed=False, summary_path=None):
+    """
+    对比两个文件的多个sheet：每个文件只解析一次，各sheet在进程池中并行对比，结果工作簿只保存一次
+    :param max_workers: 对比进程数，默认为 min(sheet数, CPU数)；为1时在当前进程中顺序对比
+    :param only_changed: 为True时结果只包含新增、删除和有差异的行
+    :param summary_path: 差异摘要的JSON输出路径（可选）
+    :return: 每个sheet的差异摘要列表，见 _diff_sheet
+    """
+    with WorkbookSession(file1_path) as session1, WorkbookSession(file2_path) as session2:
+        sheets = [(sheet_idx, session1.load(sheet_idx), session2.load(sheet_idx)) for sheet_idx in sheet_index]
+
+    workers = max_workers or min(len(sheets), os.cpu_count() or 1)
+    diff_args = [(sheet_idx, sheet1, sheet2, key_column, only_changed) for sheet_idx, sheet1, sheet2 in sheets]
+    if workers > 1 and len(sheets) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            diffs = list(executor.map(_diff_sheet, *zip(*diff_args)))
+    else:
+        diffs = [_diff_sheet(*args) for args in diff_args]
+
+    # 创建结果工作簿
+    if os.path.exists(output_path):
+        result_wb = load_workbook(output_path)
+    else:
+        result_wb = Workbook()
+        result_wb.remove(result_wb.active)
+    for (sheet_idx, sheet1, _), diff in zip(sheets, diffs):
+        _write_compare_sheet(result_wb, sheet_idx, sheet1, diff, key_column, file1_alias, file2_alias)
+    result_wb.save(output_path)
+
+    summaries = [diff[3] for diff in diffs]
+    if summary_path is not None:
+        with open(summary_path, 'w', encoding='utf-8') as f:
+            json.dump({"file1": file1_path, "file2": file2_path, "key_column": key_column,
+                       "sheets": summaries}, f, ensure_ascii=False, indent=2, default=str)
+    return summaries
 
 
 def compare_(file1_path, file2_path, output_path, key_column, sheet_index=0,
-             file1_alias="文件1", file2_alias="文件2"):
-    yellow_fill = PatternFill(start_color='FFFF00', end_color='FFFF00',
-                              fill_type='solid')
-    header_fill = PatternFill(start_color='AFEEEE', end_color='AFEEEE',
-                              fill_type='solid')
-    thin_border = Border(
-        left=Side(style='thin'),
-        right=Side(style='thin'),
-        top=Side(style='thin'),
-        bottom=Side(style='thin')
-    )
+             file1_alias="文件1", file2_alias="文件2", only_changed=False, summary_path=None):
+    return compare(file1_path, file2_path, output_path, key_column, [sheet_index], file1_alias, file2_alias,
+                   max_workers=1, only_changed=only_changed, summary_path=summary_path)[0]
+
 
+# 对比进度日志间隔（行）
+_PROGRESS_INTERVAL = 10000
+
+
+def _diff_sheet(sheet_index, sheet1, sheet2, key_column, only_changed=False):
+    """
+    对比一个sheet的数据（不涉及openpyxl对象，可在子进程中执行）
+    列位置只计算一次，每行先整体比较取出的值，只有不相等的行才逐列定位差异
+    :return: (other_headers, result_rows, changed_cols, summary)
+             result_rows为结果行的值，changed_cols为对应行需要标黄的列号元组；
+             summary为 {sheet, total, added, removed, changed, unchanged,
+             added_keys, removed_keys, changed_keys: {key: [列名]}}，added为只存在于文件2的主键
+    """
     logger.info(f"开始处理sheet:{sheet_index}")
-    # 加载数据和列宽
-    headers1, data1_rows, col_widths1, sheet_name = load_excel_data(file1_path, sheet_index)
-    headers2, data2_rows, _, sheet_name = load_excel_data(file2_path, sheet_index)
+    headers1, data1_rows, _, sheet_name = sheet1
+    headers2, data2_rows, _, _ = sheet2
 
     if headers1 != headers2:
         header_diff = []
@@ -162,6 +969,16 @@ def compare_(file1_path, file2_path, output_path, key_column, sheet_index=0,
 
     key_index = headers1.index(key_column)
     other_headers = [h for h in headers1 if h != key_column]
+    # 每个比较列在源数据中的位置（同名列取第一个，与按列名查找一致）
+    positions = [headers1.index(h) for h in other_headers]
+    # 结果文件中文件2一侧的列号：主键占第1列，之后每个比较列占两列
+    target_cols = [3 + i * 2 for i in range(len(other_headers))]
+    if len(positions) > 1:
+        project = itemgetter(*positions)
+    elif positions:
+        project = lambda row: (row[positions[0]],)
+    else:
+        project = lambda row: ()
 
     # 构建数据字典
     def normalize_key(key):
@@ -175,12 +992,93 @@ def compare_(file1_path, file2_path, output_path, key_column, sheet_index=0,
     data1 = build_data_dict(data1_rows)
     data2 = build_data_dict(data2_rows)
 
-    # 创建结果工作簿
-    if os.path.exists(output_path):
-        result_wb = load_workbook(output_path)
-    else:
-        result_wb = Workbook()
-        result_wb.remove(result_wb.active)
+    # ========== 数据对比处理 ==========
+    all_keys = sorted(data1.keys() | data2.keys())
+    all_cols = tuple(target_cols)
+    empty = (None,) * len(positions)
+    result_rows, changed_cols = [], []
+    added_keys, removed_keys, changed_keys = [], [], {}
+
+    for key_idx, key in enumerate(all_keys):
+        if key_idx % _PROGRESS_INTERVAL == 0:
+            logger.info(f"对比进度:{key_idx}/{len(all_keys)}")
+        row1 = data1.get(key)
+        row2 = data2.get(key)
+        values1 = project(row1) if row1 is not None else empty
+        values2 = project(row2) if row2 is not None else empty
+
+        if row1 is not None and row2 is not None:
+            # 空字符串与空值视为相同
+            cmp1 = [None if v == '' else v for v in values1]
+            cmp2 = [None if v == '' else v for v in values2]
+            if cmp1 == cmp2:
+                cols = ()
+            else:
+                cols = tuple(col for col, v1, v2 in zip(target_cols, cmp1, cmp2) if v1 != v2)
+                changed_keys[key] = [other_headers[(col - 3) // 2] for col in cols]
+        else:
+            # 整行标黄逻辑（只存在于其中一个文件）
+            cols = all_cols
+            (removed_keys if row2 is None else added_keys).append(key)
+
+        if only_changed and not cols:
+            continue
+        result_row = [key]
+        for val1, val2 in zip(values1, values2):
+            result_row.append(val1)
+            result_row.append(val2)
+        result_rows.append(result_row)
+        changed_cols.append(cols)
+    logger.info(f"对比进度:{len(all_keys)}/{len(all_keys)}")
+
+    summary = {
+        "sheet": sheet_name,
+        "total": len(all_keys),
+        "added": len(added_keys),
+        "removed": len(removed_keys),
+        "changed": len(changed_keys),
+        "unchanged": len(all_keys) - len(added_keys) - len(removed_keys) - len(changed_keys),
+        "added_keys": added_keys,
+        "removed_keys": removed_keys,
+        "changed_keys": changed_keys,
+    }
+    return other_headers, result_rows, changed_cols, summary
+
+
+# 数据单元格的命名样式：只在工作簿中注册一次，单元格按名称引用
+_DIFF_CELL_STYLE = "knify_diff_cell"
+_DIFF_CHANGED_STYLE = "knify_diff_changed"
+
+
+def _register_diff_styles(result_wb):
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    yellow_fill = PatternFill(start_color='FFFF00', end_color='FFFF00',
+                              fill_type='solid')
+    if _DIFF_CELL_STYLE not in result_wb.named_styles:
+        result_wb.add_named_style(NamedStyle(name=_DIFF_CELL_STYLE, border=thin_border))
+    if _DIFF_CHANGED_STYLE not in result_wb.named_styles:
+        result_wb.add_named_style(NamedStyle(name=_DIFF_CHANGED_STYLE, border=thin_border, fill=yellow_fill))
+
+
+def _write_compare_sheet(result_wb, sheet_index, sheet1, diff, key_column,
+                         file1_alias="文件1", file2_alias="文件2"):
+    header_fill = PatternFill(start_color='AFEEEE', end_color='AFEEEE',
+                              fill_type='solid')
+    thin_border = Border(
+        left=Side(style='thin'),
+        right=Side(style='thin'),
+        top=Side(style='thin'),
+        bottom=Side(style='thin')
+    )
+    headers1, _, col_widths1, sheet_name = sheet1
+    other_headers, result_rows, changed_cols, _ = diff
+    key_index = headers1.index(key_column)
+    _register_diff_styles(result_wb)
     result_ws = result_wb.create_sheet(title=sheet_name, index=sheet_index)
 
     # ========== 构建表头 ==========
@@ -224,54 +1122,17 @@ def compare_(file1_path, file2_path, output_path, key_column, sheet_index=0,
     result_ws.freeze_panes = 'B3'  # 冻结第一列和前两行
     result_ws.auto_filter.ref = f"A2:{get_column_letter(result_ws.max_column)}2"  # 第二行添加筛选
 
-    # ========== 数据对比处理 ==========
-    all_keys = sorted(set(data1.keys()) | set(data2.keys()))
-
-    for key_idx, key in enumerate(all_keys):
-        if key_idx % 100 == 0:
-            logger.info(f"对比进度:{key_idx}/{len(all_keys)}")
-        if key_idx == len(all_keys) - 1:
-            logger.info(f"对比进度:{len(all_keys)}/{len(all_keys)}")
-        row1 = data1.get(key)
-        row2 = data2.get(key)
-
-        # 构建结果行
-        result_row = [key]
-        for h in other_headers:
-            idx = headers1.index(h)
-            val1 = row1[idx] if row1 else None
-            val2 = row2[idx] if row2 else None
-            result_row.extend([val1, val2])
-
-        result_ws.append(result_row)
-        current_row = result_ws.max_row
-
-        # 设置数据行边框
-        for col in range(1, result_ws.max_column + 1):
-            result_ws.cell(row=current_row, column=col).border = thin_border
-
-        # 判断行存在情况
-        exists1 = key in data1
-        exists2 = key in data2
-
-        # 标记差异逻辑
-        if exists1 and exists2:
-            # 逐列比较差异
-            for col_idx, h in enumerate(other_headers, 1):
-                idx = headers1.index(h)
-                val1 = None if row1[idx] == '' else row1[idx]
-                val2 = None if row2[idx] == '' else row2[idx]
-                if val1 != val2:
-                    target_col = 1 + col_idx * 2
-                    result_ws.cell(current_row, target_col).fill = yellow_fill
-        else:
-            # 整行标黄逻辑
-            for col_idx, h in enumerate(other_headers, 1):
-                target_col = 1 + col_idx * 2
-                if exists1 and not exists2:  # 只存在文件1
-                    result_ws.cell(current_row, target_col).fill = yellow_fill
-                elif exists2 and not exists1:  # 只存在文件2
-                    result_ws.cell(current_row, target_col).fill = yellow_fill
+    # ========== 写入数据行 ==========
+    # 直接构造带命名样式的单元格整行追加，不再逐个按坐标查找单元格
+    # 先套用命名样式再赋值：命名样式会把数字格式重置为General，赋值时才按值类型设置日期等格式
+    for result_row, cols in zip(result_rows, changed_cols):
+        cells = []
+        for col, value in enumerate(result_row, 1):
+            cell = Cell(result_ws)
+            cell.style = _DIFF_CHANGED_STYLE if col in cols else _DIFF_CELL_STYLE
+            cell.value = value
+            cells.append(cell)
+        result_ws.append(cells)
 
     # ========== 设置列宽 ==========
     if col_widths1:
@@ -291,107 +1152,104 @@ def compare_(file1_path, file2_path, output_path, key_column, sheet_index=0,
             result_ws.column_dimensions[
                 get_column_letter(result_col + 1)].width = width
 
-    result_wb.save(output_path)
+
+# Excel不接受的控制字符（0x00-0x1F、0x7F），预编译为str.translate的删除表
+_ILLEGAL_CHARS_TABLE = dict.fromkeys([*range(0x00, 0x20), 0x7F])
 
 
-def json_file_to_excel(json_file, excel_file, skip_keys=None, sort_headers=True):
+def clean_string(value):
     """
-    将JSON文件中的数据转换为Excel文件
-    :param json_file: JSON文件的路径（例如：'data.json'）
-    :param excel_file: 输出的Excel文件路径（例如：'output.xlsx'）
+    清理字符串中的非法字符
     """
-    # 从JSON文件中读取数据
-    with open(json_file, 'r', encoding='utf-8') as f:
-        data = json.load(f)  # 解析JSON数据
-        json_to_excel(data, excel_file, skip_keys, sort_headers)
+    if isinstance(value, str):
+        return value.translate(_ILLEGAL_CHARS_TABLE)
+    return value
 
 
-def json_to_excel(json_data, excel_file, skip_keys=None, sort_headers=True):
-    if skip_keys is None:
-        skip_keys = set()  # 如果没有提供 skip_keys，默认为空集合
-    else:
-        skip_keys = set(skip_keys)  # 将列表转换为集合，便于快速查找
+def iter_json_lines(json_file, encoding='utf-8') -> Iterator[dict]:
+    """
+    逐行读取JSON Lines文件（每行一个JSON对象），空行跳过
+    """
+    with open(json_file, 'r', encoding=encoding) as f:
+        for line in f:
+            line = line.strip()
+            if line:
+                yield json.loads(line)
 
-    # 创建一个新的工作簿和工作表
-    workbook = Workbook()
-    sheet = workbook.active
 
-    # 收集所有可能的键（合并所有对象的键）
-    all_keys = set()
-    for item in json_data:
-        all_keys.update(item.keys())  # 将每个对象的键添加到集合中
+def _is_json_lines(json_file) -> bool:
+    return os.path.splitext(json_file)[1].lower() in ('.jsonl', '.ndjson')
 
-    # 过滤掉需要跳过的键
-    headers = [key for key in all_keys if key not in skip_keys]
 
+def _collect_headers(json_data, skip_keys, sort_headers) -> list:
+    # 收集所有可能的键（合并所有对象的键），保持首次出现的顺序
+    all_keys = {}
+    for item in json_data:
+        all_keys.update(dict.fromkeys(item.keys()))
+    headers = [key for key in all_keys if key not in skip_keys]
     # 对表头进行排序（如果 sort_headers 为 True）
-    if sort_headers:
-        headers = sorted(headers)  # 默认按字母顺序升序排序
-
-    # 写入表头
-    for col_num, header in enumerate(headers, 1):
-        sheet.cell(row=1, column=col_num, value=header)
-
-    def clean_string(value):
-        """
-        清理字符串中的非法字符
-        """
-        if isinstance(value, str):
-            # 过滤掉 ASCII 控制字符（0x00-0x1F）和非法 Unicode 字符
-            return re.sub(r'[\x00-\x1F\x7F]', '', value)
-        return value
+    return sorted(headers) if sort_headers else headers
 
-    # 写入数据
-    for row_num, item in enumerate(json_data, 2):
-        for col_num, header in enumerate(headers, 1):
-            # 如果当前对象没有该键，则写入空值
-            value = item.get(header, "")
-            cleaned_value = clean_string(value)  # 清理非法字符
-            sheet.cell(row=row_num, column=col_num, value=cleaned_value)
 
-    # 保存Excel文件
-    workbook.save(excel_file)
-    print(f"Excel文件已保存为 {excel_file}")
+def json_file_to_excel(json_file, excel_file, skip_keys=None, sort_headers=True, headers=None):
+    """
+    将JSON文件中的数据转换为Excel文件
+    :param json_file: JSON文件的路径（例如：'data.json'）；.jsonl/.ndjson按JSON Lines逐行流式读取
+    :param excel_file: 输出的Excel文件路径（例如：'output.xlsx'）
+    :param headers: 预先声明的表头（列顺序），未声明时从数据中收集
+    """
+    if _is_json_lines(json_file):
+        if headers is None:
+            # 第一遍只收集表头，第二遍逐行写入，都不在内存中保留数据
+            headers = _collect_headers(iter_json_lines(json_file), set(skip_keys or ()), sort_headers)
+        json_to_excel(iter_json_lines(json_file), excel_file, skip_keys, sort_headers, headers)
+        return
+    # 从JSON文件中读取数据
+    with open(json_file, 'r', encoding='utf-8') as f:
+        data = json.load(f)  # 解析JSON数据
+    json_to_excel(data, excel_file, skip_keys, sort_headers, headers)
 
 
-def process_data(excel_file, process_func, filter_func=None, preprocess_func=None, postprocess_func=None, header_row=1,
-                 sheet_index=0):
+def json_to_excel(json_data, excel_file, skip_keys=None, sort_headers=True, headers=None):
     """
-    通用的数据处理工具，支持从Excel文件中读取数据并进行处理。
-    :param excel_file: Excel文件路径
-    :param process_func: 数据处理函数，用于生成最终结果
-    :param filter_func: 过滤函数，用于判断哪些数据行不需要跳过（可选）
-    :param preprocess_func: 预处理函数，用于对列数据进行处理（可选）
-    :param postprocess_func: 后置处理函数，用于对生成的结果进行处理（可选）
-    :param header_row: Excel文件中表头的行号，默认为1（openpyxl的行号从1开始）
-    :param sheet_index: 工作表的索引，默认为0（第一个工作表）
-    :return: 处理后的结果列表
+    将JSON对象列表写入Excel（write-only模式逐行追加，不在内存中保留单元格对象）
+    :param json_data: dict的列表或任意可迭代对象（如生成器）
+    :param headers: 预先声明的表头（列顺序）；声明后不需要预先遍历数据，json_data可以是只能遍历一次的迭代器
     """
-    # 判断文件格式
-    file_ext = os.path.splitext(excel_file)[1].lower()
+    skip_keys = set(skip_keys or ())  # 将列表转换为集合，便于快速查找
 
-    if file_ext == '.xlsx':
-        # 使用openpyxl读取.xlsx文件
-        workbook = load_workbook(excel_file)
-        sheet = workbook.worksheets[sheet_index]
-        rows = sheet.iter_rows(min_row=header_row + 1, values_only=True)
-        header = [cell.value for cell in sheet[header_row]]
-    elif file_ext == '.xls':
-        # 使用xlrd读取.xls文件
-        workbook = xlrd.open_workbook(excel_file)
-        sheet = workbook.sheet_by_index(sheet_index)
-        rows = [sheet.row_values(row) for row in range(header_row, sheet.nrows)]
-        header = sheet.row_values(header_row - 1)
+    if headers is None:
+        # 需要先遍历一遍收集表头，迭代器先物化为列表
+        if not isinstance(json_data, (list, tuple)):
+            json_data = list(json_data)
+        headers = _collect_headers(json_data, skip_keys, sort_headers)
     else:
-        raise ValueError("Unsupported file format. Only .xls and .xlsx are supported.")
+        headers = [key for key in headers if key not in skip_keys]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+
+    # 写入表头
+    sheet.append(headers)
+    # 写入数据，如果当前对象没有该键，则写入空值
+    for item in json_data:
+        sheet.append([clean_string(item.get(header, "")) for header in headers])
+
+    # 保存Excel文件
+    workbook.save(excel_file)
+    print(f"Excel文件已保存为 {excel_file}")
 
-    # 初始化结果列表
-    results = []
 
+def _process_rows(rows, header, process_func, filter_func=None, preprocess_func=None,
+                  postprocess_func=None) -> Iterator:
+    width = len(header)
     # 遍历每一行数据
     for row in rows:
         # 将行数据与表头组合为字典
-        row_data = {header[i]: row[i] for i in range(len(header))}
+        if len(row) < width:
+            # 只读模式下行尾的空单元格可能被省略
+            row = tuple(row) + (None,) * (width - len(row))
+        row_data = {header[i]: row[i] for i in range(width)}
 
         # 如果提供了预处理函数，则对列数据进行处理
         if preprocess_func:
@@ -408,7 +1266,86 @@ def process_data(excel_file, process_func, filter_func=None, preprocess_func=Non
         if postprocess_func:
             result = postprocess_func(result, row_data)
 
-        # 将生成的结果添加到列表中
-        results.append(result)
+        yield result
+
+
+# 工作进程的 (表头, 各处理函数)，由进程池initializer设置一次，不随每个分块重复传递
+_worker_args = None
+
+
+def _init_process_worker(*args):
+    global _worker_args
+    _worker_args = args
+
+
+def _process_chunk(rows: list) -> list:
+    header, *funcs = _worker_args
+    return list(_process_rows(rows, header, *funcs))
+
+
+def iter_process_data(excel_file, process_func, filter_func=None, preprocess_func=None, postprocess_func=None,
+                      header_row=1, sheet_index=0, max_workers: int | None = 1, chunk_size: int = 1000) -> Iterator:
+    """
+    process_data的生成器版本：边读边处理，按行的顺序逐个生成结果，不在内存中保留全部结果
+    :param max_workers: 处理进程数，默认为1（在当前进程中处理）；None为CPU数。
+                        大于1时各处理函数需要可被pickle（模块级函数，不能是lambda或闭包）
+    :param chunk_size: 多进程时每个分块的行数；同时在途的分块不超过进程数的2倍，内存占用有上限
+    其余参数同process_data；命中sheet_cache时从缓存读取，但不填充缓存
+    """
+    return _iter_process_data(excel_file, process_func, filter_func, preprocess_func, postprocess_func,
+                              header_row, sheet_index, max_workers, chunk_size, fill_cache=False)
+
+
+def _iter_process_data(excel_file, process_func, filter_func, preprocess_func, postprocess_func,
+                       header_row, sheet_index, max_workers, chunk_size, fill_cache) -> Iterator:
+    # 判断文件格式
+    file_ext = os.path.splitext(excel_file)[1].lower()
 
-    return results
+    if file_ext not in ('.xlsx', '.xls'):
+        raise ValueError("Unsupported file format. Only .xls and .xlsx are supported.")
+    # 行值经sheet_cache读取，同一文件重复处理时不再解析；header_row从1开始
+    header = read_headers(excel_file, sheet_index, header_row - 1)
+    rows = _sheet_rows(excel_file, sheet_index, header_row, fill_cache)
+    funcs = (process_func, filter_func, preprocess_func, postprocess_func)
+
+    workers = max_workers or os.cpu_count() or 1
+    if workers == 1:
+        yield from _process_rows(rows, header, *funcs)
+        return
+
+    chunks = iter(lambda: list(islice(rows, chunk_size)), [])
+    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_process_worker,
+                                   initargs=(header, *funcs))
+    pending = deque()
+    try:
+        for chunk in islice(chunks, 2 * workers):
+            pending.append(executor.submit(_process_chunk, chunk))
+        while pending:
+            # 按提交顺序取结果，保证输出顺序与行顺序一致
+            results = pending.popleft().result()
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(_process_chunk, chunk))
+            yield from results
+    finally:
+        # 提前结束迭代时取消尚未开始的分块
+        executor.shutdown(wait=True, cancel_futures=True)
+
+
+def process_data(excel_file, process_func, filter_func=None, preprocess_func=None, postprocess_func=None, header_row=1,
+                 sheet_index=0, max_workers: int | None = 1, chunk_size: int = 1000):
+    """
+    通用的数据处理工具，支持从Excel文件中读取数据并进行处理。
+    :param excel_file: Excel文件路径
+    :param process_func: 数据处理函数，用于生成最终结果
+    :param filter_func: 过滤函数，用于判断哪些数据行不需要跳过（可选）
+    :param preprocess_func: 预处理函数，用于对列数据进行处理（可选）
+    :param postprocess_func: 后置处理函数，用于对生成的结果进行处理（可选）
+    :param header_row: Excel文件中表头的行号，默认为1（openpyxl的行号从1开始）
+    :param sheet_index: 工作表的索引，默认为0（第一个工作表）
+    :param max_workers: 分块并行处理的进程数，默认为1；见iter_process_data
+    :param chunk_size: 多进程时每个分块的行数
+    :return: 处理后的结果列表
+    """
+    return list(_iter_process_data(excel_file, process_func, filter_func, preprocess_func, postprocess_func,
+                                   header_row, sheet_index, max_workers, chunk_size, fill_cache=True))
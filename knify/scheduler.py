@@ -5,34 +5,74 @@
 轻量级任务调度系统（单文件实现，对应设计文档 V2.0）
 
 核心语义（与设计文档一一对应）：
-- D1 Cron：支持 5 位（分 时 日 月 周）与 6 位（秒 分 时 日 月 周），按字段数自动识别
+- D1 Cron：支持 5 位（分 时 日 月 周）与 6 位（秒 分 时 日 月 周），按字段数自动识别；
+          表达式按字符串编译为位图并缓存共享，计算下次触发无需重新解析
 - D2 超时：线程执行器为「软超时」（停止等待 + 释放逻辑槽位，后台线程不保证回收）；
-          异步执行器为「硬取消」（asyncio.wait_for 真实 cancel）
-- D3 路由：按函数类型自动路由，同步函数进线程池，async def 进事件循环
+          异步执行器为「硬取消」（asyncio.wait_for 真实 cancel）；
+          进程执行器为「硬终止」（到期直接 terminate 子进程，worker 按需重建）
+- D3 路由：按函数类型自动路由，同步函数进线程池，async def 进事件循环；
+          同步任务可声明 executor="process" 进进程池（CPU 密集型，绕开 GIL）
 - D4 并发：max_instances 为准入控制，准入即占「逻辑槽位」（running_count++）；
-          max_workers 为全局硬上限
+          每个命名执行器池的 max_workers 为该池硬上限，池满时按任务 priority 出队
 - D5 状态：状态属于「实例」，任务只持聚合计数
 - D6 超时算失败：超时纳入重试；重试耗尽后终态为 TIMEOUT 或 FAILED
 - D7 重试非阻塞：失败释放 worker，按 retry_delay 延迟由主循环重投，逻辑槽位保持占用
 - D8 阻塞超时：主循环独立清扫 WAIT 队列超时项，不依赖运行实例完成
 - D9 线程安全：每个任务一把 RLock 保护 running_count / 队列 / 状态
-
-仅依赖：croniter、pytz
+- D10 定时核心：按「最早截止时刻」排序的最小堆（Cron next_run / 重试 / 超时 / 队列过期），
+          主循环精确休眠到堆顶，注册、恢复、触发等改变调度时提前唤醒，每次唤醒 O(log n)
+- D11 持久化：可插拔 JobStore（内置 SQLite），任务定义与非终态实例写后批量落盘，
+          start() 时恢复，停机期间错过的触发按 misfire 策略补偿；恢复前不写快照，
+          注册与启动之间的刷盘不会覆盖上次运行的状态
+- D12 事件：日志事件以小元组入队（无锁、不序列化），后台线程批量格式化、截断参数、
+          输出 JSON 并分发给用户订阅的 sink
+- D13 指标：每个任务的调度延迟 / 排队等待 / 执行耗时直方图与拒绝、重试、超时计数，
+          在已持有的任务锁内累加；池利用率与事件循环延迟为采集时读取的 gauge，
+          可通过 get_metrics() 拉取或以 Prometheus 文本格式从本地 HTTP 端点导出
+- D14 多副本：可选 LeaseBackend（内置 SQLite），节点心跳由后台线程续约；任务按
+          Rendezvous 哈希分片到存活节点，每个 Cron 触发时刻先 claim 再提交，跨进程只执行一次
+- D15 AsyncScheduler：主循环与全部调度状态运行在调用方事件循环中，async 任务直接
+          create_task，不经过跨线程投递与任务锁
+- D16 时钟：调度判断统一经可注入的 Clock 取时间；VirtualClock + run_pending() 可不启动
+          主循环单步驱动，用于模拟与基准（benchmarks/sim_scheduler.py）
+- D17 依赖：add_job(depends_on=[...]) 声明上游，上游全部成功（AND-join）后立即以
+          DEPENDENCY 来源触发下游；各分支独立准入，并行度受 max_instances / max_workers 约束
+- D18 限流：任务级与限流组级令牌桶限制执行速率，令牌不足时按阻塞策略处理（WAIT 排队到
+          令牌补充）；可选 AIMD 自适应并发按失败、超时与执行耗时调整有效 max_instances
+- D19 重试退避：重试间隔可按指数增长并封顶，full jitter 打散同时失败的任务；可选全局
+          重试预算（滑动窗口内重试数 ≤ 首次尝试数 × 比例 + 保底），超出预算时直接终结
+
+仅依赖：croniter、pytz（SQLite 持久化使用标准库 sqlite3）
 """
 import asyncio
+import bisect
+import calendar
+import functools
+import hashlib
+import heapq
+import http.server
+import importlib
+import itertools
 import json
 import logging
+import multiprocessing
+import os
+import pickle
+import queue
+import random
 import signal
+import socket
+import sqlite3
 import threading
 import time
 from collections import deque
-from concurrent.futures import ThreadPoolExecutor, Future, CancelledError as FutureCancelledError
+from concurrent.futures import Future, CancelledError as FutureCancelledError
 from dataclasses import dataclass, field
-from datetime import datetime
+from datetime import datetime, timedelta
 from enum import Enum
 from typing import Any, Callable, Dict, List, Optional
 
-from croniter import croniter
+from croniter import croniter, CroniterBadDateError
 import pytz
 
 from knify import logger
@@ -53,6 +93,150 @@ def _emit(level: int, msg: str):
     _LEVEL_FUNC.get(level, logger.info)(msg)
 
 
+# --------------------------------------------------------------------------- #
+# 事件总线（D12）
+# 生产方（持有任务锁的调度路径）只做一次 deque.append，不加锁、不序列化；
+# 后台线程按批取出，截断参数、格式化时间、输出 JSON 日志并分发给订阅的 sink。
+# 线程随 start() 启动、随停机退出；未启动时事件留在队列里，由 run_pending() 同步输出。
+# --------------------------------------------------------------------------- #
+def _summarize(value: Any, max_len: int, depth: int = 0) -> Any:
+    """保持 JSON 结构的参数摘要：长字符串截断、长列表/字典只保留前若干项。"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, str):
+        return value if len(value) <= max_len else f"{value[:max_len]}...(+{len(value) - max_len})"
+    max_items = 10
+    if depth < 3 and isinstance(value, (list, tuple)):
+        items = [_summarize(v, max_len, depth + 1) for v in value[:max_items]]
+        if len(value) > max_items:
+            items.append(f"...(+{len(value) - max_items})")
+        return items
+    if depth < 3 and isinstance(value, dict):
+        result = {}
+        for i, (k, v) in enumerate(value.items()):
+            if i >= max_items:
+                result["..."] = f"+{len(value) - max_items}"
+                break
+            result[str(k)] = _summarize(v, max_len, depth + 1)
+        return result
+    text = repr(value)
+    return text if len(text) <= max_len else f"{text[:max_len]}...(+{len(text) - max_len})"
+
+
+class _EventBus:
+    def __init__(self, tz, clock: "Clock", flush_interval: float = 0.1, max_pending: int = 100000,
+                 max_arg_length: int = 200, emit_logs: bool = True):
+        self._tz = tz
+        self._clock = clock  # 事件时间戳与调度器同一时钟（VirtualClock 下为虚拟时间）
+        self._flush_interval = flush_interval
+        self._max_pending = max_pending
+        self._max_arg_length = max_arg_length
+        self._emit_logs = emit_logs
+        # (ts, level, event, task_id, instance_id, source, attempt, args, kwargs, extra)
+        self._queue: deque = deque()
+        self._sinks: List[Callable[[Dict[str, Any]], None]] = []
+        self._dropped = 0
+        self._flush_lock = threading.Lock()  # 只在消费侧使用
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._ts_cache = (None, None)
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="lite-sched-events", daemon=True)
+        self._thread.start()
+
+    def publish(self, level: int, event: str, task_id: Optional[str], instance_id: Optional[str],
+                source: Optional[str], attempt: Optional[int], args, kwargs,
+                extra: Optional[Dict[str, Any]]):
+        if not self._emit_logs and not self._sinks:
+            return  # 没有消费方（未启动时也不会在队列里积压）
+        if self._closed:
+            # 停机后的零星事件（如晚到的完成回调）直接在调用方线程输出
+            self._queue.append((self._clock.time(), level, event, task_id, instance_id, source,
+                                attempt, args, kwargs, extra))
+            self.flush()
+            return
+        if len(self._queue) >= self._max_pending:
+            self._dropped += 1  # 积压超限丢弃新事件（近似计数即可）
+            return
+        self._queue.append((self._clock.time(), level, event, task_id, instance_id, source,
+                            attempt, args, kwargs, extra))
+
+    def subscribe(self, sink: Callable[[Dict[str, Any]], None]):
+        self._sinks = self._sinks + [sink]  # 写时复制，消费侧无需加锁
+
+    def unsubscribe(self, sink: Callable[[Dict[str, Any]], None]):
+        self._sinks = [s for s in self._sinks if s is not sink]
+
+    def _run(self):
+        while not self._closed:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def _format_ts(self, ts: float) -> str:
+        second = int(ts)
+        cached_second, text = self._ts_cache
+        if cached_second != second:
+            text = datetime.fromtimestamp(second, self._tz).strftime("%Y-%m-%d %H:%M:%S")
+            self._ts_cache = (second, text)
+        return text
+
+    def _to_record(self, item: tuple) -> Dict[str, Any]:
+        ts, level, event, task_id, instance_id, source, attempt, args, kwargs, extra = item
+        max_len = self._max_arg_length
+        record = {"timestamp": self._format_ts(ts)}
+        if instance_id is not None:
+            record.update(task_id=task_id, instance_id=instance_id, event=event, source=source,
+                          attempt=attempt, args=_summarize(args, max_len),
+                          kwargs=_summarize(kwargs, max_len))
+            for k, v in (extra or {}).items():
+                if v is not None:
+                    record[k] = _summarize(v, max_len)
+        else:
+            record["event"] = event
+            for k, v in (extra or {}).items():
+                record[k] = _summarize(v, max_len)
+        return record
+
+    def flush(self):
+        with self._flush_lock:
+            sinks = self._sinks
+            while self._queue:
+                item = self._queue.popleft()
+                record = self._to_record(item)
+                if self._emit_logs:
+                    _emit(item[1], json.dumps(record, ensure_ascii=False, default=str))
+                if sinks:
+                    record["level"] = logging.getLevelName(item[1])
+                    for sink in sinks:
+                        try:
+                            sink(record)
+                        except Exception as e:  # noqa - sink 异常不影响调度与其他 sink
+                            logger.error(f"scheduler event sink {sink!r} failed: {e!r}")
+            if self._dropped:
+                dropped, self._dropped = self._dropped, 0
+                _emit(logging.WARNING, json.dumps(
+                    {"timestamp": self._format_ts(self._clock.time()), "event": "events_dropped",
+                     "count": dropped, "max_pending": self._max_pending}, ensure_ascii=False))
+
+    def close(self):
+        self._closed = True
+        self._wakeup.set()
+        if self._thread is not None:
+            self._thread.join(timeout=5)
+            self._thread = None
+        self.flush()
+
+
 # --------------------------------------------------------------------------- #
 # 枚举
 # --------------------------------------------------------------------------- #
@@ -60,6 +244,7 @@ class BlockingStrategy(str, Enum):
     WAIT = "WAIT"
     DROP = "DROP"
     RAISE = "RAISE"
+    COALESCE = "COALESCE"  # 排队中的触发合并为一次执行
 
 
 class InstanceState(str, Enum):
@@ -73,10 +258,24 @@ class InstanceState(str, Enum):
     REJECTED = "REJECTED"
 
 
+class ExecutorType(str, Enum):
+    THREAD = "thread"    # 同步函数默认
+    PROCESS = "process"  # 同步函数可选，CPU 密集型
+    ASYNC = "async"      # async def 自动路由
+
+
 class TriggerSource(str, Enum):
     CRON = "cron"
     IMMEDIATE = "immediate"
     MANUAL = "manual"
+    MISFIRE = "misfire"  # 恢复时补偿停机期间错过的 Cron 触发
+    DEPENDENCY = "dependency"  # 上游任务全部成功后触发（D17）
+
+
+class MisfirePolicy(str, Enum):
+    SKIP = "SKIP"          # 丢弃错过的触发，从当前时间起重新计算
+    RUN_ONCE = "RUN_ONCE"  # 错过多次只补一次
+    RUN_ALL = "RUN_ALL"    # 每次错过的触发都补（受队列容量限制）
 
 
 # --------------------------------------------------------------------------- #
@@ -102,6 +301,10 @@ class MaxInstancesReachedError(SchedulerError):
     pass
 
 
+class RateLimitedError(SchedulerError):
+    pass
+
+
 class TaskTimeoutError(SchedulerError):
     pass
 
@@ -110,14 +313,297 @@ class TaskExecutionError(SchedulerError):
     pass
 
 
+# --------------------------------------------------------------------------- #
+# 时钟（D16）
+# 调度器与执行器池的时间判断都经由 Clock；VirtualClock 只在 advance/set 时前进，
+# 配合 Scheduler.run_pending() 单步驱动，不需要真实等待。
+# --------------------------------------------------------------------------- #
+class Clock:
+    """系统时钟（epoch 秒）。"""
+
+    def time(self) -> float:
+        return time.time()
+
+
+class VirtualClock(Clock):
+    """手动推进的虚拟时钟，线程安全。用于模拟，不能配合 start() 的真实休眠使用。"""
+
+    def __init__(self, start: Optional[float] = None):
+        self._now = time.time() if start is None else start
+        self._lock = threading.Lock()
+
+    def time(self) -> float:
+        return self._now
+
+    def advance(self, seconds: float) -> float:
+        with self._lock:
+            self._now += seconds
+            return self._now
+
+    def set(self, ts: float) -> float:
+        """前进到 ts；不允许回拨。"""
+        with self._lock:
+            if ts > self._now:
+                self._now = ts
+            return self._now
+
+
+_SYSTEM_CLOCK = Clock()
+
+
+# --------------------------------------------------------------------------- #
+# 指标（D13）
+# 直方图只做一次二分 + 两次加法，由调用方已持有的锁保护（任务锁 / 池锁）；
+# 采集侧不加锁读取，单个样本可能与 sum/count 有瞬时偏差，可以接受。
+# --------------------------------------------------------------------------- #
+_LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5,
+                    1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0)
+
+
+class _Histogram:
+    __slots__ = ("bounds", "counts", "sum", "count")
+
+    def __init__(self, bounds: tuple = _LATENCY_BUCKETS):
+        self.bounds = bounds
+        self.counts: Optional[List[int]] = None  # 首次观测时分配，最后一格为 +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        if value < 0:
+            value = 0.0
+        if self.counts is None:
+            self.counts = [0] * (len(self.bounds) + 1)
+        self.counts[bisect.bisect_left(self.bounds, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """累计桶计数（与 Prometheus 的 le 语义一致）。"""
+        counts = list(self.counts or ())
+        counts += [0] * (len(self.bounds) + 1 - len(counts))
+        buckets, total = {}, 0
+        for bound, n in zip(self.bounds + (float("inf"),), counts):
+            total += n
+            buckets[bound] = total
+        return {"buckets": buckets, "sum": self.sum, "count": total}
+
+
+class _JobMetrics:
+    __slots__ = ("schedule_lag", "queue_wait", "run_duration", "rejected", "retries", "timeouts",
+                 "coalesced", "rate_limited", "retries_denied")
+
+    def __init__(self):
+        # 直方图在首次观测时创建，从未执行过的任务不占用桶数组
+        self.schedule_lag: Optional[_Histogram] = None  # 计划触发时刻 → 首次投递
+        self.queue_wait: Optional[_Histogram] = None    # 进入 WAIT 队列 → 出队投递
+        self.run_duration: Optional[_Histogram] = None  # 每次尝试的执行耗时（不含池内排队）
+        self.rejected = 0
+        self.retries = 0
+        self.timeouts = 0
+        self.coalesced = 0  # 合并进已排队实例的触发数
+        self.rate_limited = 0  # 因令牌不足未能立即执行的触发数
+        self.retries_denied = 0  # 重试预算耗尽而放弃的重试数
+
+    def observe(self, name: str, value: float):
+        hist = getattr(self, name)
+        if hist is None:
+            hist = _Histogram()
+            setattr(self, name, hist)
+        hist.observe(value)
+
+    def snapshot(self, name: str) -> Dict[str, Any]:
+        return (getattr(self, name) or _Histogram()).snapshot()
+
+
+def _prom_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _prom_number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _PromWriter:
+    """按 Prometheus 文本格式（0.0.4）拼接指标，同名指标只输出一次 HELP / TYPE。"""
+
+    def __init__(self, prefix: str = "lite_sched_"):
+        self._prefix = prefix
+        self._families: Dict[str, List[str]] = {}
+
+    def _family(self, name: str, kind: str, doc: str) -> List[str]:
+        lines = self._families.get(name)
+        if lines is None:
+            lines = self._families[name] = [f"# HELP {self._prefix}{name} {doc}",
+                                            f"# TYPE {self._prefix}{name} {kind}"]
+        return lines
+
+    @staticmethod
+    def _labels(labels: Dict[str, Any]) -> str:
+        if not labels:
+            return ""
+        return "{" + ",".join(f'{k}="{_prom_label(v)}"' for k, v in labels.items()) + "}"
+
+    def sample(self, name: str, kind: str, doc: str, value: float, **labels):
+        self._family(name, kind, doc).append(
+            f"{self._prefix}{name}{self._labels(labels)} {_prom_number(value)}")
+
+    def histogram(self, name: str, doc: str, snap: Dict[str, Any], **labels):
+        lines = self._family(name, "histogram", doc)
+        full = f"{self._prefix}{name}"
+        for bound, n in snap["buckets"].items():
+            le = self._labels(dict(labels, le=_prom_number(bound)))
+            lines.append(f"{full}_bucket{le} {n}")
+        lines.append(f"{full}_sum{self._labels(labels)} {_prom_number(snap['sum'])}")
+        lines.append(f"{full}_count{self._labels(labels)} {snap['count']}")
+
+    def render(self) -> str:
+        return "\n".join(line for lines in self._families.values() for line in lines) + "\n"
+
+
+# --------------------------------------------------------------------------- #
+# 限流与自适应并发（D18）
+# 令牌桶按「开始一次执行」计数，重试不消耗令牌；任务可同时受自身与所属限流组的桶约束，
+# 所有桶都有令牌才放行。AIMD 按每次尝试的结果调整任务的有效并发上限。
+# --------------------------------------------------------------------------- #
+class _TokenBucket:
+    __slots__ = ("rate", "burst", "tokens", "updated", "lock")
+
+    def __init__(self, rate: float, burst: float, now: float, lock):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self.updated = now
+        self.lock = lock  # 限流组的桶被多个任务共享，需要独立的锁
+
+    def refill(self, now: float):
+        if now > self.updated:
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+    def ready_at(self) -> float:
+        """下一个令牌可用的时刻（按上次补充后的线性增长推算）。"""
+        return self.updated + max(0.0, 1 - self.tokens) / self.rate
+
+    def status(self) -> Dict[str, Any]:
+        return {"rate": self.rate, "burst": self.burst, "tokens": round(self.tokens, 3)}
+
+
+def _take_tokens(buckets: tuple, now: float) -> bool:
+    """所有桶都有令牌时各取一个，否则都不取（按固定顺序加锁：任务桶在前、组桶在后）。"""
+    if not buckets:
+        return True
+    first = buckets[0]
+    with first.lock:
+        first.refill(now)
+        if first.tokens < 1 or not _take_tokens(buckets[1:], now):
+            return False
+        first.tokens -= 1
+        return True
+
+
+class _AIMDLimiter:
+    """加性增 / 乘性减：无拥塞的成功每次 +1/limit（约每轮 +1，直到 max_instances）；
+    失败、超时或耗时超过目标时减半。减半之前开始的尝试不会再次触发减半，
+    避免同一批慢请求把上限连续压到底。未指定 latency_target 时以成功耗时 EWMA 的 2 倍为目标。"""
+    __slots__ = ("ceiling", "limit", "latency_target", "ewma", "last_decrease")
+
+    def __init__(self, ceiling: int, latency_target: Optional[float] = None):
+        self.ceiling = ceiling
+        self.limit = float(ceiling)
+        self.latency_target = latency_target
+        self.ewma: Optional[float] = None
+        self.last_decrease = float("-inf")
+
+    @property
+    def cap(self) -> int:
+        return max(1, int(self.limit))
+
+    def on_result(self, ok: bool, duration: float, started_at: float, now: float) -> bool:
+        """记录一次尝试结果，返回是否下调了上限。"""
+        target = self.latency_target
+        if target is None and self.ewma is not None:
+            target = 2 * self.ewma
+        congested = not ok or (target is not None and duration > target)
+        if ok:
+            self.ewma = duration if self.ewma is None else 0.8 * self.ewma + 0.2 * duration
+        if not congested:
+            self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+            return False
+        if started_at < self.last_decrease:
+            return False
+        self.limit = max(1.0, self.limit / 2)
+        self.last_decrease = now
+        return True
+
+
+def _slot_limit(job) -> int:
+    """有效并发上限：开启自适应并发时为 AIMD 当前值，否则为 max_instances。"""
+    return job._aimd.cap if job._aimd is not None else job.max_instances
+
+
+# --------------------------------------------------------------------------- #
+# 重试预算（D19）
+# 全局共享：所有任务的首次尝试按比例「存入」重试额度，重试时「取出」；窗口按秒分桶，
+# 只保留最近 window 秒。保底额度保证低流量时偶发失败仍可重试。
+# --------------------------------------------------------------------------- #
+class _RetryBudget:
+    __slots__ = ("ratio", "reserve", "window", "lock", "_firsts", "_retries")
+
+    def __init__(self, ratio: float, min_per_second: float, window: float, lock):
+        self.ratio = ratio
+        self.reserve = min_per_second * window
+        self.window = window
+        self.lock = lock
+        self._firsts: deque = deque()   # [秒, 次数]
+        self._retries: deque = deque()
+
+    def _add(self, buckets: deque, now: float):
+        second = int(now)
+        if buckets and buckets[-1][0] == second:
+            buckets[-1][1] += 1
+        else:
+            buckets.append([second, 1])
+        while buckets and buckets[0][0] <= now - self.window:
+            buckets.popleft()
+
+    def _count(self, buckets: deque, now: float) -> int:
+        while buckets and buckets[0][0] <= now - self.window:
+            buckets.popleft()
+        return sum(n for _, n in buckets)
+
+    def deposit(self, now: float):
+        with self.lock:
+            self._add(self._firsts, now)
+
+    def try_withdraw(self, now: float) -> bool:
+        with self.lock:
+            allowed = self.ratio * self._count(self._firsts, now) + self.reserve
+            if self._count(self._retries, now) + 1 > allowed:
+                return False
+            self._add(self._retries, now)
+            return True
+
+    def status(self, now: float) -> Dict[str, Any]:
+        with self.lock:
+            firsts, retries = self._count(self._firsts, now), self._count(self._retries, now)
+        return {"ratio": self.ratio, "window": self.window, "first_attempts": firsts,
+                "retries": retries,
+                "available": max(0, int(self.ratio * firsts + self.reserve) - retries)}
+
+
 # --------------------------------------------------------------------------- #
 # 实例
+# Instance / Job 使用 __slots__；参数快照（args 元组、kwargs 字典）
+# 在任务与各实例之间共享、只读，update_job_params 时整体替换（写时复制）。
 # --------------------------------------------------------------------------- #
-@dataclass
+@dataclass(slots=True)
 class Instance:
     instance_id: str
     task_id: str
-    args: List[Any]
+    args: tuple
     kwargs: Dict[str, Any]
     source: str
     is_async: bool
@@ -125,22 +611,28 @@ class Instance:
     state: InstanceState = InstanceState.RUNNING
     finalized: bool = False
     future: Optional[Future] = None
+    scheduled_at: float = 0.0        # 计划触发时刻（Cron 为 next_run，其余为触发时刻）
     enqueue_at: float = 0.0          # 进入 WAIT 队列的时刻
     attempt_start: float = 0.0       # 本次尝试开始执行的时刻
     timeout_at: Optional[float] = None
     next_retry_at: float = 0.0
+    triggers: Optional[List[Dict[str, Any]]] = None  # COALESCE：合并的触发记录
 
 
 # --------------------------------------------------------------------------- #
 # 任务
 # --------------------------------------------------------------------------- #
-@dataclass
+@dataclass(slots=True)
 class Job:
     task_id: str
     func: Callable
-    cron: str
+    cron: Optional[str]              # None：只由依赖 / 手动触发
     is_coroutine: bool
-    args: List[Any] = field(default_factory=list)
+    executor: ExecutorType = ExecutorType.THREAD
+    pool: Optional[str] = None       # 执行器池名（async 任务为 None）
+    priority: int = 0                # 池满排队时大者优先
+    misfire_policy: MisfirePolicy = MisfirePolicy.SKIP
+    args: tuple = ()
     kwargs: Dict[str, Any] = field(default_factory=dict)
     max_instances: int = 1
     blocking_strategy: BlockingStrategy = BlockingStrategy.WAIT
@@ -148,17 +640,33 @@ class Job:
     max_queue_size: int = 100
     retry_times: int = 0
     retry_delay: int = 60
+    retry_backoff: float = 1.0         # 每次重试间隔的倍数（1 为固定间隔）
+    retry_max_delay: Optional[float] = None
+    retry_jitter: bool = False         # full jitter：在 [0, 计算间隔] 内均匀取值
     timeout: Optional[int] = None
     name: Optional[str] = None
+    coalesce_kwarg: str = "triggers"  # COALESCE 时传入触发列表的关键字参数名
+    depends_on: tuple = ()             # 上游任务 ID（全部成功后触发本任务）
+    rate_limit: Optional[float] = None   # 每秒最多开始的执行数（令牌补充速率）
+    rate_burst: Optional[float] = None   # 令牌桶容量
+    rate_group: Optional[str] = None     # 共享令牌桶的限流组
+    adaptive_concurrency: bool = False   # AIMD 调整有效并发上限（不超过 max_instances）
+    latency_target: Optional[float] = None
 
     enabled: bool = True
     next_run: Optional[datetime] = None
     running_count: int = 0
-    blocked_queue: deque = field(default_factory=deque)
-    instances: Dict[str, Instance] = field(default_factory=dict)
+    blocked_queue: Any = ()            # 空时为共享的空元组，首次排队才创建 deque
+    instances: Dict[str, Instance] = field(default_factory=dict)  # 已投递（运行 / 待重试）的实例
     lock: threading.RLock = field(default_factory=threading.RLock)
     _seq: int = 0
     _pending_immediate: bool = False
+    _deadline: Optional[float] = None  # 当前在堆中的有效截止时刻
+    _deps_waiting: Optional[set] = None  # 本轮尚未成功的上游
+    _buckets: tuple = ()               # 任务桶 + 限流组桶
+    _aimd: Optional[_AIMDLimiter] = None
+    metrics: _JobMetrics = field(default_factory=_JobMetrics)
+    history: Optional[deque] = None    # 最近终结的实例摘要（history_size > 0 时按需创建）
 
     # 统计
     last_run_time: Optional[str] = None
@@ -169,9 +677,691 @@ class Job:
     total_triggered: int = 0
 
 
+# --------------------------------------------------------------------------- #
+# 执行器池（D3 / D4）
+# 命名池各自限制 worker 数；池满时按任务 priority 出队（大者优先，同级 FIFO）。
+# 每个 future 记录 started_at，排队等待与执行耗时分别统计。
+# --------------------------------------------------------------------------- #
+class _WorkerPool:
+    kind = ExecutorType.THREAD
+
+    def __init__(self, name: str, max_workers: int, clock: Optional[Clock] = None):
+        self.name = name
+        self.max_workers = max_workers
+        self._clock = clock or _SYSTEM_CLOCK
+        self._queue: queue.PriorityQueue = queue.PriorityQueue()
+        self._seq = itertools.count()
+        self._threads: List[threading.Thread] = []
+        self._lock = threading.Lock()
+        self._shutdown = False
+        # 统计（self._lock 保护）
+        self._submitted = 0
+        self._started = 0
+        self._cancelled = 0
+        self._completed = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+        self._run_total = 0.0
+        self._run_max = 0.0
+        self._wait_hist = _Histogram()
+        self._run_hist = _Histogram()
+
+    def submit(self, func: Callable, args=(), kwargs=None, priority: int = 0) -> Future:
+        fut = Future()
+        with self._lock:
+            if self._shutdown:
+                raise SchedulerError(f"执行器池已关闭: {self.name}")
+            if not self._threads:
+                for i in range(self.max_workers):
+                    t = threading.Thread(target=self._serve, name=f"lite-sched-{self.name}_{i}",
+                                         daemon=True)
+                    t.start()
+                    self._threads.append(t)
+            self._submitted += 1
+        self._queue.put((-priority, next(self._seq), fut, func, args, kwargs or {},
+                         self._clock.time()))
+        return fut
+
+    def _serve(self):
+        ctx = {}
+        while True:
+            _, _, fut, func, args, kwargs, submitted_at = self._queue.get()
+            if fut is None:
+                break
+            if not fut.set_running_or_notify_cancel():
+                with self._lock:
+                    self._cancelled += 1  # 排队中已取消：不计入 active
+                continue
+            started_at = self._clock.time()
+            fut.started_at = started_at
+            with self._lock:
+                self._started += 1
+            wait = started_at - submitted_at
+            ok, value = self._execute(ctx, fut, func, args, kwargs)
+            run = self._clock.time() - started_at
+            with self._lock:
+                self._completed += 1
+                self._wait_total += wait
+                self._wait_max = max(self._wait_max, wait)
+                self._run_total += run
+                self._run_max = max(self._run_max, run)
+                self._wait_hist.observe(wait)
+                self._run_hist.observe(run)
+            if ok:
+                fut.set_result(value)
+            else:
+                fut.set_exception(value)
+        self._worker_exit(ctx)
+
+    def _execute(self, ctx: dict, fut: Future, func: Callable, args, kwargs):
+        try:
+            return True, func(*args, **kwargs)
+        except BaseException as e:  # noqa - 业务异常隔离，交由 future 传递
+            return False, e
+
+    def _worker_exit(self, ctx: dict):
+        pass
+
+    def terminate(self, fut: Future) -> bool:
+        return False
+
+    def status(self) -> Dict[str, Any]:
+        with self._lock:
+            done = self._completed
+            return {
+                "name": self.name,
+                "executor": self.kind.value,
+                "max_workers": self.max_workers,
+                "active": self._started - done,
+                "queued": self._submitted - self._started - self._cancelled,
+                "submitted": self._submitted,
+                "cancelled": self._cancelled,
+                "completed": done,
+                "avg_queue_wait_ms": int(self._wait_total / done * 1000) if done else 0,
+                "max_queue_wait_ms": int(self._wait_max * 1000),
+                "avg_run_ms": int(self._run_total / done * 1000) if done else 0,
+                "max_run_ms": int(self._run_max * 1000),
+            }
+
+    def metrics(self) -> Dict[str, Any]:
+        """池级直方图快照（秒），供指标导出使用。"""
+        with self._lock:
+            return {"queue_wait": self._wait_hist.snapshot(),
+                    "run_duration": self._run_hist.snapshot()}
+
+    def shutdown(self, terminate: bool = True):
+        """停止接收新任务；已排队任务仍会执行完（哨兵排在所有任务之后）。"""
+        with self._lock:
+            self._shutdown = True
+        for _ in self._threads:
+            self._queue.put((float("inf"), next(self._seq), None, None, None, None, None))
+
+
+class _ThreadPool(_WorkerPool):
+    kind = ExecutorType.THREAD
+
+
+def _process_worker(conn):
+    """子进程主循环：接收 (func, args, kwargs)，回传 (ok, result/exception)。"""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # 由父进程统一停机
+    while True:
+        try:
+            msg = conn.recv()
+        except (EOFError, OSError):
+            return
+        if msg is None:
+            return
+        func, args, kwargs = msg
+        try:
+            result = (True, func(*args, **kwargs))
+        except BaseException as e:  # noqa - 业务异常隔离
+            result = (False, e)
+        try:
+            conn.send(result)
+        except Exception as e:  # noqa - 结果或异常不可 pickle
+            conn.send((False, TaskExecutionError(f"结果无法回传父进程: {e!r}")))
+
+
+class _ProcessPool(_WorkerPool):
+    """每个 worker 线程独占一个子进程并串行投递任务；超时时单独 terminate 该子进程，
+    下一个任务到来时再重建，不影响其他 worker。"""
+    kind = ExecutorType.PROCESS
+
+    def __init__(self, name: str, max_workers: int, start_method: str = "spawn",
+                 clock: Optional[Clock] = None):
+        super().__init__(name, max_workers, clock)
+        self._ctx = multiprocessing.get_context(start_method)
+        self._busy: Dict[Future, Any] = {}  # future -> 正在执行它的子进程
+        self._procs: set = set()
+        self._killed: set = set()  # 已发出 terminate 的子进程，不再复用
+
+    def terminate(self, fut: Future) -> bool:
+        """终止正在执行 fut 的子进程；对应 future 以异常结束。"""
+        with self._lock:
+            proc = self._busy.get(fut)
+            if proc is None:
+                return False
+            self._killed.add(proc)
+            proc.terminate()
+        return True
+
+    def _spawn(self):
+        parent_conn, child_conn = self._ctx.Pipe()
+        try:
+            proc = self._ctx.Process(target=_process_worker, args=(child_conn,),
+                                     name=f"lite-sched-{self.name}", daemon=True)
+            proc.start()
+        except BaseException:
+            parent_conn.close()
+            raise
+        finally:
+            child_conn.close()
+        with self._lock:
+            self._procs.add(proc)
+        return proc, parent_conn
+
+    def _retire(self, ctx: dict):
+        proc, conn = ctx.pop("proc", None), ctx.pop("conn", None)
+        if conn is not None:
+            conn.close()
+        if proc is None:
+            return
+        proc.join(timeout=1)
+        with self._lock:
+            self._procs.discard(proc)
+            self._killed.discard(proc)
+
+    def _execute(self, ctx: dict, fut: Future, func: Callable, args, kwargs):
+        if "proc" not in ctx:
+            try:
+                ctx["proc"], ctx["conn"] = self._spawn()
+            except Exception as e:  # noqa - 进程数/文件句柄耗尽等；本次尝试失败，worker 线程继续服务
+                return False, TaskExecutionError(f"子进程启动失败: {e!r}")
+        try:
+            proc, conn = ctx["proc"], ctx["conn"]
+            with self._lock:
+                self._busy[fut] = proc
+            conn.send((func, args, kwargs))
+            ok, value = conn.recv()
+        except (EOFError, OSError):
+            # 子进程被终止（超时）或崩溃，下次任务重建
+            proc = ctx.get("proc")
+            ok, value = False, TaskExecutionError(
+                f"子进程异常退出 (exitcode={proc.exitcode if proc is not None else None})")
+            self._retire(ctx)
+            return ok, value
+        except Exception as e:  # noqa - 参数不可 pickle 等
+            ok, value = False, e
+        finally:
+            with self._lock:
+                self._busy.pop(fut, None)
+        with self._lock:
+            killed = ctx.get("proc") in self._killed
+        if killed:
+            # 结果已返回但终止信号已发出，该子进程不能再复用
+            self._retire(ctx)
+        return ok, value
+
+    def _worker_exit(self, ctx: dict):
+        if "proc" in ctx:
+            try:
+                ctx["conn"].send(None)
+            except OSError:
+                pass
+            self._retire(ctx)
+
+    def shutdown(self, terminate: bool = True):
+        super().shutdown()
+        if terminate:
+            with self._lock:
+                procs = list(self._procs)
+            for proc in procs:
+                if proc.is_alive():
+                    proc.terminate()
+
+
+# --------------------------------------------------------------------------- #
+# Cron 编译（D1）
+# 解析仍交给 croniter（保证字段语义一致），每个表达式只解析一次；
+# 展开结果编译为 秒/分/时/日/月/周 位图，下次触发时间直接按位图推算。
+# L / W / # 等扩展语法与 DST 切换附近的计算回退到 croniter。
+# --------------------------------------------------------------------------- #
+_CRON_MAX_YEARS = 50  # 与 croniter 的 max_years_between_matches 默认值一致
+
+_FULL_SECONDS = (1 << 60) - 1
+_FULL_MINUTES = (1 << 60) - 1
+_FULL_HOURS = (1 << 24) - 1
+_FULL_DAYS = ((1 << 32) - 1) & ~1      # 1..31
+_FULL_MONTHS = ((1 << 13) - 1) & ~1    # 1..12
+_FULL_WEEKDAYS = (1 << 7) - 1          # 0..6，0 为周日
+
+
+def _make_croniter(expr: str, base: datetime) -> croniter:
+    fields = expr.split()
+    try:
+        if len(fields) == 6:
+            return croniter(expr, base, second_at_beginning=True)
+        if len(fields) == 5:
+            return croniter(expr, base)
+    except Exception as e:  # noqa
+        raise InvalidCronExpressionError(f"非法 Cron 表达式 '{expr}': {e}")
+    raise InvalidCronExpressionError(
+        f"非法 Cron 表达式 '{expr}': 仅支持 5 位或 6 位，当前 {len(fields)} 位")
+
+
+def _to_mask(values: list, full: int) -> Optional[int]:
+    """croniter 展开值 → 位图；含非整数项（如 'l'）返回 None 表示不支持。"""
+    if values == ["*"]:
+        return full
+    mask = 0
+    for v in values:
+        if not isinstance(v, int):
+            return None
+        mask |= 1 << v
+    return mask
+
+
+def _next_bit(mask: int, start: int) -> Optional[int]:
+    """返回 mask 中 >= start 的最小置位下标。"""
+    m = mask >> start
+    if not m:
+        return None
+    return start + (m & -m).bit_length() - 1
+
+
+class _CompiledCron:
+    __slots__ = ("expr", "has_seconds", "seconds", "minutes", "hours",
+                 "days", "months", "weekdays", "day_or", "fast")
+
+    def __init__(self, expr: str):
+        self.expr = expr
+        self.has_seconds = len(expr.split()) == 6
+        # 仅解析一次；非法表达式在此抛 InvalidCronExpressionError
+        it = _make_croniter(expr, datetime(2000, 1, 1))
+        expanded = it.expanded
+        self.minutes = _to_mask(expanded[0], _FULL_MINUTES)
+        self.hours = _to_mask(expanded[1], _FULL_HOURS)
+        self.days = _to_mask(expanded[2], _FULL_DAYS)
+        self.months = _to_mask(expanded[3], _FULL_MONTHS)
+        self.weekdays = _to_mask(expanded[4], _FULL_WEEKDAYS)
+        self.seconds = _to_mask(expanded[5], _FULL_SECONDS) if self.has_seconds else 1
+        # 日与周同时受限时取并集（croniter 默认 day_or=True）
+        self.day_or = expanded[2][0] != "*" and expanded[4][0] != "*"
+        self.fast = (None not in (self.seconds, self.minutes, self.hours,
+                                  self.days, self.months, self.weekdays)
+                     and not it.nth_weekday_of_month
+                     and not getattr(it, "nearest_weekday", None))
+
+    def _day_ok(self, t: datetime) -> bool:
+        dom = (self.days >> t.day) & 1
+        dow = (self.weekdays >> ((t.weekday() + 1) % 7)) & 1
+        return bool(dom | dow) if self.day_or else bool(dom & dow)
+
+    def _next_naive(self, t: datetime) -> Optional[datetime]:
+        """t 起（含）第一个匹配的本地时间（无时区）。"""
+        year_limit = t.year + _CRON_MAX_YEARS
+        while t.year <= year_limit:
+            if not (self.months >> t.month) & 1:
+                month = _next_bit(self.months, t.month + 1)
+                if month is None:
+                    t = datetime(t.year + 1, _next_bit(self.months, 1), 1)
+                else:
+                    t = datetime(t.year, month, 1)
+                continue
+            if not self._day_ok(t):
+                if not self.day_or and self.weekdays == _FULL_WEEKDAYS:
+                    # 只受「日」约束：直接跳到当月下一个匹配日，没有则跳到下月
+                    day = _next_bit(self.days, t.day + 1)
+                    if day is not None and day <= calendar.monthrange(t.year, t.month)[1]:
+                        t = datetime(t.year, t.month, day)
+                    else:
+                        t = datetime(t.year + t.month // 12, t.month % 12 + 1, 1)
+                else:
+                    t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                continue
+            if not (self.hours >> t.hour) & 1:
+                hour = _next_bit(self.hours, t.hour + 1)
+                if hour is None:
+                    t = datetime(t.year, t.month, t.day) + timedelta(days=1)
+                else:
+                    t = t.replace(hour=hour, minute=0, second=0)
+                continue
+            if not (self.minutes >> t.minute) & 1:
+                minute = _next_bit(self.minutes, t.minute + 1)
+                if minute is None:
+                    t = t.replace(minute=0, second=0) + timedelta(hours=1)
+                else:
+                    t = t.replace(minute=minute, second=0)
+                continue
+            if not (self.seconds >> t.second) & 1:
+                second = _next_bit(self.seconds, t.second + 1)
+                if second is None:
+                    t = t.replace(second=0) + timedelta(minutes=1)
+                else:
+                    t = t.replace(second=second)
+                continue
+            return t
+        return None
+
+    def get_next(self, base: datetime) -> datetime:
+        """严格晚于 base 的下一次触发时间，时区与 base 相同。"""
+        localize = getattr(base.tzinfo, "localize", None)
+        if not self.fast or localize is None:
+            return self._get_next_slow(base)
+        naive = base.replace(tzinfo=None)
+        if self.has_seconds:
+            start = (naive + timedelta(seconds=1)).replace(microsecond=0)
+        else:
+            start = (naive + timedelta(minutes=1)).replace(second=0, microsecond=0)
+        found = self._next_naive(start)
+        if found is None:
+            raise InvalidCronExpressionError(
+                f"非法 Cron 表达式 '{self.expr}': {_CRON_MAX_YEARS} 年内没有可触发的时间")
+        try:
+            result = localize(found, is_dst=None)
+        except (pytz.NonExistentTimeError, pytz.AmbiguousTimeError):
+            return self._get_next_slow(base)
+        if result.utcoffset() != base.utcoffset():
+            # 跨越 DST 切换，交给 croniter 处理备选时间
+            return self._get_next_slow(base)
+        return result
+
+    def _get_next_slow(self, base: datetime) -> datetime:
+        try:
+            return _make_croniter(self.expr, base).get_next(datetime)
+        except CroniterBadDateError as e:
+            raise InvalidCronExpressionError(f"非法 Cron 表达式 '{self.expr}': {e}")
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile_cron(expr: str) -> _CompiledCron:
+    """按表达式字符串缓存，多个任务共享同一编译结果。"""
+    return _CompiledCron(expr)
+
+
+# --------------------------------------------------------------------------- #
+# 持久化（D11）
+# 调度器只向 JobStore 投递「最新快照」，由后台线程合并后批量写入，热路径不等待落盘。
+# 终态实例不落盘（写入即删除），恢复时只需要处理 BLOCKED / PENDING_RETRY / RUNNING。
+# --------------------------------------------------------------------------- #
+class JobStore:
+    """任务存储接口。save/delete 可能在持有任务锁时调用，实现必须快速返回。"""
+
+    def save_job(self, task_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete_job(self, task_id: str):
+        """删除任务及其全部实例。"""
+        raise NotImplementedError
+
+    def save_instance(self, instance_id: str, task_id: str, data: Dict[str, Any]):
+        raise NotImplementedError
+
+    def delete_instance(self, instance_id: str):
+        raise NotImplementedError
+
+    def load(self) -> tuple:
+        """返回 (jobs: {task_id: data}, instances: [data, ...])。"""
+        raise NotImplementedError
+
+    def flush(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class SQLiteJobStore(JobStore):
+    """基于标准库 sqlite3 的写后（write-behind）存储。
+
+    同一 key 的多次写入在内存中合并为最后一次，后台线程每 flush_interval 秒
+    或积压达到 batch_size 时在一个事务里批量提交（WAL + synchronous=NORMAL）。
+    进程崩溃最多丢失最近一个刷盘周期内的状态变化。
+    """
+
+    def __init__(self, path: str, flush_interval: float = 1.0, batch_size: int = 1000):
+        self._path = path
+        self._flush_interval = flush_interval
+        self._batch_size = batch_size
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sched_jobs ("
+                           "task_id TEXT PRIMARY KEY, data BLOB NOT NULL, updated_at REAL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sched_instances ("
+                           "instance_id TEXT PRIMARY KEY, task_id TEXT NOT NULL, "
+                           "data BLOB NOT NULL, updated_at REAL)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_sched_instances_task "
+                           "ON sched_instances(task_id)")
+        self._db_lock = threading.Lock()
+        # key -> (op, payload)；重复 key 先 pop 再插入，保证按最后一次写入的顺序落盘
+        self._pending: Dict[tuple, tuple] = {}
+        self._pending_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._thread = threading.Thread(target=self._flush_loop, name="lite-sched-store",
+                                        daemon=True)
+        self._thread.start()
+
+    def _put(self, key: tuple, op: tuple):
+        with self._pending_lock:
+            if self._closed:
+                return
+            self._pending.pop(key, None)
+            self._pending[key] = op
+            full = len(self._pending) >= self._batch_size
+        if full:
+            self._wakeup.set()
+
+    def save_job(self, task_id: str, data: Dict[str, Any]):
+        self._put(("job", task_id), ("save_job", task_id, data))
+
+    def delete_job(self, task_id: str):
+        self._put(("job", task_id), ("delete_job", task_id, None))
+
+    def save_instance(self, instance_id: str, task_id: str, data: Dict[str, Any]):
+        self._put(("inst", instance_id), ("save_inst", instance_id, (task_id, data)))
+
+    def delete_instance(self, instance_id: str):
+        self._put(("inst", instance_id), ("delete_inst", instance_id, None))
+
+    def load(self) -> tuple:
+        # 先刷盘：恢复前调度器只投递删除（如 start() 前的 remove_job），不会覆盖上次的状态
+        self.flush()
+        with self._db_lock:
+            job_rows = self._conn.execute("SELECT task_id, data FROM sched_jobs").fetchall()
+            inst_rows = self._conn.execute(
+                "SELECT data FROM sched_instances ORDER BY rowid").fetchall()
+        return ({task_id: pickle.loads(data) for task_id, data in job_rows},
+                [pickle.loads(row[0]) for row in inst_rows])
+
+    def _flush_loop(self):
+        while not self._closed:
+            self._wakeup.wait(self._flush_interval)
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        with self._pending_lock:
+            if not self._pending:
+                return
+            ops = list(self._pending.values())
+            self._pending = {}
+        now = time.time()
+        with self._db_lock:
+            try:
+                self._conn.execute("BEGIN")
+                for op, key, payload in ops:
+                    try:
+                        if op == "save_job":
+                            self._conn.execute(
+                                "INSERT OR REPLACE INTO sched_jobs VALUES (?, ?, ?)",
+                                (key, pickle.dumps(payload), now))
+                        elif op == "delete_job":
+                            self._conn.execute("DELETE FROM sched_jobs WHERE task_id = ?", (key,))
+                            self._conn.execute("DELETE FROM sched_instances WHERE task_id = ?",
+                                               (key,))
+                        elif op == "save_inst":
+                            self._conn.execute(
+                                "INSERT OR REPLACE INTO sched_instances VALUES (?, ?, ?, ?)",
+                                (key, payload[0], pickle.dumps(payload[1]), now))
+                        else:
+                            self._conn.execute(
+                                "DELETE FROM sched_instances WHERE instance_id = ?", (key,))
+                    except (pickle.PicklingError, TypeError, AttributeError) as e:
+                        # 单条快照（如参数）不可序列化时跳过，不影响同批其他写入
+                        _emit(logging.ERROR, json.dumps(
+                            {"event": "job_store_error", "key": key, "error": repr(e)},
+                            ensure_ascii=False))
+                self._conn.execute("COMMIT")
+            except sqlite3.Error as e:
+                self._conn.execute("ROLLBACK")
+                _emit(logging.ERROR, json.dumps(
+                    {"event": "job_store_error", "error": repr(e), "dropped": len(ops)},
+                    ensure_ascii=False))
+
+    def close(self):
+        self.flush()
+        with self._pending_lock:
+            self._closed = True
+        self._wakeup.set()
+        self._thread.join(timeout=5)
+        self.flush()
+        with self._db_lock:
+            self._conn.close()
+
+
+def _func_ref(func: Callable) -> str:
+    return f"{getattr(func, '__module__', '')}:{getattr(func, '__qualname__', '')}"
+
+
+def _resolve_func_ref(ref: str) -> Optional[Callable]:
+    """按 module:qualname 找回函数；闭包 / lambda 等无法定位时返回 None。"""
+    module_name, _, qualname = ref.partition(":")
+    if not module_name or not qualname or "<" in qualname:
+        return None
+    try:
+        obj = importlib.import_module(module_name)
+        for part in qualname.split("."):
+            obj = getattr(obj, part)
+    except (ImportError, AttributeError):
+        return None
+    return obj if callable(obj) else None
+
+
+# --------------------------------------------------------------------------- #
+# 多副本协调（D14）
+# 节点定期心跳续约，存活节点集合由后台线程刷新；任务按 Rendezvous 哈希分片，
+# 成员变化时只迁移离开/加入节点对应的那部分任务。每个触发时刻（task_id + fire_ts）
+# 由 claim 原子占用，分片视图短暂不一致时也只有一个节点执行。
+# --------------------------------------------------------------------------- #
+class LeaseBackend:
+    """租约后端接口。heartbeat / live_nodes 只在续约线程调用，claim 在主循环触发时调用。"""
+
+    def heartbeat(self, node_id: str, ttl: float):
+        """登记或续约节点，ttl 秒内未再续约即视为离线。"""
+        raise NotImplementedError
+
+    def live_nodes(self) -> List[str]:
+        raise NotImplementedError
+
+    def leave(self, node_id: str):
+        """节点主动下线，其分片立即由其他节点接管。"""
+        raise NotImplementedError
+
+    def claim(self, key: str, node_id: str) -> bool:
+        """原子占用一次性 key；已被其他节点占用返回 False。
+        在主循环上同步调用，实现应有较短的超时，超时抛异常（按未占用处理）。"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteLeaseBackend(LeaseBackend):
+    """基于共享 SQLite 文件的租约后端，适用于同机多进程或本地测试。
+
+    claim 记录保留 claim_retention 秒后清理，远大于任一节点处理同一触发时刻的时间窗口。
+    claim 使用独立连接，不与续约线程争锁；等待写锁最多 claim_timeout 秒，超时抛出
+    sqlite3.OperationalError，调度器按未占用处理（放弃本次触发）。
+    """
+
+    def __init__(self, path: str, claim_retention: float = 3600.0, busy_timeout: float = 5.0,
+                 claim_timeout: float = 0.2):
+        self._path = path
+        self._claim_retention = claim_retention
+        self._claim_timeout = claim_timeout
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                     timeout=busy_timeout)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sched_nodes ("
+                           "node_id TEXT PRIMARY KEY, expires_at REAL NOT NULL)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS sched_claims ("
+                           "claim_key TEXT PRIMARY KEY, node_id TEXT NOT NULL, "
+                           "expires_at REAL NOT NULL)")
+        self._db_lock = threading.Lock()
+        self._claim_conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None,
+                                           timeout=claim_timeout)
+        self._claim_lock = threading.Lock()
+
+    def heartbeat(self, node_id: str, ttl: float):
+        now = time.time()
+        with self._db_lock:
+            self._conn.execute("INSERT OR REPLACE INTO sched_nodes VALUES (?, ?)",
+                               (node_id, now + ttl))
+            # 顺带清理过期的 claim 与长期离线的节点
+            self._conn.execute("DELETE FROM sched_claims WHERE expires_at < ?", (now,))
+            self._conn.execute("DELETE FROM sched_nodes WHERE expires_at < ?",
+                               (now - self._claim_retention,))
+
+    def live_nodes(self) -> List[str]:
+        with self._db_lock:
+            rows = self._conn.execute("SELECT node_id FROM sched_nodes WHERE expires_at >= ?",
+                                      (time.time(),)).fetchall()
+        return [row[0] for row in rows]
+
+    def leave(self, node_id: str):
+        with self._db_lock:
+            self._conn.execute("DELETE FROM sched_nodes WHERE node_id = ?", (node_id,))
+
+    def claim(self, key: str, node_id: str) -> bool:
+        now = time.time()
+        if not self._claim_lock.acquire(timeout=self._claim_timeout):
+            raise TimeoutError(f"claim 等待超时 ({self._claim_timeout}s): {key}")
+        try:
+            cur = self._claim_conn.execute(
+                "INSERT INTO sched_claims VALUES (?, ?, ?) ON CONFLICT(claim_key) DO UPDATE "
+                "SET node_id = excluded.node_id, expires_at = excluded.expires_at "
+                "WHERE sched_claims.expires_at < ?",
+                (key, node_id, now + self._claim_retention, now))
+            return cur.rowcount == 1
+        finally:
+            self._claim_lock.release()
+
+    def close(self):
+        with self._claim_lock:
+            self._claim_conn.close()
+        with self._db_lock:
+            self._conn.close()
+
+
+def _rendezvous_owner(task_id: str, nodes: tuple) -> Optional[str]:
+    """最高随机权重（HRW）哈希：得分最高的节点负责该任务。"""
+    best, best_score = None, b""
+    for node in nodes:
+        score = hashlib.blake2b(f"{node}\x00{task_id}".encode("utf-8"), digest_size=8).digest()
+        if best is None or score > best_score:
+            best, best_score = node, score
+    return best
+
+
 # --------------------------------------------------------------------------- #
 # 调度器
 # --------------------------------------------------------------------------- #
+DEFAULT_POOL = "default"
+PROCESS_POOL = "process"
+
+
 class Scheduler:
     def __init__(self,
                  timezone: str = "Asia/Shanghai",
@@ -179,67 +1369,131 @@ class Scheduler:
                  default_max_instances: int = 1,
                  default_blocking_strategy: str = "WAIT",
                  default_blocking_timeout: int = 300,
-                 tick_interval: float = 1.0):
+                 tick_interval: float = 1.0,
+                 max_processes: Optional[int] = None,
+                 process_start_method: str = "spawn",
+                 pools: Optional[Dict[str, int]] = None,
+                 job_store: Optional[JobStore] = None,
+                 misfire_policy: str = "SKIP",
+                 misfire_grace_time: Optional[int] = None,
+                 emit_logs: bool = True,
+                 event_flush_interval: float = 0.1,
+                 max_pending_events: int = 100000,
+                 max_arg_length: int = 200,
+                 loop_probe_interval: float = 1.0,
+                 coordinator: Optional[LeaseBackend] = None,
+                 node_id: Optional[str] = None,
+                 lease_ttl: float = 10.0,
+                 history_size: int = 0,
+                 retry_budget: Optional[float] = None,
+                 retry_budget_min_per_second: float = 1.0,
+                 retry_budget_window: float = 10.0,
+                 clock: Optional[Clock] = None):
         self._tz = pytz.timezone(timezone)
-        self._max_workers = max_workers
+        self._clock = clock or _SYSTEM_CLOCK
         self._default_max_instances = default_max_instances
         self._default_blocking_strategy = BlockingStrategy(default_blocking_strategy)
         self._default_blocking_timeout = default_blocking_timeout
-        self._tick = tick_interval
+        self._history_size = history_size  # 每个任务保留的最近终结实例数，0 表示不保留
+        # 全局重试预算（D19）：None 表示不限制
+        self._retry_budget = (_RetryBudget(retry_budget, retry_budget_min_per_second,
+                                           retry_budget_window, self._new_lock())
+                              if retry_budget is not None else None)
+        self._tick = tick_interval  # 主循环最长休眠时间（兜底，正常按堆顶截止时刻唤醒）
+        self._events = _EventBus(self._tz, self._clock, event_flush_interval, max_pending_events,
+                                 max_arg_length, emit_logs)
 
         self._jobs: Dict[str, Job] = {}
+        self._downstream: Dict[str, List[str]] = {}  # 上游 task_id → 下游 task_id（D17）
         self._registry_lock = threading.RLock()
-        self._pool = ThreadPoolExecutor(max_workers=max_workers,
-                                        thread_name_prefix="lite-sched")
+        # 截止时刻堆：(deadline, seq, job)，惰性删除（与 job._deadline 不一致即为陈旧项）
+        self._heap: List[tuple] = []
+        self._heap_seq = itertools.count()
+        self._cond = self._new_condition()
+        # 执行器池：default（线程）与 process（进程）内置，其余通过 pools / add_pool 声明；
+        # worker 线程与子进程都在首次投递时才创建
+        self._process_start_method = process_start_method
+        self._pools: Dict[str, _WorkerPool] = {
+            DEFAULT_POOL: _ThreadPool(DEFAULT_POOL, max_workers, self._clock),
+            PROCESS_POOL: _ProcessPool(PROCESS_POOL, max_processes or os.cpu_count() or 1,
+                                       process_start_method, self._clock),
+        }
+        for pool_name, pool_workers in (pools or {}).items():
+            self.add_pool(pool_name, pool_workers)
+        self._rate_groups: Dict[str, _TokenBucket] = {}  # 限流组（D18），通过 add_rate_group 声明
+        self._store = job_store
+        # 恢复前不投递快照：add_job 的初始快照若先刷盘，会覆盖上次运行落盘的状态
+        self._store_ready = False
+        self._default_misfire_policy = MisfirePolicy(misfire_policy)
+        self._misfire_grace_time = misfire_grace_time  # None 表示错过多久都补偿
         self._loop: Optional[asyncio.AbstractEventLoop] = None
         self._loop_thread: Optional[threading.Thread] = None
         self._running = False
+        self._stopping = False  # 停机中（run_pending 单步驱动时 _running 也为 False）
+        # 事件循环延迟探针（D13）：按固定间隔排一个回调，实际执行时刻与预期之差即为延迟
+        self._loop_probe_interval = loop_probe_interval
+        self._loop_lag = 0.0
+        self._loop_lag_hist = _Histogram()
+        self._metrics_server: Optional[http.server.ThreadingHTTPServer] = None
+        # 多副本协调（D14）：存活节点视图由续约线程整体替换，主循环只读
+        self._coordinator = coordinator
+        self._node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self._lease_ttl = lease_ttl
+        self._live_nodes: tuple = (self._node_id,)
+        self._lease_stop = threading.Event()
+        self._lease_thread: Optional[threading.Thread] = None
 
     # ------------------------------------------------------------------ #
     # 时间辅助
     # ------------------------------------------------------------------ #
     def _now_dt(self) -> datetime:
-        return datetime.now(self._tz)
+        return datetime.fromtimestamp(self._clock.time(), self._tz)
 
+    def _compute_next(self, expr: Optional[str], base: datetime) -> Optional[datetime]:
+        """无 Cron 的任务（只由依赖 / 手动触发）没有下一次触发时刻。"""
+        if expr is None:
+            return None
+        return _compile_cron(expr).get_next(base)
+
+    # ------------------------------------------------------------------ #
+    # 运行时钩子：线程模型相关的部分，AsyncScheduler 覆盖
+    # ------------------------------------------------------------------ #
     @staticmethod
-    def _make_croniter(expr: str, base: datetime) -> croniter:
-        fields = expr.split()
-        try:
-            if len(fields) == 6:
-                return croniter(expr, base, second_at_beginning=True)
-            if len(fields) == 5:
-                return croniter(expr, base)
-        except Exception as e:  # noqa
-            raise InvalidCronExpressionError(f"非法 Cron 表达式 '{expr}': {e}")
-        raise InvalidCronExpressionError(
-            f"非法 Cron 表达式 '{expr}': 仅支持 5 位或 6 位，当前 {len(fields)} 位")
-
-    def _compute_next(self, expr: str, base: datetime) -> datetime:
-        return self._make_croniter(expr, base).get_next(datetime)
+    def _new_lock():
+        return threading.RLock()
+
+    @staticmethod
+    def _new_condition():
+        return threading.Condition()
+
+    def _wake_main_loop(self):
+        """截止时刻提前时唤醒主循环（调用方须持 self._cond）。"""
+        self._cond.notify()
+
+    def _submit_coroutine(self, coro) -> Future:
+        return asyncio.run_coroutine_threadsafe(coro, self._loop)
+
+    def _watch_future(self, job: Job, inst: Instance, fut):
+        fut.add_done_callback(lambda f, j=job, i=inst: self._on_future_done(j, i, f))
 
     # ------------------------------------------------------------------ #
     # 日志
     # ------------------------------------------------------------------ #
     def _log(self, job: Job, inst: Instance, event: str, level: int, **extra):
-        record = {
-            "timestamp": self._now_dt().strftime("%Y-%m-%d %H:%M:%S"),
-            "task_id": job.task_id,
-            "instance_id": inst.instance_id,
-            "event": event,
-            "source": inst.source,
-            "attempt": inst.attempt,
-            "args": inst.args,
-            "kwargs": inst.kwargs,
-        }
-        for k, v in extra.items():
-            if v is not None:
-                record[k] = v
-        _emit(level, json.dumps(record, ensure_ascii=False, default=str))
+        # 只入队（D12），格式化与输出在事件线程完成；参数快照在实例终结前不会被修改
+        self._events.publish(level, event, job.task_id, inst.instance_id, inst.source,
+                             inst.attempt, inst.args, inst.kwargs, extra)
 
     def _log_scheduler(self, event: str, level: int = logging.INFO, **extra):
-        record = {"timestamp": self._now_dt().strftime("%Y-%m-%d %H:%M:%S"), "event": event}
-        record.update(extra)
-        _emit(level, json.dumps(record, ensure_ascii=False, default=str))
+        self._events.publish(level, event, None, None, None, None, None, None, extra)
+
+    def subscribe(self, sink: Callable[[Dict[str, Any]], None]):
+        """订阅调度事件；sink 在事件线程中按批被调用，参数为与 JSON 日志相同的字典
+        （额外带 level）。sink 内的异常会被记录并忽略。"""
+        self._events.subscribe(sink)
+
+    def unsubscribe(self, sink: Callable[[Dict[str, Any]], None]):
+        self._events.unsubscribe(sink)
 
     # ------------------------------------------------------------------ #
     # 注册 / 生命周期
@@ -247,7 +1501,7 @@ class Scheduler:
     def add_job(self,
                 task_id: str,
                 func: Callable,
-                cron: str,
+                cron: Optional[str] = None,
                 args: Optional[List] = None,
                 kwargs: Optional[Dict] = None,
                 run_immediately: bool = False,
@@ -257,13 +1511,38 @@ class Scheduler:
                 max_queue_size: int = 100,
                 retry_times: int = 0,
                 retry_delay: int = 60,
+                retry_backoff: float = 1.0,
+                retry_max_delay: Optional[float] = None,
+                retry_jitter: bool = False,
                 timeout: Optional[int] = None,
-                name: Optional[str] = None) -> Job:
+                name: Optional[str] = None,
+                executor: Optional[str] = None,
+                pool: Optional[str] = None,
+                priority: int = 0,
+                misfire_policy: Optional[str] = None,
+                coalesce_kwarg: str = "triggers",
+                depends_on: Optional[List[str]] = None,
+                rate_limit: Optional[float] = None,
+                rate_burst: Optional[float] = None,
+                rate_group: Optional[str] = None,
+                adaptive_concurrency: bool = False,
+                latency_target: Optional[float] = None) -> Job:
         if not callable(func):
             raise SchedulerError("func 必须是可调用对象")
+        executor_type, pool_name = self._resolve_executor(func, executor, pool)
+        buckets = self._resolve_rate_limit(rate_limit, rate_burst, rate_group)
+        if retry_backoff < 1:
+            raise SchedulerError("retry_backoff 必须 >= 1")
+        if retry_max_delay is not None and retry_max_delay < 0:
+            raise SchedulerError("retry_max_delay 必须 >= 0")
+        depends_on = tuple(dict.fromkeys(depends_on or ()))
         with self._registry_lock:
             if task_id in self._jobs:
                 raise TaskAlreadyExistsError(f"任务已存在: {task_id}")
+            # 上游必须已注册（依赖只能指向已有任务，因此不会成环）
+            for upstream in depends_on:
+                if upstream not in self._jobs:
+                    raise TaskNotFoundError(f"上游任务不存在: {upstream}")
             # 校验 cron（会在非法时抛 InvalidCronExpressionError）
             first_next = self._compute_next(cron, self._now_dt())
 
@@ -272,7 +1551,12 @@ class Scheduler:
                 func=func,
                 cron=cron,
                 is_coroutine=asyncio.iscoroutinefunction(func),
-                args=list(args) if args else [],
+                executor=executor_type,
+                pool=pool_name,
+                priority=priority,
+                misfire_policy=MisfirePolicy(misfire_policy) if misfire_policy
+                else self._default_misfire_policy,
+                args=tuple(args) if args else (),
                 kwargs=dict(kwargs) if kwargs else {},
                 max_instances=max_instances if max_instances is not None else self._default_max_instances,
                 blocking_strategy=BlockingStrategy(blocking_strategy) if blocking_strategy
@@ -282,16 +1566,42 @@ class Scheduler:
                 max_queue_size=max_queue_size,
                 retry_times=retry_times,
                 retry_delay=retry_delay,
+                retry_backoff=retry_backoff,
+                retry_max_delay=retry_max_delay,
+                retry_jitter=retry_jitter,
                 timeout=timeout,
                 name=name,
+                coalesce_kwarg=coalesce_kwarg,
+                depends_on=depends_on,
+                rate_limit=rate_limit,
+                rate_burst=rate_burst,
+                rate_group=rate_group,
+                adaptive_concurrency=adaptive_concurrency,
+                latency_target=latency_target,
                 next_run=first_next,
+                lock=self._new_lock(),
+                _buckets=buckets,
             )
+            if adaptive_concurrency:
+                job._aimd = _AIMDLimiter(job.max_instances, latency_target)
+            if depends_on:
+                job._deps_waiting = set(depends_on)
+                for upstream in depends_on:
+                    self._downstream.setdefault(upstream, []).append(task_id)
             self._jobs[task_id] = job
+        with job.lock:
+            self._reschedule(job)
+            self._persist_job(job)
 
         self._log_scheduler("job_added", task_id=task_id, cron=cron,
+                            depends_on=list(depends_on) or None,
                             max_instances=job.max_instances,
                             strategy=job.blocking_strategy.value,
-                            is_async=job.is_coroutine)
+                            is_async=job.is_coroutine,
+                            executor=job.executor.value,
+                            pool=job.pool, priority=job.priority,
+                            rate_limit=rate_limit, rate_group=rate_group,
+                            adaptive_concurrency=adaptive_concurrency)
 
         if run_immediately:
             if self._running:
@@ -301,7 +1611,107 @@ class Scheduler:
         return job
 
 
-    def task(self, task_id: str, cron: str, **opts):
+    def _resolve_executor(self, func: Callable, executor: Optional[str],
+                          pool: Optional[str]) -> tuple:
+        """按函数类型路由（D3），校验显式指定的执行器与池，返回 (executor, pool)。"""
+        is_coroutine = asyncio.iscoroutinefunction(func)
+        if pool is not None:
+            if pool not in self._pools:
+                raise SchedulerError(f"执行器池不存在: {pool}")
+            if is_coroutine:
+                raise SchedulerError("async def 任务运行在事件循环中，不能指定执行器池")
+            pool_kind = self._pools[pool].kind
+            if executor is not None and ExecutorType(executor) != pool_kind:
+                raise SchedulerError(
+                    f"executor='{executor}' 与执行器池 '{pool}' 的类型 '{pool_kind.value}' 不匹配")
+            executor = pool_kind.value
+        if executor is None:
+            executor_type = ExecutorType.ASYNC if is_coroutine else ExecutorType.THREAD
+        else:
+            executor_type = ExecutorType(executor)
+        if is_coroutine != (executor_type == ExecutorType.ASYNC):
+            raise SchedulerError(
+                f"executor='{executor_type.value}' 与函数类型不匹配（async def 只能用 async）")
+        if executor_type == ExecutorType.PROCESS:
+            try:
+                pickle.dumps(func)
+            except Exception as e:  # noqa
+                raise SchedulerError(f"executor='process' 要求 func 可被 pickle（模块级函数）: {e}")
+        if pool is None and executor_type != ExecutorType.ASYNC:
+            pool = PROCESS_POOL if executor_type == ExecutorType.PROCESS else DEFAULT_POOL
+        return executor_type, pool
+
+    def add_pool(self, name: str, max_workers: int, executor: str = "thread"):
+        """声明命名执行器池；任务通过 add_job(pool=name) 指定。"""
+        executor_type = ExecutorType(executor)
+        if executor_type == ExecutorType.ASYNC:
+            raise SchedulerError("async 任务运行在事件循环中，不需要执行器池")
+        if max_workers < 1:
+            raise SchedulerError("max_workers 必须 >= 1")
+        with self._registry_lock:
+            if name in self._pools:
+                raise SchedulerError(f"执行器池已存在: {name}")
+            if executor_type == ExecutorType.PROCESS:
+                self._pools[name] = _ProcessPool(name, max_workers, self._process_start_method,
+                                                 self._clock)
+            else:
+                self._pools[name] = _ThreadPool(name, max_workers, self._clock)
+        self._log_scheduler("pool_added", pool=name, executor=executor_type.value,
+                            max_workers=max_workers)
+
+    def _resolve_rate_limit(self, rate_limit: Optional[float], rate_burst: Optional[float],
+                            rate_group: Optional[str]) -> tuple:
+        """校验限流参数，返回任务需要取令牌的桶（任务桶在前、组桶在后）。"""
+        buckets = []
+        if rate_limit is not None:
+            if rate_limit <= 0:
+                raise SchedulerError("rate_limit 必须 > 0")
+            burst = rate_burst if rate_burst is not None else max(1.0, rate_limit)
+            if burst < 1:
+                raise SchedulerError("rate_burst 必须 >= 1")
+            buckets.append(_TokenBucket(rate_limit, burst, self._clock.time(), self._new_lock()))
+        elif rate_burst is not None:
+            raise SchedulerError("rate_burst 需要与 rate_limit 一起使用")
+        if rate_group is not None:
+            if rate_group not in self._rate_groups:
+                raise SchedulerError(f"限流组不存在: {rate_group}")
+            buckets.append(self._rate_groups[rate_group])
+        return tuple(buckets)
+
+    def add_rate_group(self, name: str, rate: float, burst: Optional[float] = None):
+        """声明限流组：组内任务共享一个令牌桶（每秒 rate 个，容量 burst）；
+        任务通过 add_job(rate_group=name) 加入。"""
+        if rate <= 0:
+            raise SchedulerError("rate 必须 > 0")
+        burst = burst if burst is not None else max(1.0, rate)
+        if burst < 1:
+            raise SchedulerError("burst 必须 >= 1")
+        with self._registry_lock:
+            if name in self._rate_groups:
+                raise SchedulerError(f"限流组已存在: {name}")
+            self._rate_groups[name] = _TokenBucket(rate, burst, self._clock.time(),
+                                                   self._new_lock())
+        self._log_scheduler("rate_group_added", rate_group=name, rate=rate, burst=burst)
+
+    def get_rate_group_status(self) -> Dict[str, Dict[str, Any]]:
+        """各限流组的速率、容量与当前令牌数。"""
+        now = self._clock.time()
+        result = {}
+        for name, bucket in list(self._rate_groups.items()):
+            with bucket.lock:
+                bucket.refill(now)
+                result[name] = bucket.status()
+        return result
+
+    def get_pool_status(self, name: Optional[str] = None) -> Dict[str, Any]:
+        """单个池或全部池的统计；排队等待与执行耗时分开统计。"""
+        if name is not None:
+            if name not in self._pools:
+                raise SchedulerError(f"执行器池不存在: {name}")
+            return self._pools[name].status()
+        return {pool_name: pool.status() for pool_name, pool in list(self._pools.items())}
+
+    def task(self, task_id: str, cron: Optional[str] = None, **opts):
         """装饰器注册。"""
         def decorator(fn: Callable) -> Callable:
             self.add_job(task_id=task_id, func=fn, cron=cron, **opts)
@@ -316,12 +1726,20 @@ class Scheduler:
 
     def remove_job(self, task_id: str):
         with self._registry_lock:
-            job = self._jobs.pop(task_id, None)
-        if job is None:
-            raise TaskNotFoundError(f"任务不存在: {task_id}")
+            if task_id not in self._jobs:
+                raise TaskNotFoundError(f"任务不存在: {task_id}")
+            if self._downstream.get(task_id):
+                raise SchedulerError(
+                    f"任务仍被下游依赖，请先移除: {', '.join(self._downstream[task_id])}")
+            job = self._jobs.pop(task_id)
+            self._downstream.pop(task_id, None)
+            for upstream in job.depends_on:
+                self._downstream[upstream].remove(task_id)
         with job.lock:
             job.enabled = False
             self._drain_queue(job, InstanceState.CANCELLED, "任务被移除")
+        if self._store is not None:
+            self._store.delete_job(task_id)
         # RUNNING 实例不强杀，其回调仍会正常收尾（不再影响调度）
         self._log_scheduler("job_removed", task_id=task_id)
 
@@ -329,6 +1747,7 @@ class Scheduler:
         job = self._get_job(task_id)
         with job.lock:
             job.enabled = False
+            self._persist_job(job)
         self._log_scheduler("job_paused", task_id=task_id)
 
     def resume_job(self, task_id: str):
@@ -336,18 +1755,22 @@ class Scheduler:
         with job.lock:
             job.enabled = True
             job.next_run = self._compute_next(job.cron, self._now_dt())
+            self._reschedule(job)
+            self._persist_job(job)
         self._log_scheduler("job_resumed", task_id=task_id)
 
     def update_job_params(self, task_id: str,
                           args: Optional[List] = None,
                           kwargs: Optional[Dict] = None):
-        """仅影响此后新产生的触发；已存在实例保留各自的参数快照。"""
+        """仅影响此后新产生的触发；已存在实例保留各自的参数快照。
+        参数整体替换而不是原地修改，已有实例共享的旧快照不受影响。"""
         job = self._get_job(task_id)
         with job.lock:
             if args is not None:
-                job.args = list(args)
+                job.args = tuple(args)
             if kwargs is not None:
                 job.kwargs = dict(kwargs)
+            self._persist_job(job)
         self._log_scheduler("job_params_updated", task_id=task_id,
                             args=job.args, kwargs=job.kwargs)
 
@@ -390,77 +1813,345 @@ class Scheduler:
                 "kwargs": dict(job.kwargs),
                 "blocking_strategy": job.blocking_strategy.value,
                 "last_trigger_source": job.last_trigger_source,
+                "executor": job.executor.value,
+                "pool": job.pool,
+                "priority": job.priority,
+                "misfire_policy": job.misfire_policy.value,
+                "depends_on": list(job.depends_on),
+                "downstream": list(self._downstream.get(task_id, ())),
+                "concurrency_limit": _slot_limit(job),
+                "rate_limit": job.rate_limit,
+                "rate_group": job.rate_group,
+            }
+
+    def get_job_history(self, task_id: str) -> List[Dict[str, Any]]:
+        """最近终结的实例（旧 → 新），最多 history_size 条；未开启时为空列表。"""
+        job = self._get_job(task_id)
+        with job.lock:
+            records = list(job.history or ())
+        fmt = lambda ts: datetime.fromtimestamp(ts, self._tz).strftime("%Y-%m-%d %H:%M:%S") \
+            if ts else None
+        return [{
+            "instance_id": instance_id,
+            "source": source,
+            "state": state,
+            "attempt": attempt,
+            "scheduled_time": fmt(scheduled_at),
+            "finished_time": fmt(finished_at),
+            "duration_ms": int((finished_at - started_at) * 1000) if started_at else None,
+            "error": error,
+        } for instance_id, source, state, attempt, scheduled_at, started_at, finished_at, error
+            in records]
+
+    def _record_history(self, job: Job, instance_id: str, source: str, state: InstanceState,
+                        attempt: int, scheduled_at: float, started_at: float,
+                        error: Optional[str] = None):
+        """记录一条终结摘要（小元组，不持有实例与参数；调用方须持 job.lock）。"""
+        if not self._history_size:
+            return
+        if job.history is None:
+            job.history = deque(maxlen=self._history_size)
+        job.history.append((instance_id, source, state.value, attempt, scheduled_at,
+                            started_at, self._clock.time(), error))
+
+    def _finish_instance(self, job: Job, inst: Instance, state: InstanceState,
+                         error: Optional[str] = None):
+        inst.finalized = True
+        inst.state = state
+        self._record_history(job, inst.instance_id, inst.source, state, inst.attempt,
+                             inst.scheduled_at, inst.attempt_start, error)
+
+    # ------------------------------------------------------------------ #
+    # 指标（D13）
+    # ------------------------------------------------------------------ #
+    def _probe_loop_lag(self, expected: Optional[float]):
+        """在事件循环内周期执行；实际回调时刻晚于预期的部分即事件循环延迟。"""
+        now = self._loop.time()
+        if expected is not None:
+            self._loop_lag = max(0.0, now - expected)
+            self._loop_lag_hist.observe(self._loop_lag)
+        if self._running:
+            self._loop.call_later(self._loop_probe_interval, self._probe_loop_lag,
+                                  now + self._loop_probe_interval)
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """指标快照（拉取式）。耗时单位为秒，直方图桶为累计计数。"""
+        jobs, async_inflight = {}, 0
+        for job in list(self._jobs.values()):
+            m = job.metrics
+            running_async = sum(1 for i in list(job.instances.values())
+                                if i.is_async and i.state == InstanceState.RUNNING)
+            async_inflight += running_async
+            jobs[job.task_id] = {
+                "pool": job.pool,
+                "triggered": job.total_triggered,
+                "success": job.success_count,
+                "failed": job.failed_count,
+                "rejected": m.rejected,
+                "retries": m.retries,
+                "timeouts": m.timeouts,
+                "coalesced": m.coalesced,
+                "rate_limited": m.rate_limited,
+                "retries_denied": m.retries_denied,
+                "running": job.running_count,
+                "concurrency_limit": _slot_limit(job),
+                "blocked": len(job.blocked_queue),
+                "schedule_lag": m.snapshot("schedule_lag"),
+                "queue_wait": m.snapshot("queue_wait"),
+                "run_duration": m.snapshot("run_duration"),
             }
+        pools = {}
+        for pool_name, pool in list(self._pools.items()):
+            status = pool.status()
+            status["utilization"] = status["active"] / pool.max_workers
+            status.update(pool.metrics())
+            pools[pool_name] = status
+        return {
+            "jobs": jobs,
+            "pools": pools,
+            "event_loop": {
+                "running": self._loop is not None and self._loop.is_running(),
+                "inflight": async_inflight,
+                "lag": self._loop_lag,
+                "lag_histogram": self._loop_lag_hist.snapshot(),
+            },
+            "retry_budget": (self._retry_budget.status(self._clock.time())
+                             if self._retry_budget is not None else None),
+        }
+
+    def render_metrics(self) -> str:
+        """Prometheus 文本格式（0.0.4）的全部指标。"""
+        snap = self.get_metrics()
+        w = _PromWriter()
+        for task_id, m in snap["jobs"].items():
+            w.sample("job_triggered_total", "counter", "Triggers accepted or rejected.",
+                     m["triggered"], task_id=task_id)
+            w.sample("job_success_total", "counter", "Instances finished successfully.",
+                     m["success"], task_id=task_id)
+            w.sample("job_failed_total", "counter", "Instances failed after all retries.",
+                     m["failed"], task_id=task_id)
+            w.sample("job_rejected_total", "counter", "Triggers rejected by admission.",
+                     m["rejected"], task_id=task_id)
+            w.sample("job_retries_total", "counter", "Attempts scheduled for retry.",
+                     m["retries"], task_id=task_id)
+            w.sample("job_timeouts_total", "counter", "Attempts that timed out.",
+                     m["timeouts"], task_id=task_id)
+            w.sample("job_retries_denied_total", "counter", "Retries dropped by the retry budget.",
+                     m["retries_denied"], task_id=task_id)
+            w.sample("job_coalesced_total", "counter", "Triggers merged into a queued run.",
+                     m["coalesced"], task_id=task_id)
+            w.sample("job_rate_limited_total", "counter", "Triggers held back by rate limits.",
+                     m["rate_limited"], task_id=task_id)
+            w.sample("job_running", "gauge", "Occupied instance slots.",
+                     m["running"], task_id=task_id)
+            w.sample("job_concurrency_limit", "gauge", "Effective max_instances (adaptive).",
+                     m["concurrency_limit"], task_id=task_id)
+            w.sample("job_blocked", "gauge", "Instances waiting in the WAIT queue.",
+                     m["blocked"], task_id=task_id)
+            w.histogram("job_schedule_lag_seconds", "Planned fire time to first dispatch.",
+                        m["schedule_lag"], task_id=task_id)
+            w.histogram("job_queue_wait_seconds", "WAIT queue enqueue to dispatch.",
+                        m["queue_wait"], task_id=task_id)
+            w.histogram("job_run_duration_seconds", "Run time of each attempt.",
+                        m["run_duration"], task_id=task_id)
+        for pool_name, p in snap["pools"].items():
+            w.sample("pool_workers", "gauge", "Configured workers.",
+                     p["max_workers"], pool=pool_name, executor=p["executor"])
+            w.sample("pool_active", "gauge", "Workers currently running a task.",
+                     p["active"], pool=pool_name, executor=p["executor"])
+            w.sample("pool_queued", "gauge", "Tasks waiting for a worker.",
+                     p["queued"], pool=pool_name, executor=p["executor"])
+            w.sample("pool_utilization", "gauge", "Active workers / configured workers.",
+                     p["utilization"], pool=pool_name, executor=p["executor"])
+            w.histogram("pool_queue_wait_seconds", "Pool submit to worker start.",
+                        p["queue_wait"], pool=pool_name)
+            w.histogram("pool_run_duration_seconds", "Run time on a pool worker.",
+                        p["run_duration"], pool=pool_name)
+        loop = snap["event_loop"]
+        w.sample("event_loop_inflight", "gauge", "Async instances currently running.",
+                 loop["inflight"])
+        w.sample("event_loop_lag_seconds", "gauge", "Latest event loop probe delay.",
+                 loop["lag"])
+        w.histogram("event_loop_lag_probe_seconds", "Event loop probe delays.",
+                    loop["lag_histogram"])
+        budget = snap["retry_budget"]
+        if budget is not None:
+            w.sample("retry_budget_available", "gauge", "Retries left in the budget window.",
+                     budget["available"])
+        return w.render()
+
+    def start_metrics_server(self, port: int = 9464, host: str = "127.0.0.1") -> tuple:
+        """在后台线程启动 /metrics HTTP 端点，返回实际监听的 (host, port)（port=0 时随机）。"""
+        if self._metrics_server is not None:
+            raise SchedulerError("指标服务已启动")
+        sched = self
+
+        class _MetricsHandler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?", 1)[0] not in ("/", "/metrics"):
+                    self.send_error(404)
+                    return
+                body = sched.render_metrics().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # 不写 stderr
+                pass
+
+        server = http.server.ThreadingHTTPServer((host, port), _MetricsHandler)
+        server.daemon_threads = True
+        self._metrics_server = server
+        threading.Thread(target=server.serve_forever, name="lite-sched-metrics",
+                         daemon=True).start()
+        self._log_scheduler("metrics_server_started", host=server.server_address[0],
+                            port=server.server_address[1])
+        return server.server_address[:2]
 
     # ------------------------------------------------------------------ #
     # 提交与准入（§6.2）
     # ------------------------------------------------------------------ #
-    def _new_instance(self, job: Job, source: TriggerSource) -> Instance:
+    def _new_instance(self, job: Job, source: TriggerSource,
+                      scheduled_at: Optional[float] = None) -> Instance:
         job._seq += 1
         inst = Instance(
             instance_id=f"{job.task_id}#{job._seq}",
             task_id=job.task_id,
-            args=list(job.args),      # 触发时刻的参数快照
-            kwargs=dict(job.kwargs),
+            args=job.args,            # 触发时刻的参数快照（与任务共享，只读）
+            kwargs=job.kwargs,
             source=source.value,
             is_async=job.is_coroutine,
+            scheduled_at=scheduled_at or self._clock.time(),
         )
-        job.instances[inst.instance_id] = inst
+        if job.blocking_strategy == BlockingStrategy.COALESCE:
+            inst.triggers = [self._trigger_record(inst)]
         return inst
 
-    def _submit(self, job: Job, source: TriggerSource) -> Optional[Instance]:
+    @staticmethod
+    def _trigger_record(inst: Instance) -> Dict[str, Any]:
+        return {"scheduled_at": inst.scheduled_at, "source": inst.source,
+                "args": inst.args, "kwargs": inst.kwargs}
+
+    def _coalesce(self, job: Job, source: TriggerSource,
+                  scheduled_at: Optional[float]) -> Optional[Instance]:
+        """并到队尾的合并实例，合并数已满时拒绝本次触发（调用方须持 job.lock）。
+        合并实例的参数取最新一次触发的快照。"""
+        target = job.blocked_queue[-1]
+        if len(target.triggers) >= job.max_queue_size:
+            self._reject_trigger(job, source, scheduled_at,
+                                 f"COALESCE 合并数已满 (max_queue_size={job.max_queue_size})")
+            return None
+        target.args = job.args
+        target.kwargs = job.kwargs
+        target.triggers.append({"scheduled_at": scheduled_at or self._clock.time(),
+                                "source": source.value, "args": target.args,
+                                "kwargs": target.kwargs})
+        job.metrics.coalesced += 1
+        self._persist_instance(target)
+        self._log(job, target, "coalesced", logging.INFO, triggers=len(target.triggers))
+        return target
+
+    def _submit(self, job: Job, source: TriggerSource,
+                scheduled_at: Optional[float] = None) -> Optional[Instance]:
         with job.lock:
-            job.total_triggered += 1
-            job.last_trigger_source = source.value
-
-            if job.running_count < job.max_instances:
+            try:
+                return self._admit(job, source, scheduled_at)
+            finally:
+                self._persist_job(job)
+
+    def _admit(self, job: Job, source: TriggerSource,
+               scheduled_at: Optional[float] = None) -> Optional[Instance]:
+        """准入与阻塞策略（调用方须持 job.lock）。"""
+        job.total_triggered += 1
+        job.last_trigger_source = source.value
+
+        rate_limited = False
+        # 队列非空时新触发排在队尾（等令牌的实例优先）
+        if job.running_count < _slot_limit(job) and not job.blocked_queue:
+            if _take_tokens(job._buckets, self._clock.time()):
                 job.running_count += 1
-                inst = self._new_instance(job, source)
+                inst = self._new_instance(job, source, scheduled_at)
                 self._dispatch(job, inst)
                 return inst
+            rate_limited = True
+            job.metrics.rate_limited += 1
+
+        # 并发已满或令牌不足，执行阻塞策略
+        strat = job.blocking_strategy
+        if strat == BlockingStrategy.DROP:
+            self._reject_trigger(job, source, scheduled_at,
+                                 "速率限制 (DROP)" if rate_limited else "max_instances 已满 (DROP)")
+            return None
+
+        if strat == BlockingStrategy.RAISE:
+            if source == TriggerSource.MANUAL:
+                job.metrics.rejected += 1
+                if rate_limited:
+                    raise RateLimitedError(f"任务 {job.task_id} 令牌不足")
+                raise MaxInstancesReachedError(
+                    f"任务 {job.task_id} 并发已满 (max_instances={_slot_limit(job)})")
+            # 自动触发无调用方接异常 → 降级为 DROP（明确记录）
+            self._reject_trigger(job, source, scheduled_at, "RAISE 对自动触发降级为 DROP")
+            return None
+
+        if (strat == BlockingStrategy.COALESCE and job.blocked_queue
+                and job.blocked_queue[-1].triggers is not None):
+            return self._coalesce(job, source, scheduled_at)
+        # COALESCE 且队列为空：和 WAIT 一样入队一个实例，后续触发并入它
+
+        # WAIT
+        if len(job.blocked_queue) >= job.max_queue_size:
+            self._reject_trigger(job, source, scheduled_at,
+                                 f"WAIT 队列已满 (max_queue_size={job.max_queue_size})")
+            return None
+        inst = self._new_instance(job, source, scheduled_at)
+        inst.state = InstanceState.BLOCKED
+        inst.enqueue_at = self._clock.time()
+        self._enqueue_blocked(job, inst)
+        self._reschedule(job)
+        self._persist_instance(inst)
+        self._log(job, inst, "blocked", logging.INFO)
+        return inst
 
-            # 并发已满，执行阻塞策略
-            strat = job.blocking_strategy
-            if strat == BlockingStrategy.DROP:
-                inst = self._new_instance(job, source)
-                self._reject(job, inst, "max_instances 已满 (DROP)")
-                return None
-
-            if strat == BlockingStrategy.RAISE:
-                if source == TriggerSource.MANUAL:
-                    raise MaxInstancesReachedError(
-                        f"任务 {job.task_id} 并发已满 (max_instances={job.max_instances})")
-                # 自动触发无调用方接异常 → 降级为 DROP（明确记录）
-                inst = self._new_instance(job, source)
-                self._reject(job, inst, "RAISE 对自动触发降级为 DROP")
-                return None
-
-            # WAIT
-            if len(job.blocked_queue) >= job.max_queue_size:
-                inst = self._new_instance(job, source)
-                self._reject(job, inst, f"WAIT 队列已满 (max_queue_size={job.max_queue_size})")
-                return None
-            inst = self._new_instance(job, source)
-            inst.state = InstanceState.BLOCKED
-            inst.enqueue_at = time.time()
-            job.blocked_queue.append(inst)
-            self._log(job, inst, "blocked", logging.INFO)
-            return inst
+    @staticmethod
+    def _enqueue_blocked(job: Job, inst: Instance):
+        if not job.blocked_queue:
+            job.blocked_queue = deque(job.blocked_queue)
+        job.blocked_queue.append(inst)
+
+    def _reject_trigger(self, job: Job, source: TriggerSource, scheduled_at: Optional[float],
+                        reason: str):
+        """拒绝尚未成为实例的触发：只分配实例编号用于日志，不创建 Instance（调用方须持 job.lock）。"""
+        job._seq += 1
+        instance_id = f"{job.task_id}#{job._seq}"
+        job.metrics.rejected += 1
+        job.last_status = InstanceState.REJECTED.value
+        self._record_history(job, instance_id, source.value, InstanceState.REJECTED, 1,
+                             scheduled_at or self._clock.time(), 0.0, reason)
+        self._events.publish(logging.WARNING, "rejected", job.task_id, instance_id, source.value,
+                             1, job.args, job.kwargs, {"error": reason})
 
     def _reject(self, job: Job, inst: Instance, reason: str):
-        inst.finalized = True
-        inst.state = InstanceState.REJECTED
+        """拒绝已排队的实例（如等待超时，调用方须持 job.lock）。"""
+        if inst.state == InstanceState.BLOCKED:
+            self._forget_instance(inst)  # 只有排过队的实例落过盘
+        self._finish_instance(job, inst, InstanceState.REJECTED, reason)
+        job.metrics.rejected += 1
         job.last_status = InstanceState.REJECTED.value
         job.instances.pop(inst.instance_id, None)
         self._log(job, inst, "rejected", logging.WARNING, error=reason)
 
-    def _drain_queue(self, job: Job, state: InstanceState, reason: str):
-        """把 WAIT 队列全部出队并置为指定终态（调用方须持 job.lock）。"""
+    def _drain_queue(self, job: Job, state: InstanceState, reason: str, persist: bool = True):
+        """把 WAIT 队列全部出队并置为指定终态（调用方须持 job.lock）。
+        persist=False 时保留存储中的记录（停机后由下次 start() 恢复）。"""
         while job.blocked_queue:
             inst = job.blocked_queue.popleft()
-            inst.finalized = True
-            inst.state = state
+            self._finish_instance(job, inst, state, reason)
             job.instances.pop(inst.instance_id, None)
+            if persist:
+                self._forget_instance(inst)
             self._log(job, inst, state.value.lower(), logging.WARNING, error=reason)
 
     # ------------------------------------------------------------------ #
@@ -468,24 +2159,37 @@ class Scheduler:
     # ------------------------------------------------------------------ #
     def _dispatch(self, job: Job, inst: Instance):
         """把实例投递到执行器（调用方须持 job.lock）。首投与重投共用。"""
+        now = self._clock.time()
+        if inst.state == InstanceState.BLOCKED:
+            job.metrics.observe("queue_wait", now - inst.enqueue_at)
+        if inst.state != InstanceState.PENDING_RETRY and inst.scheduled_at:
+            job.metrics.observe("schedule_lag", now - inst.scheduled_at)
+        if self._retry_budget is not None and inst.attempt == 1:
+            self._retry_budget.deposit(now)
         inst.state = InstanceState.RUNNING
-        inst.attempt_start = time.time()
+        inst.attempt_start = now
+        job.instances[inst.instance_id] = inst  # 排队中的实例只在 blocked_queue 里
         inst.timeout_at = (inst.attempt_start + job.timeout) if job.timeout else None
         job.last_run_time = self._now_dt().strftime("%Y-%m-%d %H:%M:%S")
 
+        kwargs = inst.kwargs
+        if inst.triggers is not None:
+            kwargs = dict(kwargs, **{job.coalesce_kwarg: list(inst.triggers)})
         if inst.is_async:
             if self._loop is None:
                 raise SchedulerError("异步任务需要先调用 start() 启动事件循环")
-            coro = job.func(*inst.args, **inst.kwargs)
+            coro = job.func(*inst.args, **kwargs)
             if job.timeout:
                 coro = asyncio.wait_for(coro, job.timeout)
-            fut = asyncio.run_coroutine_threadsafe(coro, self._loop)
+            fut = self._submit_coroutine(coro)
         else:
-            fut = self._pool.submit(job.func, *inst.args, **inst.kwargs)
+            fut = self._pools[job.pool].submit(job.func, inst.args, kwargs, job.priority)
 
         inst.future = fut
-        fut.add_done_callback(
-            lambda f, j=job, i=inst: self._on_future_done(j, i, f))
+        self._watch_future(job, inst, fut)
+        if inst.timeout_at is not None and not inst.is_async:
+            self._reschedule(job)  # 软超时由主循环到点清扫
+        self._persist_instance(inst)
         self._log(job, inst, "start", logging.INFO)
 
     def _on_future_done(self, job: Job, inst: Instance, fut: Future):
@@ -507,52 +2211,127 @@ class Scheduler:
 
     def _handle_attempt_result(self, job: Job, inst: Instance,
                                success: bool, timed_out: bool, error):
-        duration_ms = int((time.time() - inst.attempt_start) * 1000)
+        # 排队等待（池内）与执行耗时分开统计；软超时时可能尚未开始执行
+        now = self._clock.time()
+        started_at = getattr(inst.future, "started_at", None) or now
+        queue_wait_ms = int((started_at - inst.attempt_start) * 1000) if job.pool else None
+        duration = now - started_at if job.pool else now - inst.attempt_start
+        duration_ms = int(duration * 1000)
+        if self._apply_attempt_result(job, inst, success, timed_out, error,
+                                      duration, duration_ms, queue_wait_ms):
+            # 释放本任务锁后再触发下游，避免跨任务持锁
+            self._notify_downstream(job)
+
+    def _apply_attempt_result(self, job: Job, inst: Instance, success: bool, timed_out: bool,
+                              error, duration: float, duration_ms: int,
+                              queue_wait_ms: Optional[int]) -> bool:
+        """结算一次尝试；返回实例是否最终成功。"""
         with job.lock:
             # 已终结 / 已不在运行态（软超时与真实完成竞态） → 忽略
             if inst.finalized or inst.state != InstanceState.RUNNING:
-                return
+                return False
+            job.metrics.observe("run_duration", duration)
+            if timed_out:
+                job.metrics.timeouts += 1
+            if job._aimd is not None and job._aimd.on_result(
+                    success, duration, inst.attempt_start, self._clock.time()):
+                self._log(job, inst, "throttled", logging.WARNING,
+                          concurrency_limit=job._aimd.cap, duration_ms=duration_ms)
 
             if success:
-                inst.finalized = True
-                inst.state = InstanceState.SUCCESS
+                self._finish_instance(job, inst, InstanceState.SUCCESS)
                 job.success_count += 1
                 job.last_status = InstanceState.SUCCESS.value
-                self._log(job, inst, "success", logging.INFO, duration_ms=duration_ms)
+                self._log(job, inst, "success", logging.INFO, duration_ms=duration_ms,
+                          queue_wait_ms=queue_wait_ms)
                 self._release_slot(job, inst)
-                return
+                return True
 
-            # 失败 / 超时：判断是否还可重试（D6 超时纳入重试）
+            # 失败 / 超时：判断是否还可重试（D6 超时纳入重试，D19 受全局重试预算约束）
+            budget_exhausted = False
             if inst.attempt <= job.retry_times:
+                budget_exhausted = not self._take_retry_budget(job)
+            if inst.attempt <= job.retry_times and not budget_exhausted:
+                delay = self._retry_delay(job, inst.attempt)
                 inst.attempt += 1
                 inst.state = InstanceState.PENDING_RETRY
-                inst.next_retry_at = time.time() + job.retry_delay
+                inst.next_retry_at = self._clock.time() + delay
+                job.metrics.retries += 1
                 # D7：保持逻辑槽位占用，释放 worker；由主循环延迟重投
+                self._reschedule(job)
+                self._persist_instance(inst)
                 self._log(job, inst, "retry", logging.WARNING,
-                          error=str(error), duration_ms=duration_ms)
+                          error=str(error), duration_ms=duration_ms,
+                          queue_wait_ms=queue_wait_ms, retry_in=round(delay, 3))
             else:
-                inst.finalized = True
-                inst.state = InstanceState.TIMEOUT if timed_out else InstanceState.FAILED
+                self._finish_instance(job, inst, InstanceState.TIMEOUT if timed_out
+                                      else InstanceState.FAILED, str(error))
                 job.failed_count += 1
                 job.last_status = inst.state.value
+                extra = {"retry_budget_exhausted": True} if budget_exhausted else {}
                 self._log(job, inst, "timeout" if timed_out else "failed",
-                          logging.ERROR, error=str(error), duration_ms=duration_ms)
+                          logging.ERROR, error=str(error), duration_ms=duration_ms,
+                          queue_wait_ms=queue_wait_ms, **extra)
                 self._release_slot(job, inst)
+            return False
+
+    @staticmethod
+    def _retry_delay(job: Job, attempt: int) -> float:
+        """第 attempt 次尝试失败后的重试间隔：retry_delay × retry_backoff^(attempt-1)，
+        不超过 retry_max_delay；retry_jitter 时在 [0, 该值] 内均匀取值。"""
+        delay = job.retry_delay * job.retry_backoff ** min(attempt - 1, 64)
+        if job.retry_max_delay is not None:
+            delay = min(delay, job.retry_max_delay)
+        if job.retry_jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def _take_retry_budget(self, job: Job) -> bool:
+        """从全局重试预算取一次额度；耗尽时计数并返回 False（调用方须持 job.lock）。"""
+        if self._retry_budget is None or self._retry_budget.try_withdraw(self._clock.time()):
+            return True
+        job.metrics.retries_denied += 1
+        return False
+
+    def _notify_downstream(self, job: Job):
+        """D17：上游成功后推进下游的 AND-join；某下游的上游本轮全部成功即触发一次。
+        各分支独立提交，并行度仍受各自 max_instances 与执行器池限制。"""
+        if self._stopping:
+            return  # 关闭中不再展开下游
+        with self._registry_lock:
+            downstream = [self._jobs[t] for t in self._downstream.get(job.task_id, ())
+                          if t in self._jobs]
+        for down in downstream:
+            with down.lock:
+                down._deps_waiting.discard(job.task_id)
+                if down._deps_waiting:
+                    continue
+                down._deps_waiting = set(down.depends_on)
+                if not down.enabled:
+                    continue
+            self._submit(down, TriggerSource.DEPENDENCY)
 
     def _release_slot(self, job: Job, inst: Instance):
         """释放逻辑槽位并尝试唤醒队列（调用方须持 job.lock）。"""
         job.running_count -= 1
         job.instances.pop(inst.instance_id, None)
+        self._forget_instance(inst)
         self._wake_next(job)
+        self._persist_job(job)
 
     def _wake_next(self, job: Job):
         """有空槽位时从 WAIT 队首取实例执行，过期项跳过（调用方须持 job.lock）。"""
-        now = time.time()
-        while job.running_count < job.max_instances and job.blocked_queue:
-            inst = job.blocked_queue.popleft()
+        now = self._clock.time()
+        while job.running_count < _slot_limit(job) and job.blocked_queue:
+            inst = job.blocked_queue[0]
             if now - inst.enqueue_at > job.blocking_timeout:
+                job.blocked_queue.popleft()
                 self._reject(job, inst, "blocking_timeout 等待超时")
                 continue
+            if not _take_tokens(job._buckets, now):
+                self._reschedule(job)  # 令牌补充时刻由主循环唤醒
+                break
+            job.blocked_queue.popleft()
             job.running_count += 1
             self._dispatch(job, inst)
 
@@ -571,18 +2350,27 @@ class Scheduler:
                     self._reject(job, inst, "blocking_timeout 等待超时")
                 else:
                     kept.append(inst)
-            job.blocked_queue = kept
+            job.blocked_queue = kept or ()
 
     def _sweep_sync_timeout(self, job: Job, now: float):
-        """线程执行器软超时：到期停止等待、释放槽位（后台线程不保证回收）。"""
+        """线程执行器软超时：到期停止等待、释放槽位（后台线程不保证回收）；
+        进程执行器硬终止：先按超时结算，再 terminate 子进程。"""
         with job.lock:
             for inst in list(job.instances.values()):
                 if (not inst.is_async and inst.state == InstanceState.RUNNING
                         and inst.timeout_at is not None and now > inst.timeout_at
                         and not inst.finalized):
-                    self._handle_attempt_result(
-                        job, inst, success=False, timed_out=True,
-                        error=TaskTimeoutError(f"软超时 (timeout={job.timeout}s)"))
+                    fut = inst.future
+                    if job.executor == ExecutorType.PROCESS:
+                        self._handle_attempt_result(
+                            job, inst, success=False, timed_out=True,
+                            error=TaskTimeoutError(f"超时终止子进程 (timeout={job.timeout}s)"))
+                        # 结算在前，终止引起的异常回调会因状态不再是 RUNNING 被忽略
+                        self._pools[job.pool].terminate(fut)
+                    else:
+                        self._handle_attempt_result(
+                            job, inst, success=False, timed_out=True,
+                            error=TaskTimeoutError(f"软超时 (timeout={job.timeout}s)"))
 
     def _submit_due_retries(self, job: Job, now: float):
         """D7：重试到期后重新投递。"""
@@ -596,10 +2384,385 @@ class Scheduler:
         self._sweep_sync_timeout(job, now_ts)
         self._submit_due_retries(job, now_ts)
         if job.enabled and job.next_run is not None and now_dt >= job.next_run:
-            self._submit(job, TriggerSource.CRON)
+            fire_ts = job.next_run.timestamp()
+            if self._claim_fire(job, fire_ts, "cron"):
+                self._submit(job, TriggerSource.CRON, fire_ts)
             with job.lock:
                 # 推进到严格未来（错失的中间触发被合并）
                 job.next_run = self._compute_next(job.cron, now_dt)
+                self._persist_job(job)
+        with job.lock:
+            if job.blocked_queue:
+                self._wake_next(job)  # 令牌已补充时放行排队实例
+            self._reschedule(job, not_before=now_ts)
+
+    # ------------------------------------------------------------------ #
+    # 截止时刻堆（D10）
+    # ------------------------------------------------------------------ #
+    @staticmethod
+    def _job_deadline(job: Job) -> Optional[float]:
+        """任务下一次需要主循环处理的时刻（调用方须持 job.lock）。"""
+        deadlines = []
+        if job.enabled and job.next_run is not None:
+            deadlines.append(job.next_run.timestamp())
+        if job.blocked_queue:
+            # 队列按入队时间 FIFO，队首最先过期
+            deadlines.append(job.blocked_queue[0].enqueue_at + job.blocking_timeout)
+            if job._buckets and job.running_count < _slot_limit(job):
+                deadlines.append(max(bucket.ready_at() for bucket in job._buckets))
+        for inst in job.instances.values():
+            if inst.state == InstanceState.PENDING_RETRY:
+                deadlines.append(inst.next_retry_at)
+            elif (inst.state == InstanceState.RUNNING and not inst.is_async
+                  and inst.timeout_at is not None):
+                deadlines.append(inst.timeout_at)
+        return min(deadlines) if deadlines else None
+
+    def _reschedule(self, job: Job, not_before: Optional[float] = None):
+        """重算任务截止时刻并入堆，早于堆顶时唤醒主循环（调用方须持 job.lock）。"""
+        deadline = self._job_deadline(job)
+        if deadline is not None and not_before is not None and deadline <= not_before:
+            # 过期判断为严格大于，同一时刻再处理一次没有意义
+            deadline = not_before + 0.001
+        with self._cond:
+            if deadline == job._deadline:
+                return
+            job._deadline = deadline
+            if deadline is None:
+                return
+            heapq.heappush(self._heap, (deadline, next(self._heap_seq), job))
+            if self._heap[0][2] is job:
+                self._wake_main_loop()
+            elif len(self._heap) > 4 * len(self._jobs) + 64:
+                self._compact_heap()
+
+    def _compact_heap(self):
+        """清理陈旧项，避免频繁重排导致堆膨胀（调用方须持 self._cond）。"""
+        self._heap = [e for e in self._heap
+                      if e[2]._deadline == e[0] and self._jobs.get(e[2].task_id) is e[2]]
+        heapq.heapify(self._heap)
+
+    def _pop_due_jobs(self, now: float) -> tuple:
+        """弹出所有到期任务，返回 (due, 距下一截止时刻的休眠秒数)（调用方须持 self._cond）。"""
+        due = []
+        while self._heap:
+            deadline, _, job = self._heap[0]
+            if job._deadline != deadline or self._jobs.get(job.task_id) is not job:
+                heapq.heappop(self._heap)  # 陈旧项
+                continue
+            if deadline > now:
+                break
+            heapq.heappop(self._heap)
+            job._deadline = None
+            due.append(job)
+        timeout = self._tick
+        if self._heap:
+            timeout = min(timeout, self._heap[0][0] - now)
+        return due, timeout
+
+    def _wait_due_jobs(self) -> List[Job]:
+        """休眠到堆顶截止时刻，弹出所有到期任务。"""
+        with self._cond:
+            while self._running:
+                due, timeout = self._pop_due_jobs(self._clock.time())
+                if due:
+                    return due
+                self._cond.wait(timeout)
+            return []
+
+    def run_pending(self) -> int:
+        """按注入的时钟处理当前已到期的任务，返回处理的任务数。
+
+        不需要 start()，用于 VirtualClock 下的单步驱动（模拟 / 基准）；未 start() 时
+        积压的事件在这里同步输出给日志与订阅的 sink。
+        与后台主循环同时使用时两者会竞争到期任务，但不会重复处理。
+        """
+        with self._cond:
+            due, _ = self._pop_due_jobs(self._clock.time())
+        self._run_due_jobs(due)
+        if not self._events.running:
+            self._events.flush()  # 没有事件线程时在调用方线程输出
+        return len(due)
+
+    def next_deadline(self) -> Optional[float]:
+        """堆顶（最早）截止时刻，没有待处理项时为 None。"""
+        with self._cond:
+            while self._heap:
+                deadline, _, job = self._heap[0]
+                if job._deadline == deadline and self._jobs.get(job.task_id) is job:
+                    return deadline
+                heapq.heappop(self._heap)
+            return None
+
+    def _run_due_jobs(self, due: List[Job]):
+        now_ts = self._clock.time()
+        now_dt = datetime.fromtimestamp(now_ts, self._tz)
+        for job in due:
+            try:
+                self._tick_job(job, now_dt, now_ts)
+            except Exception as e:  # noqa - 单任务异常不影响主循环
+                self._log_scheduler("tick_error", level=logging.ERROR,
+                                    task_id=job.task_id, error=repr(e))
+                with job.lock:
+                    self._reschedule(job, not_before=now_ts)
+
+    # ------------------------------------------------------------------ #
+    # 持久化与恢复（D11）
+    # ------------------------------------------------------------------ #
+    def _persist_job(self, job: Job):
+        """投递任务快照到存储（写后批量落盘，调用方须持 job.lock）。"""
+        if self._store is None or not self._store_ready:
+            return
+        self._store.save_job(job.task_id, {
+            "func_ref": _func_ref(job.func),
+            "cron": job.cron,
+            "args": job.args,
+            "kwargs": job.kwargs,
+            "options": {
+                "max_instances": job.max_instances,
+                "blocking_strategy": job.blocking_strategy.value,
+                "blocking_timeout": job.blocking_timeout,
+                "max_queue_size": job.max_queue_size,
+                "retry_times": job.retry_times,
+                "retry_delay": job.retry_delay,
+                "retry_backoff": job.retry_backoff,
+                "retry_max_delay": job.retry_max_delay,
+                "retry_jitter": job.retry_jitter,
+                "timeout": job.timeout,
+                "name": job.name,
+                "executor": job.executor.value,
+                "pool": job.pool,
+                "priority": job.priority,
+                "misfire_policy": job.misfire_policy.value,
+                "coalesce_kwarg": job.coalesce_kwarg,
+                "depends_on": list(job.depends_on),
+                "rate_limit": job.rate_limit,
+                "rate_burst": job.rate_burst,
+                "rate_group": job.rate_group,
+                "adaptive_concurrency": job.adaptive_concurrency,
+                "latency_target": job.latency_target,
+            },
+            "enabled": job.enabled,
+            "next_run": job.next_run.timestamp() if job.next_run else None,
+            "seq": job._seq,
+            "last_run_time": job.last_run_time,
+            "last_status": job.last_status,
+            "last_trigger_source": job.last_trigger_source,
+            "success_count": job.success_count,
+            "failed_count": job.failed_count,
+            "total_triggered": job.total_triggered,
+        })
+
+    def _persist_instance(self, inst: Instance):
+        if self._store is None or not self._store_ready:
+            return
+        self._store.save_instance(inst.instance_id, inst.task_id, {
+            "instance_id": inst.instance_id,
+            "task_id": inst.task_id,
+            "args": inst.args,
+            "kwargs": inst.kwargs,
+            "source": inst.source,
+            "attempt": inst.attempt,
+            "state": inst.state.value,
+            "scheduled_at": inst.scheduled_at,
+            "enqueue_at": inst.enqueue_at,
+            "triggers": inst.triggers,
+            "next_retry_at": inst.next_retry_at,
+        })
+
+    def _forget_instance(self, inst: Instance):
+        if self._store is not None and self._store_ready:
+            self._store.delete_instance(inst.instance_id)
+
+    def _restore(self, jobs_data: Dict[str, dict], insts_data: List[dict]):
+        """按存储读出的数据（JobStore.load）恢复任务状态与未完成实例，并按 misfire
+        策略补偿错过的触发。
+
+        代码中已注册的任务以代码定义为准，只恢复运行时状态；未注册的任务按
+        func_ref（module:qualname）重新导入并注册，无法定位时跳过。
+        从这里开始投递快照；只在代码中注册的任务在最后补写一次。
+        """
+        self._store_ready = True
+        insts_by_task: Dict[str, List[dict]] = {}
+        for inst_data in insts_data:
+            insts_by_task.setdefault(inst_data["task_id"], []).append(inst_data)
+        now_ts = self._clock.time()
+        now_dt = datetime.fromtimestamp(now_ts, self._tz)
+        for task_id in self._dependency_order(jobs_data):
+            data = jobs_data[task_id]
+            job = self._jobs.get(task_id)
+            if job is None:
+                func = _resolve_func_ref(data["func_ref"])
+                if func is None:
+                    self._log_scheduler("restore_skipped", level=logging.WARNING,
+                                        task_id=task_id, func_ref=data["func_ref"],
+                                        message="无法定位任务函数，请在代码中重新注册")
+                    continue
+                try:
+                    job = self.add_job(task_id, func, data["cron"], args=data["args"],
+                                       kwargs=data["kwargs"], **data["options"])
+                except SchedulerError as e:
+                    self._log_scheduler("restore_skipped", level=logging.WARNING,
+                                        task_id=task_id, error=repr(e))
+                    continue
+
+            with job.lock:
+                job.enabled = data["enabled"]
+                job._seq = max(job._seq, data["seq"])
+                for key in ("last_run_time", "last_status", "last_trigger_source",
+                            "success_count", "failed_count", "total_triggered"):
+                    setattr(job, key, data[key])
+                for inst_data in insts_by_task.get(task_id, []):
+                    self._restore_instance(job, inst_data, now_ts)
+                if job.blocked_queue:
+                    job.blocked_queue = deque(sorted(job.blocked_queue, key=lambda i: i.enqueue_at))
+
+                stored_next = (datetime.fromtimestamp(data["next_run"], self._tz)
+                               if data["next_run"] is not None and job.cron == data["cron"]
+                               else None)
+                missed = self._count_misfires(job, stored_next, now_dt) if job.enabled else 0
+                if stored_next is not None and stored_next > now_dt:
+                    job.next_run = stored_next
+                else:
+                    job.next_run = self._compute_next(job.cron, now_dt)
+                self._wake_next(job)
+                self._reschedule(job)
+                self._persist_job(job)
+
+            if missed and not self._claim_fire(job, data["next_run"], "misfire"):
+                missed = 0  # 由负责该分片的节点补偿
+            for _ in range(missed):
+                self._submit(job, TriggerSource.MISFIRE)
+            self._log_scheduler("job_restored", task_id=task_id,
+                                running_instances=job.running_count,
+                                blocked_queue_size=len(job.blocked_queue),
+                                misfired=missed)
+        for job in list(self._jobs.values()):
+            if job.task_id not in jobs_data:
+                with job.lock:
+                    self._persist_job(job)
+
+    @staticmethod
+    def _dependency_order(jobs_data: Dict[str, dict]) -> List[str]:
+        """上游在前的恢复顺序，保证重新注册时依赖的任务已存在。"""
+        order, visited = [], set()
+
+        def visit(task_id: str):
+            if task_id in visited or task_id not in jobs_data:
+                return
+            visited.add(task_id)
+            for upstream in jobs_data[task_id]["options"].get("depends_on", ()):
+                visit(upstream)
+            order.append(task_id)
+
+        for task_id in jobs_data:
+            visit(task_id)
+        return order
+
+    def _restore_instance(self, job: Job, data: dict, now_ts: float):
+        """按落盘时的状态重建实例（调用方须持 job.lock）。"""
+        inst = Instance(
+            instance_id=data["instance_id"],
+            task_id=job.task_id,
+            args=data["args"],
+            kwargs=data["kwargs"],
+            source=data["source"],
+            is_async=job.is_coroutine,
+            attempt=data["attempt"],
+            scheduled_at=data.get("scheduled_at", 0.0),
+            triggers=data.get("triggers"),
+        )
+        state = InstanceState(data["state"])
+        if state == InstanceState.BLOCKED:
+            inst.state = InstanceState.BLOCKED
+            inst.enqueue_at = data["enqueue_at"]
+            self._enqueue_blocked(job, inst)
+            return
+        job.instances[inst.instance_id] = inst
+        job.running_count += 1  # PENDING_RETRY / RUNNING 都占逻辑槽位
+        if state == InstanceState.PENDING_RETRY:
+            inst.state = InstanceState.PENDING_RETRY
+            inst.next_retry_at = data["next_retry_at"]
+            return
+        # RUNNING：上次进程退出时仍在执行，视为一次失败的尝试
+        inst.state = InstanceState.RUNNING
+        inst.attempt_start = now_ts
+        self._handle_attempt_result(job, inst, success=False, timed_out=False,
+                                    error=TaskExecutionError("进程重启，执行被中断"))
+        if inst.state == InstanceState.PENDING_RETRY:
+            inst.next_retry_at = now_ts  # 中断的尝试立即重投，不再等待 retry_delay
+            self._persist_instance(inst)
+
+    def _count_misfires(self, job: Job, stored_next: Optional[datetime], now_dt: datetime) -> int:
+        """停机期间错过的触发中需要补偿的次数（受 misfire_grace_time 与队列容量限制）。"""
+        if (job.misfire_policy == MisfirePolicy.SKIP or stored_next is None
+                or stored_next > now_dt):
+            return 0
+        fire = stored_next
+        if self._misfire_grace_time is not None:
+            window_start = now_dt - timedelta(seconds=self._misfire_grace_time, microseconds=1)
+            fire = max(fire, self._compute_next(job.cron, window_start))
+        if fire > now_dt:
+            return 0
+        if job.misfire_policy == MisfirePolicy.RUN_ONCE:
+            return 1
+        count, limit = 0, job.max_instances + job.max_queue_size
+        while fire <= now_dt and count < limit:
+            count += 1
+            fire = self._compute_next(job.cron, fire)
+        return count
+
+    # ------------------------------------------------------------------ #
+    # 多副本协调（D14）
+    # ------------------------------------------------------------------ #
+    def _owns(self, job: Job) -> bool:
+        return _rendezvous_owner(job.task_id, self._live_nodes) == self._node_id
+
+    def _claim_fire(self, job: Job, fire_ts: float, kind: str) -> bool:
+        """本节点是否执行该触发时刻：非分片负责节点直接跳过，负责节点再原子 claim。
+        后端不可用或 claim 超时时放弃本次触发（宁可漏跑不重复跑，也不阻塞主循环）。"""
+        if self._coordinator is None:
+            return True
+        if not self._owns(job):
+            return False
+        try:
+            return self._coordinator.claim(f"{job.task_id}@{kind}@{fire_ts:.3f}", self._node_id)
+        except Exception as e:  # noqa - 后端异常不影响主循环
+            self._log_scheduler("lease_error", level=logging.ERROR, task_id=job.task_id,
+                                op="claim", error=repr(e))
+            return False
+
+    def _refresh_lease(self):
+        """续约本节点并刷新存活节点视图（只在续约线程与 start() 中调用）。"""
+        try:
+            self._coordinator.heartbeat(self._node_id, self._lease_ttl)
+            nodes = tuple(sorted(set(self._coordinator.live_nodes())))
+        except Exception as e:  # noqa - 保留上一次的视图，claim 保证不重复执行
+            self._log_scheduler("lease_error", level=logging.ERROR, op="heartbeat",
+                                error=repr(e))
+            return
+        if nodes != self._live_nodes:
+            self._live_nodes = nodes
+            owned = sum(1 for job in list(self._jobs.values()) if self._owns(job))
+            self._log_scheduler("cluster_changed", node_id=self._node_id, live_nodes=list(nodes),
+                                owned_jobs=owned, total_jobs=len(self._jobs))
+
+    def _lease_loop(self):
+        interval = self._lease_ttl / 3
+        while not self._lease_stop.wait(interval):
+            self._refresh_lease()
+
+    def get_cluster_status(self) -> Dict[str, Any]:
+        """本节点视角的存活节点与分片归属；未配置 coordinator 时本节点负责全部任务。"""
+        jobs = list(self._jobs.values())
+        return {
+            "node_id": self._node_id,
+            "coordinated": self._coordinator is not None,
+            "live_nodes": list(self._live_nodes),
+            "owned_jobs": [job.task_id for job in jobs
+                           if self._coordinator is None or self._owns(job)],
+            "total_jobs": len(jobs),
+        }
 
     # ------------------------------------------------------------------ #
     # 启停（§3.8）
@@ -632,15 +2795,46 @@ class Scheduler:
         self._loop_thread = threading.Thread(
             target=self._run_event_loop, name="lite-sched-loop", daemon=True)
         self._loop_thread.start()
+        self._loop.call_soon_threadsafe(self._probe_loop_lag, None)
+        self._prepare_start(self._open_backends())
+        self._install_signal_handlers()
+
+        if not block:
+            threading.Thread(target=self._main_loop, name="lite-sched-main",
+                             daemon=True).start()
+        else:
+            self._main_loop()
+
+    def _open_backends(self) -> Optional[tuple]:
+        """启动的阻塞部分：事件线程、加入集群、读取存储（AsyncScheduler 在线程池中执行）。
+        返回 JobStore.load() 的结果，未配置存储时为 None。"""
+        self._events.start()
+        # 加入集群：先同步续约一次，恢复与补偿时才能判断分片归属
+        if self._coordinator is not None:
+            self._lease_stop.clear()
+            self._refresh_lease()
+            self._lease_thread = threading.Thread(target=self._lease_loop,
+                                                  name="lite-sched-lease", daemon=True)
+            self._lease_thread.start()
+        return self._store.load() if self._store is not None else None
+
+    def _prepare_start(self, loaded: Optional[tuple]):
+        """事件循环就绪后、主循环开始前的公共步骤；loaded 为 _open_backends() 的结果。"""
+        self._stopping = False
+        # 恢复持久化状态（异步任务的重投需要事件循环已就绪）
+        if loaded is not None:
+            self._restore(*loaded)
 
         # 容量提示（D4）
-        total_slots = sum(j.max_instances for j in self._jobs.values()
-                          if not j.is_coroutine)
-        if total_slots > self._max_workers:
-            self._log_scheduler("capacity_warning", level=logging.WARNING,
-                                sum_max_instances=total_slots,
-                                max_workers=self._max_workers,
-                                message="同步任务槽位总和超过 max_workers，可能产生线程池排队延迟")
+        for pool_name, pool in list(self._pools.items()):
+            total_slots = sum(j.max_instances for j in self._jobs.values() if j.pool == pool_name)
+            if total_slots > pool.max_workers:
+                self._log_scheduler("capacity_warning", level=logging.WARNING,
+                                    pool=pool_name,
+                                    sum_max_instances=total_slots,
+                                    max_workers=pool.max_workers,
+                                    message="池内任务槽位总和超过 max_workers，可能产生排队延迟"
+                                            "（池满时按 priority 出队）")
 
         # 触发 run_immediately（在事件循环就绪后）
         for job in list(self._jobs.values()):
@@ -648,58 +2842,204 @@ class Scheduler:
                 job._pending_immediate = False
                 self._submit(job, TriggerSource.IMMEDIATE)
 
-        self._install_signal_handlers()
         self._log_scheduler("scheduler_started", job_count=len(self._jobs))
 
-        if not block:
-            threading.Thread(target=self._main_loop, name="lite-sched-main",
-                             daemon=True).start()
-        else:
-            self._main_loop()
-
     def _main_loop(self):
         try:
             while self._running:
-                now_dt = self._now_dt()
-                now_ts = time.time()
-                for job in list(self._jobs.values()):
-                    try:
-                        self._tick_job(job, now_dt, now_ts)
-                    except Exception as e:  # noqa - 单任务异常不影响主循环
-                        self._log_scheduler("tick_error", level=logging.ERROR,
-                                            task_id=job.task_id, error=repr(e))
-                time.sleep(self._tick)
+                self._run_due_jobs(self._wait_due_jobs())
         except KeyboardInterrupt:
             self.shutdown(wait=True)
 
     def shutdown(self, wait: bool = True, timeout: int = 30):
         if not self._running:
             return
+        self._begin_shutdown(wait, timeout)
+        if wait:
+            deadline = time.time() + timeout
+            while time.time() < deadline and self._running_total():
+                time.sleep(0.2)
+            self._warn_unfinished()
+        self._finish_shutdown()
+
+    def _running_total(self) -> int:
+        return sum(j.running_count for j in list(self._jobs.values()))
+
+    def _warn_unfinished(self):
+        remaining = self._running_total()
+        if remaining:
+            self._log_scheduler("shutdown_timeout", level=logging.WARNING,
+                                running_instances=remaining,
+                                message="停机超时仍有运行实例（线程不可强杀）")
+
+    def _begin_shutdown(self, wait: bool, timeout: int):
+        """停止调度、退出集群并清空 WAIT 队列；之后只等待运行实例收尾。"""
         self._running = False
+        self._stopping = True
+        with self._cond:
+            self._wake_main_loop()
         self._log_scheduler("scheduler_stopping", wait=wait, timeout=timeout)
 
+        if self._coordinator is not None:
+            self._lease_stop.set()
+            if self._lease_thread is not None:
+                self._lease_thread.join(timeout=5)
+            try:
+                self._coordinator.leave(self._node_id)  # 分片立即交给其他节点
+            except Exception as e:  # noqa
+                self._log_scheduler("lease_error", level=logging.ERROR, op="leave",
+                                    error=repr(e))
+
         # 清空所有 WAIT 队列（置 CANCELLED）
         for job in list(self._jobs.values()):
             with job.lock:
-                self._drain_queue(job, InstanceState.CANCELLED, "调度器停机")
+                # 有存储时保留排队实例的记录，下次 start() 恢复
+                self._drain_queue(job, InstanceState.CANCELLED, "调度器停机",
+                                  persist=self._store is None)
+
+    def _finish_shutdown(self):
+        self._stop_loop()
+        self._close_backends()
+
+    def _close_backends(self):
+        """停机的阻塞部分：等待后台线程退出并关闭外部资源（AsyncScheduler 在线程池中执行）。"""
+        if self._metrics_server is not None:
+            self._metrics_server.shutdown()
+            self._metrics_server.server_close()
+            self._metrics_server = None
+
+        # 停止执行器池（线程 / 子进程）
+        for pool in self._pools.values():
+            pool.shutdown()
+        if self._store is not None:
+            self._store.close()
+        if self._coordinator is not None:
+            self._coordinator.close()
+        self._log_scheduler("scheduler_stopped")
+        self._events.close()
+
+    def _stop_loop(self):
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._loop.stop)
+
+
+# --------------------------------------------------------------------------- #
+# asyncio 原生调度器
+# 主循环、准入、重试与超时清扫全部运行在调用方的事件循环里：async 任务直接
+# create_task，不经过跨线程投递；所有状态只在该循环线程内修改，任务锁退化为空锁。
+# 同步任务仍进执行器池，完成回调经 call_soon_threadsafe 回到事件循环处理。
+# --------------------------------------------------------------------------- #
+class _NullLock:
+    """单线程内使用的空锁，接口与 RLock / Condition 的加锁部分一致。"""
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def acquire(self, *args, **kwargs) -> bool:
+        return True
+
+    def release(self):
+        pass
+
+
+_NULL_LOCK = _NullLock()
+
+
+class AsyncScheduler(Scheduler):
+    """在调用方事件循环中运行的调度器：
+
+        sched = AsyncScheduler()
+        sched.add_job("job", coro_func, "*/5 * * * * *")
+        await sched.run()        # 直到 aclose() 或被取消
+
+    add_job / trigger_job 等管理 API 与 Scheduler 相同，但必须在该事件循环线程内调用
+    （其他线程请使用 loop.call_soon_threadsafe）。
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._wakeup: Optional[asyncio.Event] = None
+
+    # ---- 运行时钩子 ---- #
+    @staticmethod
+    def _new_lock():
+        return _NULL_LOCK
+
+    @staticmethod
+    def _new_condition():
+        return _NULL_LOCK
+
+    def _wake_main_loop(self):
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    def _submit_coroutine(self, coro) -> asyncio.Task:
+        return self._loop.create_task(coro)
 
+    def _watch_future(self, job: Job, inst: Instance, fut):
+        if isinstance(fut, asyncio.Future):
+            fut.add_done_callback(lambda f, j=job, i=inst: self._on_future_done(j, i, f))
+        else:
+            # 池线程完成 → 回到事件循环线程处理结果
+            loop = self._loop
+            fut.add_done_callback(lambda f, j=job, i=inst: loop.call_soon_threadsafe(
+                self._on_future_done, j, i, f))
+
+    def _stop_loop(self):
+        pass  # 事件循环属于调用方
+
+    # ---- 启停 ---- #
+    def start(self, block: bool = True):
+        raise SchedulerError("AsyncScheduler 请在事件循环中使用 await run()")
+
+    async def run(self):
+        """在当前事件循环中运行主循环，直到 aclose()；被取消时立即停机（不等待运行实例）。"""
+        if self._running:
+            raise SchedulerError("调度器已在运行")
+        self._running = True
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._loop.call_soon(self._probe_loop_lag, None)
+        try:
+            # 续约与读取存储是阻塞 I/O，放到线程池，恢复本身仍在事件循环线程
+            self._prepare_start(await self._loop.run_in_executor(None, self._open_backends))
+            while self._running:
+                due, timeout = self._pop_due_jobs(self._clock.time())
+                if due:
+                    self._run_due_jobs(due)
+                    await asyncio.sleep(0)  # 大量到期任务时让出事件循环
+                    continue
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), max(timeout, 0))
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            if self._running:
+                self._begin_shutdown(False, 0)
+                await self._loop.run_in_executor(None, self._close_backends)
+
+    async def aclose(self, wait: bool = True, timeout: int = 30):
+        """停止调度；wait=True 时异步等待运行实例结束（最多 timeout 秒）。"""
+        if not self._running:
+            return
+        self._begin_shutdown(wait, timeout)
         if wait:
             deadline = time.time() + timeout
-            while time.time() < deadline:
-                if sum(j.running_count for j in self._jobs.values()) == 0:
-                    break
-                time.sleep(0.2)
-            remaining = sum(j.running_count for j in self._jobs.values())
-            if remaining:
-                self._log_scheduler("shutdown_timeout", level=logging.WARNING,
-                                    running_instances=remaining,
-                                    message="停机超时仍有运行实例（线程不可强杀）")
+            while time.time() < deadline and self._running_total():
+                await asyncio.sleep(0.05)
+            self._warn_unfinished()
+        await self._loop.run_in_executor(None, self._close_backends)
 
-        # 停止事件循环与线程池
-        if self._loop is not None:
-            self._loop.call_soon_threadsafe(self._loop.stop)
-        self._pool.shutdown(wait=False)
-        self._log_scheduler("scheduler_stopped")
+    def shutdown(self, wait: bool = True, timeout: int = 30):
+        """非阻塞：在事件循环中安排 aclose()，返回对应的 Task。"""
+        if not self._running:
+            return None
+        return self._loop.create_task(self.aclose(wait, timeout))
 
 
 # --------------------------------------------------------------------------- #
@@ -3,21 +3,23 @@
 # Author: qicongsheng
 import json
 import re
+from itertools import islice
+from typing import Iterable, Iterator
 
 from knify import excelutil
 
+_PLACEHOLDER = re.compile(r'\$\{(.*?)\}')
 
-def generate_sql_from_excel(excel_file, sql_template, filter_func=None, preprocess_func=None, postprocess_func=None,
-                            header_row=1,
-                            sheet_index=0, translate_chars=None):
-    def replace_placeholders(template, values):
-        def replace_match(match):
-            key = match.group(1)
-            return str(values.get(key, match.group(0)))
 
-        return re.sub(r'\$\{(.*?)\}', replace_match, template)
+class _SqlRenderer:
+    """把一行数据填入SQL模板；定义在模块级以便多进程处理时被pickle"""
 
-    def process_row_data(row_data):
+    def __init__(self, sql_template, translate_chars=None):
+        self.sql_template = sql_template
+        self.translate_chars = translate_chars
+
+    def __call__(self, row_data):
+        translate_chars = self.translate_chars
         for key, value in row_data.items():
             # 处理空值
             if value is None or (isinstance(value, str) and value.strip() == ''):
@@ -26,24 +28,42 @@ def generate_sql_from_excel(excel_file, sql_template, filter_func=None, preproce
             if translate_chars is not None and isinstance(value, str):
                 for trans_key, trans_value in translate_chars.items():
                     row_data[key] = row_data[key].replace(trans_key, trans_value)
-        return replace_placeholders(sql_template, row_data).replace('"NULL"', 'NULL').replace("'NULL'", 'NULL')
-
-    return excelutil.process_data(excel_file, process_row_data, filter_func, preprocess_func, postprocess_func,
-                                  header_row, sheet_index)
 
-
-def generate_sql_from_json(json_data, sql_template, filter_func=None, preprocess_func=None, postprocess_func=None,
-                           translate_chars=None):
-    def replace_placeholders(template, values):
         def replace_match(match):
             key = match.group(1)
-            return str(values.get(key, match.group(0)))
+            return str(row_data.get(key, match.group(0)))
+
+        return _PLACEHOLDER.sub(replace_match, self.sql_template).replace('"NULL"', 'NULL').replace("'NULL'", 'NULL')
+
+
+def iter_sql_from_excel(excel_file, sql_template, filter_func=None, preprocess_func=None, postprocess_func=None,
+                        header_row=1, sheet_index=0, translate_chars=None, max_workers=1,
+                        chunk_size=1000) -> Iterator[str]:
+    """
+    generate_sql_from_excel的生成器版本：边读边生成，第一条SQL不必等整个sheet处理完
+    max_workers / chunk_size 见 excelutil.iter_process_data
+    """
+    return excelutil.iter_process_data(excel_file, _SqlRenderer(sql_template, translate_chars), filter_func,
+                                       preprocess_func, postprocess_func, header_row, sheet_index,
+                                       max_workers, chunk_size)
+
+
+def generate_sql_from_excel(excel_file, sql_template, filter_func=None, preprocess_func=None, postprocess_func=None,
+                            header_row=1,
+                            sheet_index=0, translate_chars=None, max_workers=1, chunk_size=1000):
+    return list(iter_sql_from_excel(excel_file, sql_template, filter_func, preprocess_func, postprocess_func,
+                                    header_row, sheet_index, translate_chars, max_workers, chunk_size))
 
-        return re.sub(r'\$\{(.*?)\}', replace_match, template)
 
+def iter_sql_from_json(json_data, sql_template, filter_func=None, preprocess_func=None, postprocess_func=None,
+                       translate_chars=None) -> Iterator[str]:
+    """
+    generate_sql_from_json的生成器版本
+    :param json_data: JSON字符串、行字典列表，或任意行字典的可迭代对象（如 excelutil.iter_json_lines）
+    """
     if isinstance(json_data, str):
         json_data = json.loads(json_data)
-    result = []
+    render = _SqlRenderer(sql_template, translate_chars)
     for row_data in json_data:
 
         # 如果提供了预处理函数，则对列数据进行处理
@@ -53,18 +73,48 @@ def generate_sql_from_json(json_data, sql_template, filter_func=None, preprocess
         # 如果提供了过滤函数，并且过滤函数返回True，则跳过该行
         if filter_func and not filter_func(row_data):
             continue
-        for key, value in row_data.items():
-            # 处理空值
-            if value is None or (isinstance(value, str) and value.strip() == ''):
-                row_data[key] = "NULL"
-            # 转义
-            if translate_chars is not None and isinstance(value, str):
-                for trans_key, trans_value in translate_chars.items():
-                    row_data[key] = row_data[key].replace(trans_key, trans_value)
-        sql_ = replace_placeholders(sql_template, row_data).replace('"NULL"', 'NULL').replace("'NULL'", 'NULL')
+        sql_ = render(row_data)
         # 如果提供了后置处理函数，则对生成的结果进行处理
         if postprocess_func:
             sql_ = postprocess_func(sql_, row_data)
 
-        result.append(sql_)
-    return result
+        yield sql_
+
+
+def generate_sql_from_json(json_data, sql_template, filter_func=None, preprocess_func=None, postprocess_func=None,
+                           translate_chars=None):
+    return list(iter_sql_from_json(json_data, sql_template, filter_func, preprocess_func, postprocess_func,
+                                   translate_chars))
+
+
+def write_sql(statements: Iterable[str], sink, batch_size: int = 1000, encoding: str = 'utf-8',
+              append: bool = False, on_batch=None) -> int:
+    """
+    按批把SQL写入文件或执行到数据库，内存中最多保留一批
+    :param statements: SQL的可迭代对象，如 iter_sql_from_excel 的返回值
+    :param sink: 文件路径、有write方法的文件对象（每条一行），或有execute方法的DB-API游标（逐条执行）
+    :param batch_size: 每批的条数；文件每批写一次，游标每批结束后调用on_batch
+    :param append: sink为文件路径时是否追加写入
+    :param on_batch: 每批写完后的无参回调（如每批提交事务：on_batch=conn.commit）
+    :return: 写入的SQL条数
+    """
+    if isinstance(sink, str):
+        with open(sink, 'a' if append else 'w', encoding=encoding) as file:
+            return write_sql(statements, file, batch_size, on_batch=on_batch)
+
+    if hasattr(sink, 'execute'):
+        def write(batch):
+            for sql_ in batch:
+                sink.execute(sql_)
+    else:
+        def write(batch):
+            sink.write('\n'.join(batch) + '\n')
+
+    count = 0
+    statements = iter(statements)
+    for batch in iter(lambda: list(islice(statements, batch_size)), []):
+        write(batch)
+        count += len(batch)
+        if on_batch is not None:
+            on_batch()
+    return count
@@ -17,6 +17,7 @@ setup(
     packages=find_packages(),
     include_package_data=True,
     platforms='any',
+    python_requires='>=3.10',
     install_requires=[
         'loguru',
         'urllib3',
@@ -27,5 +28,8 @@ setup(
         'tzdata',
         'xlrd',
         'croniter'
-    ]
+    ],
+    extras_require={
+        'columnar': ['numpy']
+    }
 )
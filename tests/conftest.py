@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import heapq
+from concurrent.futures import Future
+
+import pytest
+
+from knify.scheduler import DEFAULT_POOL, Scheduler, VirtualClock, _WorkerPool
+
+# 对齐整分钟，Cron 触发时刻可预期
+SIM_START = 1700000040.0
+
+
+class ManualPool(_WorkerPool):
+    """不起线程的执行器池：submit 只入队，由测试调用 run_next / run_all 按优先级同步执行。"""
+
+    def __init__(self, name: str, max_workers: int, clock: VirtualClock):
+        super().__init__(name, max_workers, clock)
+        self.pending = []  # (-priority, seq, fut, func, args, kwargs, submitted_at)
+
+    def submit(self, func, args=(), kwargs=None, priority: int = 0) -> Future:
+        fut = Future()
+        self._submitted += 1
+        heapq.heappush(self.pending, (-priority, next(self._seq), fut, func, args,
+                                      kwargs or {}, self._clock.time()))
+        return fut
+
+    def run_next(self) -> bool:
+        """出队一个任务并在当前线程执行；队列为空时返回 False。"""
+        while self.pending:
+            _, _, fut, func, args, kwargs, _ = heapq.heappop(self.pending)
+            if not fut.set_running_or_notify_cancel():
+                self._cancelled += 1
+                continue
+            self._started += 1
+            try:
+                value = func(*args, **kwargs)
+            except Exception as e:  # noqa - 交由 future 传递
+                self._completed += 1
+                fut.set_exception(e)
+            else:
+                self._completed += 1
+                fut.set_result(value)
+            return True
+        return False
+
+    def run_all(self) -> int:
+        count = 0
+        while self.run_next():
+            count += 1
+        return count
+
+
+@pytest.fixture
+def clock():
+    return VirtualClock(SIM_START)
+
+
+@pytest.fixture
+def make_scheduler(clock):
+    """VirtualClock + ManualPool 的调度器工厂，只用 run_pending 驱动，不调用 start()。"""
+    created = []
+
+    def factory(**kwargs):
+        kwargs.setdefault("emit_logs", False)
+        sched = Scheduler(clock=clock, **kwargs)
+        sched._pools[DEFAULT_POOL] = ManualPool(DEFAULT_POOL, 1, clock)
+        created.append(sched)
+        return sched
+
+    yield factory
+    for sched in created:
+        sched._events.close()
+
+
+@pytest.fixture
+def drive(clock):
+    """按截止时刻逐步推进虚拟时钟到 until，每步处理到期任务并执行池内排队的任务。"""
+
+    def run_until(sched: Scheduler, until: float):
+        pool = sched._pools[DEFAULT_POOL]
+        pool.run_all()
+        while True:
+            deadline = sched.next_deadline()
+            if deadline is None or deadline > until:
+                break
+            clock.set(deadline)
+            sched.run_pending()
+            pool.run_all()
+        clock.set(until)
+
+    return run_until
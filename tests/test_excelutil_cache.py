@@ -0,0 +1,45 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import pytest
+from openpyxl import Workbook
+
+from knify import excelutil
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    path = str(tmp_path / "cache.xlsx")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["k", "a"])
+    for i in range(5):
+        sheet.append([i, i * 10])
+    workbook.save(path)
+    excelutil.sheet_cache.clear()
+    yield path
+    excelutil.sheet_cache.clear()
+
+
+def test_cached_load_returns_independent_lists(workbook_path):
+    headers, data, _, _ = excelutil.load_excel_data(workbook_path, 0)
+    data[0][0] = "MUTATED"
+    data.pop()
+    headers.append("extra")
+
+    headers2, data2, _, _ = excelutil.load_excel_data(workbook_path, 0)
+    assert headers2 == ["k", "a"]
+    assert data2 == [[i, i * 10] for i in range(5)]
+    assert excelutil.sheet_cache.stats()["hits"] >= 1
+
+
+def test_streaming_reads_do_not_fill_cache(workbook_path):
+    list(excelutil.iter_excel(workbook_path))
+    list(excelutil.iter_process_data(workbook_path, dict))
+    assert excelutil.sheet_cache.stats()["entries"] == 0
+
+    # 物化结果的接口填充缓存，之后的流式读取命中缓存
+    rows = excelutil.read_excel(workbook_path)
+    assert excelutil.sheet_cache.stats()["entries"] == 1
+    assert list(excelutil.iter_excel(workbook_path)) == rows
+    assert excelutil.process_data(workbook_path, dict) == rows
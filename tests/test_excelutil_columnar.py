@@ -0,0 +1,53 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import datetime
+
+import pytest
+from openpyxl import Workbook
+
+from knify import excelutil
+
+
+@pytest.fixture
+def workbook_path(tmp_path):
+    path = str(tmp_path / "columnar.xlsx")
+    workbook = Workbook()
+    sheet = workbook.active
+    sheet.append(["id", "name", "created", "amount"])
+    for i in range(20):
+        sheet.append([i, f"n{i % 3}" if i % 4 else None, datetime.datetime(2024, 1, 1) + datetime.timedelta(hours=i),
+                      i * 1.5])
+    sheet.column_dimensions["A"].width = 20
+    sheet.column_dimensions["C"].width = 33.5
+    workbook.save(path)
+    excelutil.sheet_cache.clear()
+    yield path
+    excelutil.sheet_cache.clear()
+
+
+def test_snapshot_round_trip(workbook_path):
+    expected = excelutil.load_excel_data(workbook_path, 0)
+    rows = excelutil.read_excel(workbook_path)
+    excelutil.sheet_cache.clear()
+
+    excelutil.to_columnar(workbook_path)
+    assert excelutil.load_excel_data(workbook_path, 0) == expected
+    excelutil.sheet_cache.clear()
+    assert excelutil.read_excel(workbook_path) == rows
+
+
+def test_column_widths_fall_back_without_openpyxl_internals(workbook_path, monkeypatch):
+    expected = excelutil.load_excel_data(workbook_path, 0)[2]
+    assert excelutil._xlsx_column_widths(workbook_path, 0, 4) == expected
+
+    open_sheet = excelutil._open_sheet
+
+    def open_sheet_without_path(file_path, sheet=0):
+        workbook, sheet_ = open_sheet(file_path, sheet)
+        del sheet_._worksheet_path
+        return workbook, sheet_
+
+    monkeypatch.setattr(excelutil, "_open_sheet", open_sheet_without_path)
+    excelutil.sheet_cache.clear()
+    assert excelutil._xlsx_column_widths(workbook_path, 0, 4) == expected
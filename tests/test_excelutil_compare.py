@@ -0,0 +1,57 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+"""
+compare_ 结果工作簿与基线实现的输出逐单元格比对（值、数字格式、填充、边框）。
+
+data/compare_dates_expected.json 由基线版本的 excelutil.compare_ 对同一输入生成。
+"""
+import datetime
+import json
+import os
+
+from openpyxl import Workbook, load_workbook
+
+from knify import excelutil
+
+EXPECTED_PATH = os.path.join(os.path.dirname(__file__), "data", "compare_dates_expected.json")
+
+
+def build_inputs(directory: str) -> tuple:
+    file1, file2 = os.path.join(directory, "a.xlsx"), os.path.join(directory, "b.xlsx")
+    base = datetime.datetime(2020, 1, 1, 8, 30)
+    for path, shift in ((file1, 0), (file2, 1)):
+        workbook = Workbook()
+        sheet = workbook.active
+        sheet.append(["id", "name", "created", "day", "amount"])
+        for i in range(200):
+            if shift and i == 7:
+                continue  # file2 中删除一行
+            created = base + datetime.timedelta(days=i, minutes=shift if i % 10 == 0 else 0)
+            day = (base + datetime.timedelta(days=i)).date()
+            sheet.append([i, f"n{i}", created, day, i * 1.5 + (shift if i % 25 == 0 else 0)])
+        if shift:
+            sheet.append([999, "new", base, base.date(), 0.5])  # file2 中新增一行
+        sheet.column_dimensions["C"].width = 20
+        workbook.save(path)
+    return file1, file2
+
+
+def snapshot(path: str) -> list:
+    sheet = load_workbook(path).active
+    cells = []
+    for row in sheet.iter_rows():
+        for cell in row:
+            value = cell.value.isoformat() if isinstance(cell.value, (datetime.date, datetime.time)) else cell.value
+            cells.append([cell.coordinate, value, cell.number_format, cell.fill.fgColor.rgb,
+                          cell.border.left.style])
+    return cells
+
+
+def test_compare_keeps_baseline_cell_formats(tmp_path):
+    file1, file2 = build_inputs(str(tmp_path))
+    output = str(tmp_path / "result.xlsx")
+    excelutil.compare_(file1, file2, output, "id")
+    with open(EXPECTED_PATH, encoding="utf-8") as f:
+        expected = json.load(f)
+    assert snapshot(output) == expected
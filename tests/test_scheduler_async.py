@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import asyncio
+import time
+
+from knify.scheduler import AsyncScheduler, SQLiteJobStore
+
+
+class _SlowStore(SQLiteJobStore):
+    """读取与关闭都阻塞一段时间的存储。"""
+
+    delay = 0.5
+
+    def load(self) -> tuple:
+        time.sleep(self.delay)
+        return super().load()
+
+    def close(self):
+        time.sleep(self.delay)
+        super().close()
+
+
+async def _max_loop_gap(until: asyncio.Future, interval: float = 0.01) -> float:
+    gap, last = 0.0, time.perf_counter()
+    while not until.done():
+        await asyncio.sleep(interval)
+        now = time.perf_counter()
+        gap, last = max(gap, now - last), now
+    return gap
+
+
+async def _noop():
+    pass
+
+
+def test_run_and_aclose_keep_blocking_io_off_the_loop(tmp_path):
+    path = str(tmp_path / "jobs.db")
+
+    async def main():
+        sched = AsyncScheduler(job_store=_SlowStore(path), emit_logs=False)
+        sched.add_job("job", _noop, "0 0 1 1 *")
+        runner = asyncio.ensure_future(sched.run())
+        started = asyncio.ensure_future(asyncio.sleep(_SlowStore.delay + 0.2))
+        start_gap = await _max_loop_gap(started)
+        assert sched.get_job_status("job")["total_triggered"] == 0
+
+        closing = asyncio.ensure_future(sched.aclose())
+        stop_gap = await _max_loop_gap(closing)
+        await runner
+        return start_gap, stop_gap
+
+    start_gap, stop_gap = asyncio.run(main())
+    assert start_gap < _SlowStore.delay / 2
+    assert stop_gap < _SlowStore.delay / 2
+
+
+def test_cancelled_run_still_closes_store(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = _SlowStore(path)
+
+    async def main():
+        sched = AsyncScheduler(job_store=store, emit_logs=False)
+        sched.add_job("job", _noop, "0 0 1 1 *")
+        runner = asyncio.ensure_future(sched.run())
+        await asyncio.sleep(_SlowStore.delay + 0.2)
+        runner.cancel()
+        gap = await _max_loop_gap(runner)
+        assert runner.cancelled()
+        return gap
+
+    assert asyncio.run(main()) < _SlowStore.delay / 2
+    assert store._closed
@@ -0,0 +1,158 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+"""
+_CompiledCron 与 croniter 的一致性语料。
+
+语料（data/cron_corpus.json）中每条用例为 (表达式, 时区, 起始时间戳, croniter 给出的后续触发时间)，
+覆盖 DST 切换、日/周「或」语义、6 位秒级表达式与回退到 croniter 的扩展语法。
+croniter 升级或语义变化后重新生成：
+
+    PYTHONPATH=. python tests/test_scheduler_cron.py
+"""
+import json
+import os
+import random
+from datetime import datetime
+
+import pytest
+import pytz
+from croniter import croniter
+
+from knify.scheduler import _CompiledCron
+
+CORPUS_PATH = os.path.join(os.path.dirname(__file__), "data", "cron_corpus.json")
+_STEPS = 5
+
+_ZONES = ["UTC", "Asia/Shanghai", "America/New_York", "Europe/London", "Australia/Lord_Howe"]
+
+# DST 切换前后的起点（UTC 时间）
+_DST_BASES = [
+    "2024-03-10T06:00:00", "2024-03-10T06:59:59",  # America/New_York 春季跳过 02:00-03:00
+    "2024-11-03T04:30:00", "2024-11-03T05:30:00",  # America/New_York 秋季 01:00-02:00 重复
+    "2024-03-31T00:30:00", "2024-10-27T00:30:00",  # Europe/London
+    "2024-04-06T14:00:00", "2024-10-05T15:00:00",  # Australia/Lord_Howe 半小时 DST
+    "2024-02-28T23:59:30", "2024-12-31T23:59:59",
+]
+
+_EXPRESSIONS = [
+    # 常规
+    "* * * * *", "*/5 * * * *", "0 * * * *", "30 2 * * *", "15 1 * * *", "0 0 1 1 *",
+    "0 0 29 2 *", "0 0 31 * *", "59 23 * * *", "0 9-17/2 * * 1-5", "5,35 */3 * 2,8 *",
+    # 日/周「或」语义：日与周都受限时取并集
+    "0 0 13 * 5", "0 12 1,15 * 1-5", "0 6 L * 0", "30 8 */10 * 6,0", "0 0 1 * 1",
+    # 只受周约束 / 只受日约束
+    "*/7 * * * 0,6", "0 3 * * 0", "0 0 5-9 * *",
+    # 6 位（秒在最前）
+    "*/15 * * * * *", "30 30 2 * * *", "0 30 1 * * *", "0 0 0 29 2 *", "10,20 */2 2 * * 0",
+    # 扩展语法，走 croniter 回退路径
+    "0 9 * * 1#2", "0 0 L * *", "0 0 15W * *",
+]
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat()
+
+
+def _croniter_chain(expr: str, zone: str, timestamp: float) -> list:
+    tz = pytz.timezone(zone)
+    base = datetime.fromtimestamp(timestamp, tz)
+    result = []
+    for _ in range(_STEPS):
+        if len(expr.split()) == 6:
+            base = croniter(expr, base, second_at_beginning=True).get_next(datetime)
+        else:
+            base = croniter(expr, base).get_next(datetime)
+        result.append(_iso(base))
+    return result
+
+
+def _random_expr(rng: random.Random) -> str:
+    def field(low, high):
+        kind = rng.random()
+        if kind < 0.35:
+            return "*"
+        if kind < 0.55:
+            return f"*/{rng.randint(2, max(2, (high - low) // 2))}"
+        if kind < 0.75:
+            a = rng.randint(low, high)
+            b = rng.randint(a, high)
+            return f"{a}-{b}"
+        values = sorted(rng.sample(range(low, high + 1), rng.randint(1, 3)))
+        return ",".join(map(str, values))
+
+    fields = [field(0, 59), field(0, 23), field(1, 28), field(1, 12), field(0, 6)]
+    if rng.random() < 0.25:
+        fields.insert(0, field(0, 59))
+    return " ".join(fields)
+
+
+def generate_corpus(random_cases: int = 600, seed: int = 20241103) -> list:
+    cases = []
+    for expr in _EXPRESSIONS:
+        for zone in _ZONES:
+            for base in _DST_BASES:
+                timestamp = pytz.utc.localize(datetime.fromisoformat(base)).timestamp()
+                cases.append({"expr": expr, "tz": zone, "base": timestamp,
+                              "expected": _croniter_chain(expr, zone, timestamp)})
+    rng = random.Random(seed)
+    start = pytz.utc.localize(datetime(2023, 1, 1)).timestamp()
+    for _ in range(random_cases):
+        expr, zone = _random_expr(rng), rng.choice(_ZONES)
+        timestamp = start + rng.randint(0, 3 * 365 * 86400)
+        cases.append({"expr": expr, "tz": zone, "base": timestamp,
+                      "expected": _croniter_chain(expr, zone, timestamp)})
+    return cases
+
+
+def _load_corpus() -> list:
+    with open(CORPUS_PATH, encoding="utf-8") as f:
+        return json.load(f)
+
+
+_CORPUS = _load_corpus() if os.path.exists(CORPUS_PATH) else []
+
+
+def _case_id(case: dict) -> str:
+    return f"{case['expr']}|{case['tz']}|{int(case['base'])}"
+
+
+def test_corpus_present():
+    assert len(_CORPUS) > 1000
+
+
+@pytest.mark.parametrize("case", _CORPUS, ids=_case_id)
+def test_compiled_cron_matches_corpus(case):
+    compiled = _CompiledCron(case["expr"])
+    base = datetime.fromtimestamp(case["base"], pytz.timezone(case["tz"]))
+    actual = []
+    for _ in range(_STEPS):
+        base = compiled.get_next(base)
+        actual.append(_iso(base))
+    assert actual == case["expected"]
+
+
+def test_corpus_still_matches_croniter():
+    # 抽查语料仍与当前安装的 croniter 一致，否则需要重新生成语料并复核快速路径
+    rng = random.Random(0)
+    for case in rng.sample(_CORPUS, 50):
+        assert _croniter_chain(case["expr"], case["tz"], case["base"]) == case["expected"], _case_id(case)
+
+
+def test_day_of_month_or_day_of_week():
+    # 日与周同时受限时为并集：每月 13 日或每周五
+    compiled = _CompiledCron("0 0 13 * 5")
+    tz = pytz.timezone("UTC")
+    base = tz.localize(datetime(2024, 9, 1))
+    fired = []
+    for _ in range(4):
+        base = compiled.get_next(base)
+        fired.append(base.date().isoformat())
+    assert fired == ["2024-09-06", "2024-09-13", "2024-09-20", "2024-09-27"]
+
+
+if __name__ == "__main__":
+    corpus = generate_corpus()
+    with open(CORPUS_PATH, "w", encoding="utf-8") as f:
+        json.dump(corpus, f, ensure_ascii=False, indent=0)
+    print(f"{len(corpus)} 条用例已写入 {CORPUS_PATH}")
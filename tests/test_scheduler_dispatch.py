@@ -0,0 +1,115 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import threading
+
+from knify.scheduler import DEFAULT_POOL, _ThreadPool
+
+
+def test_higher_priority_dequeues_first_within_pool(make_scheduler):
+    sched = make_scheduler()
+    order = []
+    for task_id, priority in (("low", 0), ("high", 5), ("mid", 1)):
+        sched.add_job(task_id, order.append, args=[task_id], priority=priority)
+    for task_id in ("low", "high", "mid"):
+        sched.trigger_job(task_id)
+
+    assert sched._pools[DEFAULT_POOL].run_all() == 3
+    assert order == ["high", "mid", "low"]
+    assert [sched.get_job_status(t)["success_count"] for t in ("low", "high", "mid")] == [1, 1, 1]
+
+
+def test_cancelled_while_queued_is_not_counted_as_started():
+    pool = _ThreadPool("cancel", max_workers=1)
+    gate = threading.Event()
+    try:
+        first = pool.submit(gate.wait, (10,))
+        queued = pool.submit(int)
+        assert queued.cancel()
+        gate.set()
+        first.result(timeout=10)
+        pool.submit(int).result(timeout=10)  # 同一 worker 已越过被取消的任务
+
+        status = pool.status()
+        assert status["completed"] == 2
+        assert status["cancelled"] == 1
+        assert status["active"] == 0
+        assert status["queued"] == 0
+    finally:
+        pool.shutdown()
+
+
+def test_deadline_order_survives_remove_and_readd(make_scheduler, clock, drive):
+    sched = make_scheduler()
+    start = clock.time()
+    fired = []
+
+    def record(name):
+        fired.append((clock.time() - start, name))
+
+    sched.add_job("a", record, "*/5 * * * * *", args=["a-old"])
+    sched.add_job("b", record, "*/7 * * * * *", args=["b"])
+    sched.add_job("c", record, "*/10 * * * * *", args=["c"])
+    assert sched.next_deadline() == start + 5
+
+    # 被移除任务的堆项成为陈旧项，堆顶跳过它
+    sched.remove_job("a")
+    assert sched.next_deadline() == start + 7
+    # 同名重新注册：旧对象的堆项不能触发新任务
+    sched.add_job("a", record, "*/20 * * * * *", args=["a-new"])
+
+    drive(sched, start + 20)
+    assert [name for _, name in fired] == ["b", "c", "b", "a-new", "c"]
+    assert [t for t, _ in fired] == [7, 10, 14, 20, 20]
+
+
+def test_pause_resume_reschedules_and_heap_stays_bounded(make_scheduler, clock, drive):
+    sched = make_scheduler()
+    start = clock.time()
+    fired = []
+    sched.add_job("fast", fired.append, "* * * * * *", args=["fast"])
+    sched.add_job("slow", fired.append, "*/30 * * * * *", args=["slow"])
+
+    sched.pause_job("fast")
+    drive(sched, start + 30)
+    assert fired == ["slow"]
+    assert sched.next_deadline() == start + 60
+
+    sched.resume_job("fast")
+    assert sched.next_deadline() == start + 31
+    drive(sched, start + 33)
+    assert fired == ["slow", "fast", "fast", "fast"]
+
+    # 反复重排只留下陈旧项，堆按任务数压缩
+    for _ in range(1000):
+        sched.pause_job("slow")
+        sched.resume_job("slow")
+    assert len(sched._heap) <= 4 * len(sched._jobs) + 64 + 1
+    assert sched.next_deadline() == start + 34
+
+
+def test_coalesce_merges_queued_triggers_into_one_instance(make_scheduler, clock):
+    sched = make_scheduler()
+    start = clock.time()
+    pool = sched._pools[DEFAULT_POOL]
+    calls = []
+    sched.add_job("merge", lambda triggers=None: calls.append(triggers), "* * * * * *",
+                  blocking_strategy="COALESCE")
+
+    # 第一次触发占住唯一槽位，之后 5 次触发在执行期间到来
+    for second in range(1, 7):
+        clock.set(start + second)
+        sched.run_pending()
+    assert sched.get_blocked_jobs() == {"merge": ["merge#2"]}
+
+    pool.run_all()
+    assert len(calls) == 2
+    assert [t["scheduled_at"] - start for t in calls[0]] == [1]
+    assert [t["scheduled_at"] - start for t in calls[1]] == [2, 3, 4, 5, 6]
+    assert {t["source"] for t in calls[1]} == {"cron"}
+
+    metrics = sched.get_metrics()["jobs"]["merge"]
+    assert metrics["coalesced"] == 4
+    status = sched.get_job_status("merge")
+    assert status["total_triggered"] == 6
+    assert status["success_count"] == 2
@@ -0,0 +1,58 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import threading
+from datetime import datetime
+
+from knify.scheduler import DEFAULT_POOL, Scheduler
+
+
+def _event_threads():
+    return {t for t in threading.enumerate() if t.name == "lite-sched-events"}
+
+
+def test_event_thread_lives_between_start_and_shutdown():
+    before = _event_threads()
+    sched = Scheduler(emit_logs=False)
+    assert _event_threads() == before  # 未启动的调度器不占线程
+
+    t = threading.Thread(target=sched.start, kwargs={"block": False})
+    t.start()
+    t.join()
+    started = _event_threads() - before
+    assert len(started) == 1
+
+    sched.shutdown(wait=True)
+    assert not any(t.is_alive() for t in started)
+    assert _event_threads() == before
+
+
+def test_run_pending_delivers_events_without_start(make_scheduler, clock):
+    sched = make_scheduler()
+    records = []
+    sched.subscribe(records.append)
+    sched.add_job("tick", int, "* * * * * *")
+    assert records == []  # 没有事件线程，等 run_pending 输出
+
+    clock.advance(1)
+    sched.run_pending()
+    assert [r["event"] for r in records] == ["job_added", "start"]
+
+    sched._pools[DEFAULT_POOL].run_all()
+    clock.advance(1)
+    sched.run_pending()
+    assert [r["event"] for r in records][2:] == ["success", "start"]
+
+
+def test_events_are_stamped_with_scheduler_clock(make_scheduler, clock):
+    sched = make_scheduler()
+    records = []
+    sched.subscribe(records.append)
+    sched.add_job("tick", int, "*/10 * * * * *")
+    clock.advance(10)
+    sched.run_pending()
+
+    expected = [datetime.fromtimestamp(ts, sched._tz).strftime("%Y-%m-%d %H:%M:%S")
+                for ts in (clock.time() - 10, clock.time())]
+    assert [(r["event"], r["timestamp"]) for r in records] == [("job_added", expected[0]),
+                                                               ("start", expected[1])]
@@ -0,0 +1,193 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+from knify.scheduler import DEFAULT_POOL
+
+
+class _Task:
+    """按 outcomes 决定成败的任务，记录每次执行的虚拟时刻。"""
+
+    def __init__(self, clock):
+        self.clock = clock
+        self.outcomes = {}
+        self.calls = []
+
+    def __call__(self, name):
+        self.calls.append((self.clock.time(), name))
+        if not self.outcomes.get(name, True):
+            raise RuntimeError(f"{name} failed")
+
+
+def test_downstream_fires_only_after_all_upstreams_succeed(make_scheduler, clock):
+    sched = make_scheduler()
+    pool = sched._pools[DEFAULT_POOL]
+    task = _Task(clock)
+    sched.add_job("a", task, args=["a"])
+    sched.add_job("b", task, args=["b"])
+    sched.add_job("c", task, args=["c"], depends_on=["a", "b"])
+
+    sched.trigger_job("a")
+    pool.run_all()
+    assert sched.get_job_status("c")["total_triggered"] == 0
+
+    sched.trigger_job("b")
+    pool.run_all()
+    status = sched.get_job_status("c")
+    assert status["total_triggered"] == 1
+    assert status["last_trigger_source"] == "dependency"
+    assert [name for _, name in task.calls] == ["a", "b", "c"]
+
+    # 新一轮：a 失败不计入 AND-join，b 成功后下游不触发
+    task.outcomes["a"] = False
+    sched.trigger_job("a")
+    sched.trigger_job("b")
+    pool.run_all()
+    assert sched.get_job_status("a")["failed_count"] == 1
+    assert sched.get_job_status("c")["total_triggered"] == 1
+
+    # a 重新成功后本轮凑齐
+    task.outcomes["a"] = True
+    sched.trigger_job("a")
+    pool.run_all()
+    assert sched.get_job_status("c")["total_triggered"] == 2
+    assert [name for _, name in task.calls][-2:] == ["a", "c"]
+
+
+def test_downstream_follows_cron_upstream_under_virtual_clock(make_scheduler, clock, drive):
+    sched = make_scheduler()
+    start = clock.time()
+    task = _Task(clock)
+    sched.add_job("extract", task, "*/10 * * * * *", args=["extract"])
+    sched.add_job("load", task, args=["load"], depends_on=["extract"])
+
+    drive(sched, start + 30)
+    assert task.calls == [(start + 10, "extract"), (start + 10, "load"),
+                          (start + 20, "extract"), (start + 20, "load"),
+                          (start + 30, "extract"), (start + 30, "load")]
+
+
+def test_rate_limited_job_never_exceeds_its_bucket(make_scheduler, clock, drive):
+    sched = make_scheduler()
+    start = clock.time()
+    task = _Task(clock)
+    rate, burst = 2.0, 3.0
+    sched.add_job("limited", task, args=["limited"], max_instances=10, max_queue_size=100,
+                  rate_limit=rate, rate_burst=burst)
+    for _ in range(30):
+        sched.trigger_job("limited")
+    drive(sched, start + 60)
+
+    starts = [t for t, _ in task.calls]
+    assert len(starts) == 30  # 排队的触发在令牌补充后全部执行
+    for i, first in enumerate(starts):
+        for j in range(i, len(starts)):
+            # 任意区间内的执行次数不超过 burst + rate × 区间长度
+            assert j - i + 1 <= burst + rate * (starts[j] - first) + 1e-6
+    assert starts[-1] - start >= (30 - burst) / rate - 1e-6
+    assert sched.get_metrics()["jobs"]["limited"]["rate_limited"] > 0
+
+
+def test_aimd_halves_on_failure_and_grows_back(make_scheduler, clock):
+    sched = make_scheduler()
+    pool = sched._pools[DEFAULT_POOL]
+    task = _Task(clock)
+    sched.add_job("adaptive", task, args=["adaptive"], max_instances=8, max_queue_size=100,
+                  adaptive_concurrency=True, latency_target=10)
+
+    def limit():
+        return sched.get_job_status("adaptive")["concurrency_limit"]
+
+    def fire(n):
+        for _ in range(n):
+            sched.trigger_job("adaptive")
+        status = sched.get_job_status("adaptive")
+        assert status["running_instances"] <= status["concurrency_limit"]
+        clock.advance(1)
+        pool.run_all()
+
+    assert limit() == 8
+    # 同一批开始的 4 次失败只减半一次
+    task.outcomes["adaptive"] = False
+    fire(4)
+    assert limit() == 4
+    fire(1)
+    assert limit() == 2
+
+    # 上限为 2 时多余的触发排队，逐步放行
+    task.outcomes["adaptive"] = True
+    for _ in range(5):
+        sched.trigger_job("adaptive")
+    status = sched.get_job_status("adaptive")
+    assert (status["running_instances"], status["blocked_queue_size"]) == (2, 3)
+    pool.run_all()
+    assert sched.get_job_status("adaptive")["success_count"] == 5
+
+    history = [limit()]
+    while history[-1] < 8:
+        fire(1)
+        history.append(limit())
+    assert history == sorted(history)  # 无拥塞时只增不减
+    assert len(history) > 6            # 加性增长：每轮约 +1
+
+
+def _attempt_gaps(task: _Task, name: str) -> list:
+    times = [t for t, n in task.calls if n == name]
+    return [b - a for a, b in zip(times, times[1:])]
+
+
+def test_backoff_delays_grow_exponentially_up_to_the_cap(make_scheduler, clock, drive):
+    sched = make_scheduler()
+    task = _Task(clock)
+    task.outcomes["flaky"] = False
+    sched.add_job("flaky", task, args=["flaky"], retry_times=5, retry_delay=2,
+                  retry_backoff=2, retry_max_delay=10)
+    sched.trigger_job("flaky")
+    drive(sched, clock.time() + 120)
+
+    assert _attempt_gaps(task, "flaky") == [2, 4, 8, 10, 10]
+    assert sched.get_job_status("flaky")["failed_count"] == 1
+
+
+def test_jittered_backoff_stays_within_bounds(make_scheduler, clock, drive):
+    sched = make_scheduler()
+    task = _Task(clock)
+    names = [f"jitter_{i}" for i in range(20)]
+    for name in names:
+        task.outcomes[name] = False
+        sched.add_job(name, task, args=[name], retry_times=4, retry_delay=2, retry_backoff=2,
+                      retry_max_delay=10, retry_jitter=True)
+        sched.trigger_job(name)
+    drive(sched, clock.time() + 120)
+
+    gaps = []
+    for name in names:
+        job_gaps = _attempt_gaps(task, name)
+        assert len(job_gaps) == 4
+        for gap, upper in zip(job_gaps, (2, 4, 8, 10)):
+            assert 0 <= gap <= upper + 0.002  # 间隔极短时至少推迟 1ms
+        gaps.extend(job_gaps)
+    assert len(set(gaps)) > len(gaps) // 2  # full jitter：同时失败的任务错开重试
+
+
+def test_retries_stop_once_budget_is_exhausted(make_scheduler, clock, drive):
+    sched = make_scheduler(retry_budget=0.5, retry_budget_min_per_second=0,
+                           retry_budget_window=60)
+    task = _Task(clock)
+    task.outcomes["fail"] = False
+    sched.add_job("fail", task, args=["fail"], max_instances=4, retry_times=3, retry_delay=1)
+    failures = []
+    sched.subscribe(lambda r: failures.append(r) if r["event"] == "failed" else None)
+    for _ in range(4):
+        sched.trigger_job("fail")
+    drive(sched, clock.time() + 30)
+    sched.run_pending()  # 输出最后一批完成回调产生的事件
+
+    # 4 次首次尝试只存入 2 次重试额度
+    metrics = sched.get_metrics()
+    assert metrics["jobs"]["fail"]["retries"] == 2
+    assert metrics["jobs"]["fail"]["retries_denied"] == 4
+    assert metrics["retry_budget"]["available"] == 0
+    assert len(task.calls) == 6
+    assert sched.get_job_status("fail")["failed_count"] == 4
+    assert all(r.get("retry_budget_exhausted") for r in failures)
+    assert len(failures) == 4
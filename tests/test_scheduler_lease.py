@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import sqlite3
+import time
+
+import pytest
+
+from knify.scheduler import SQLiteLeaseBackend
+
+
+@pytest.fixture
+def backend(tmp_path):
+    lease = SQLiteLeaseBackend(str(tmp_path / "lease.db"), claim_timeout=0.1)
+    yield lease
+    lease.close()
+
+
+def test_claim_is_not_blocked_by_heartbeat_lock(backend):
+    with backend._db_lock:  # 续约线程持锁等待 busy_timeout 时
+        assert backend.claim("job@cron@1.000", "node-a")
+    assert not backend.claim("job@cron@1.000", "node-b")
+
+
+def test_locked_database_times_out_claim_quickly(backend, tmp_path):
+    blocker = sqlite3.connect(str(tmp_path / "lease.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        started = time.perf_counter()
+        with pytest.raises(sqlite3.OperationalError):
+            backend.claim("job@cron@1.000", "node-a")
+        assert time.perf_counter() - started < 1.0
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert backend.claim("job@cron@1.000", "node-a")
+
+
+def test_claim_timeout_skips_fire_without_stalling_dispatch(backend, tmp_path, make_scheduler,
+                                                            clock):
+    sched = make_scheduler(coordinator=backend, node_id="node-a")
+    errors = []
+    sched.subscribe(lambda r: errors.append(r) if r["event"] == "lease_error" else None)
+    sched.add_job("tick", int, "* * * * * *")
+
+    blocker = sqlite3.connect(str(tmp_path / "lease.db"), isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    try:
+        clock.advance(1)
+        started = time.perf_counter()
+        sched.run_pending()
+        assert time.perf_counter() - started < 1.0
+    finally:
+        blocker.execute("ROLLBACK")
+        blocker.close()
+    assert sched.get_job_status("tick")["total_triggered"] == 0  # 超时按未占用处理
+    assert [e["op"] for e in errors] == ["claim"]
+
+    clock.advance(1)
+    sched.run_pending()
+    assert sched.get_job_status("tick")["total_triggered"] == 1
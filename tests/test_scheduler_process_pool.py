@@ -0,0 +1,28 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import operator
+
+import pytest
+
+from knify.scheduler import TaskExecutionError, _ProcessPool
+
+
+def test_spawn_failure_fails_attempt_and_keeps_worker(monkeypatch):
+    pool = _ProcessPool("spawn-fail", max_workers=1)
+    spawn = pool._spawn
+
+    def broken_spawn():
+        raise OSError("fork: Resource temporarily unavailable")
+
+    monkeypatch.setattr(pool, "_spawn", broken_spawn)
+    try:
+        with pytest.raises(TaskExecutionError, match="子进程启动失败"):
+            pool.submit(operator.add, (1, 2)).result(timeout=10)
+
+        # worker 线程仍存活：恢复后下一个任务正常执行
+        monkeypatch.setattr(pool, "_spawn", spawn)
+        assert pool.submit(operator.add, (1, 2)).result(timeout=60) == 3
+        assert pool.status()["completed"] == 2
+    finally:
+        pool.shutdown()
@@ -0,0 +1,143 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import threading
+import time
+from datetime import datetime
+
+import pytest
+import pytz
+
+from knify.scheduler import Scheduler, SQLiteJobStore
+
+CALLS = []
+
+
+def record(tag):
+    CALLS.append(tag)
+
+
+def _start(sched: Scheduler):
+    # 在子线程里启动，避免替换 pytest 的信号处理函数
+    t = threading.Thread(target=sched.start, kwargs={"block": False})
+    t.start()
+    t.join()
+
+
+def _wait_until(predicate, timeout: float = 10.0):
+    deadline = time.time() + timeout
+    while not predicate():
+        assert time.time() < deadline, "等待超时"
+        time.sleep(0.01)
+
+
+def _new_scheduler(path, clock, **kwargs) -> Scheduler:
+    return Scheduler(job_store=SQLiteJobStore(str(path), flush_interval=0.05), clock=clock,
+                     emit_logs=False, **kwargs)
+
+
+def _run_manual(sched: Scheduler, task_id: str, times: int):
+    for _ in range(times):
+        done = sched.get_job_status(task_id)["success_count"] + 1
+        sched.trigger_job(task_id)
+        _wait_until(lambda: sched.get_job_status(task_id)["success_count"] == done)
+
+
+@pytest.fixture(autouse=True)
+def _reset_calls():
+    CALLS.clear()
+
+
+def test_registration_before_start_keeps_saved_state(tmp_path, clock):
+    path = tmp_path / "jobs.db"
+    first = _new_scheduler(path, clock)
+    first.add_job("count", record, "* * * * *", args=["count"])
+    _start(first)
+    _run_manual(first, "count", 4)
+    saved = first.get_job_status("count")
+    first.shutdown(wait=True)
+
+    second = _new_scheduler(path, clock)
+    second.add_job("count", record, "* * * * *", args=["count"])
+    time.sleep(0.3)  # 超过 flush_interval：注册时的快照不能先于恢复落盘
+    _start(second)
+    try:
+        restored = second.get_job_status("count")
+        for key in ("success_count", "failed_count", "total_triggered", "last_status",
+                    "last_run_time", "last_trigger_source", "next_run_time"):
+            assert restored[key] == saved[key], key
+        assert restored["success_count"] == 4
+    finally:
+        second.shutdown(wait=True)
+
+
+def test_unregistered_job_round_trips_definition_and_next_run(tmp_path, clock):
+    path = tmp_path / "jobs.db"
+    first = _new_scheduler(path, clock)
+    first.add_job("restored", record, "*/5 * * * *", args=["restored"], priority=3,
+                  max_instances=2, retry_times=1)
+    _start(first)
+    _run_manual(first, "restored", 2)
+    saved = first.get_job_status("restored")
+    first.shutdown(wait=True)
+
+    # 新进程不注册该任务：按 func_ref 重新导入并注册
+    second = _new_scheduler(path, clock)
+    _start(second)
+    try:
+        restored = second.get_job_status("restored")
+        assert restored == saved
+        _run_manual(second, "restored", 1)
+        assert CALLS == ["restored"] * 3
+    finally:
+        second.shutdown(wait=True)
+
+
+@pytest.mark.parametrize("policy, missed", [("SKIP", 0), ("RUN_ONCE", 1), ("RUN_ALL", 5)])
+def test_misfire_policy_on_restart(tmp_path, clock, policy, missed):
+    path = tmp_path / "jobs.db"
+    start = clock.time()  # 对齐整分钟
+    first = _new_scheduler(path, clock)
+    first.add_job("cron", record, "* * * * *", args=["cron"], misfire_policy=policy)
+    _start(first)
+    first.shutdown(wait=True)
+
+    # 停机期间错过 +60 .. +300 共 5 次触发
+    clock.set(start + 330)
+    second = _new_scheduler(path, clock)
+    second.add_job("cron", record, "* * * * *", args=["cron"], misfire_policy=policy)
+    _start(second)
+    try:
+        status = second.get_job_status("cron")
+        assert status["total_triggered"] == missed
+        assert status["next_run_time"] == datetime.fromtimestamp(
+            start + 360, pytz.timezone("Asia/Shanghai")).strftime("%Y-%m-%d %H:%M:%S")
+        _wait_until(lambda: second.get_job_status("cron")["success_count"] == missed)
+        if missed:
+            assert second.get_job_status("cron")["last_trigger_source"] == "misfire"
+        assert CALLS == ["cron"] * missed
+    finally:
+        second.shutdown(wait=True)
+
+
+def test_close_flushes_writes_pending_in_flush_thread(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    store = SQLiteJobStore(path, flush_interval=60, batch_size=50)
+    for i in range(1000):
+        store.save_job(f"job_{i}", {"n": i})
+        store.save_instance(f"job_{i}#1", f"job_{i}", {"task_id": f"job_{i}", "n": i})
+    for i in range(0, 1000, 2):
+        store.delete_instance(f"job_{i}#1")
+    store.delete_job("job_999")
+    store.close()
+    store.save_job("after_close", {"n": -1})  # 关闭后的写入被丢弃
+
+    reopened = SQLiteJobStore(path)
+    try:
+        jobs, instances = reopened.load()
+    finally:
+        reopened.close()
+    assert len(jobs) == 999
+    assert jobs["job_998"] == {"n": 998}
+    assert "job_999" not in jobs and "after_close" not in jobs
+    assert sorted(inst["n"] for inst in instances) == list(range(1, 999, 2))
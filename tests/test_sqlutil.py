@@ -0,0 +1,38 @@
+#!/usr/bin/env python
+# -*- coding:utf-8 -*-
+# Author: qicongsheng
+import io
+import sqlite3
+
+from knify import sqlutil
+
+_TEMPLATE = "insert into t(id, name) values (${id}, '${name}')"
+
+
+def _rows(n):
+    return [{"id": i, "name": None if i % 3 == 0 else f"o'k{i}"} for i in range(n)]
+
+
+def test_write_sql_to_cursor_commits_each_batch():
+    conn = sqlite3.connect(":memory:")
+    conn.execute("create table t(id, name)")
+    commits = []
+
+    def commit():
+        conn.commit()
+        commits.append(conn.execute("select count(*) from t").fetchone()[0])
+
+    statements = sqlutil.iter_sql_from_json(_rows(250), _TEMPLATE, translate_chars={"'": "''"})
+    assert sqlutil.write_sql(statements, conn.cursor(), batch_size=100, on_batch=commit) == 250
+    assert commits == [100, 200, 250]
+    assert conn.execute("select count(*), sum(name is null) from t").fetchone() == (250, 84)
+
+    # 绑定方法可以直接作为回调
+    assert sqlutil.write_sql(iter(["delete from t"]), conn.cursor(), on_batch=conn.commit) == 1
+
+
+def test_write_sql_to_file_object():
+    buffer = io.StringIO()
+    statements = sqlutil.iter_sql_from_json(_rows(3), _TEMPLATE)
+    assert sqlutil.write_sql(statements, buffer, batch_size=2) == 3
+    assert buffer.getvalue().splitlines() == sqlutil.generate_sql_from_json(_rows(3), _TEMPLATE)